@@ -0,0 +1,65 @@
+"""Enforcing "bootstrap only while no admin exists" with a primary key.
+
+The single ``admin_guard`` row exists exactly while at least one admin does.
+``POST /auth/bootstrap`` inserts it (``claim``) as the first statement of its
+transaction, so the primary key rejects every bootstrap once an admin exists
+or another bootstrap got there first: at most one can commit, and a loser
+costs one statement. Every other way of adding an admin (registration, bulk
+import, the setup scripts and the benchmark dataset) calls ``guard``, which
+creates the row if it is missing; a bootstrap racing it fails on the same key.
+Deleting or demoting the last admin through the ORM deletes the row, so
+bootstrap opens again.
+"""
+
+from sqlalchemy import delete, event, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import AdminGuard, RoleEnum, User
+
+GUARD_ID = 1
+
+_table = AdminGuard.__table__
+
+
+def claim(db: Session) -> bool:
+    """Insert the guard row for a bootstrap; on ``False`` an admin exists and the transaction is rolled back."""
+    try:
+        db.execute(insert(_table).values(id=GUARD_ID, version=1))
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+
+def guard(db: Session) -> None:
+    """Make sure the guard row exists, and lock it for the rest of the transaction."""
+    statement = update(_table).where(_table.c.id == GUARD_ID).values(version=_table.c.version + 1)
+    if db.execute(statement).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(_table).values(id=GUARD_ID, version=1))
+    except IntegrityError:
+        db.execute(statement)
+
+
+def exists(db: Session) -> bool:
+    return db.execute(select(User.id).where(User.role == RoleEnum.ADMIN).limit(1)).first() is not None
+
+
+def _release(connection) -> None:
+    admin = select(User.id).where(User.role == RoleEnum.ADMIN)
+    connection.execute(delete(_table).where(~admin.exists()))
+
+
+@event.listens_for(User, "after_delete")
+def _admin_deleted(mapper, connection, user: User) -> None:
+    if user.role == RoleEnum.ADMIN:
+        _release(connection)
+
+
+@event.listens_for(User, "after_update")
+def _admin_demoted(mapper, connection, user: User) -> None:
+    if RoleEnum.ADMIN in inspect(user).attrs.role.history.deleted:
+        _release(connection)
@@ -0,0 +1,130 @@
+"""Materialized per-professor score aggregates.
+
+``record_review`` keeps the aggregate rows current inside the caller's
+transaction. Run ``python -m app.aggregates`` to rebuild them from ``reviews``
+after a backfill or restore. Per-course rows of closed terms live in their
+archives (``app.archive``); the per-professor totals keep counting them.
+"""
+
+from typing import Dict, Optional
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import archive
+from .database import SessionLocal, engine
+from .models import SCORE_DIMENSIONS, SCORE_VALUES, ProfessorCourseStats, ProfessorStats, Review
+
+# Dimensions that rate the teaching; workload describes the course and confidence the reviewer.
+OVERALL_DIMENSIONS = ("fairness", "clarity", "engagement")
+
+AGGREGATE_MODELS = (
+    (ProfessorStats, ("professor_id",)),
+    (ProfessorCourseStats, ("professor_id", "course_id")),
+)
+
+
+def _review_columns(review: Review) -> Dict[str, int]:
+    """Column deltas contributed by a single review."""
+    values = {"review_count": 1}
+    for dimension in SCORE_DIMENSIONS:
+        score = getattr(review, dimension)
+        values[f"{dimension}_sum"] = score
+        for bucket in SCORE_VALUES:
+            values[f"{dimension}_{bucket}"] = 1 if score == bucket else 0
+    return values
+
+
+def _increment(db: Session, model, keys: Dict[str, int], deltas: Dict[str, int]) -> None:
+    table = model.__table__
+    where = [table.c[name] == value for name, value in keys.items()]
+    assignments = {name: table.c[name] + delta for name, delta in deltas.items() if delta}
+    if db.execute(update(table).where(*where).values(assignments)).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(table).values(**keys, **deltas))
+    except IntegrityError:
+        # A concurrent writer created the row first; apply our delta on top.
+        db.execute(update(table).where(*where).values(assignments))
+
+
+def record_review(db: Session, review: Review) -> None:
+    """Fold ``review`` into its professor and professor+course aggregates."""
+    deltas = _review_columns(review)
+    for model, key_names in AGGREGATE_MODELS:
+        _increment(db, model, {name: getattr(review, name) for name in key_names}, deltas)
+
+
+def _aggregate_select(key_names):
+    keys = [getattr(Review, name) for name in key_names]
+    columns = [*keys, func.count(Review.id)]
+    for dimension in SCORE_DIMENSIONS:
+        score = getattr(Review, dimension)
+        columns.append(func.sum(score))
+        columns.extend(func.sum(case((score == bucket, 1), else_=0)) for bucket in SCORE_VALUES)
+    return select(*columns).group_by(*keys)
+
+
+def _aggregate_column_names(key_names):
+    names = [*key_names, "review_count"]
+    for dimension in SCORE_DIMENSIONS:
+        names.append(f"{dimension}_sum")
+        names.extend(f"{dimension}_{bucket}" for bucket in SCORE_VALUES)
+    return names
+
+
+def rebuild(db: Session) -> None:
+    """Recompute every aggregate row from ``reviews`` with set-based SQL, then add archived terms' totals."""
+    for model, key_names in AGGREGATE_MODELS:
+        table = model.__table__
+        db.execute(delete(table))
+        db.execute(
+            insert(table).from_select(_aggregate_column_names(key_names), _aggregate_select(key_names))
+        )
+    course_stats = ProfessorCourseStats.__table__
+    live = set(db.execute(select(course_stats.c.professor_id, course_stats.c.course_id)).all())
+    names = _aggregate_column_names(())
+    with archive.archives(db) as sessions:
+        for session in sessions:
+            for row in session.execute(select(course_stats)).mappings():
+                # Still live as well while the term's close is between copying and deleting.
+                if (row["professor_id"], row["course_id"]) not in live:
+                    _increment(db, ProfessorStats, {"professor_id": row["professor_id"]}, {name: row[name] for name in names})
+
+
+def stats_payload(row: Optional[ProfessorStats]) -> dict:
+    """Shape an aggregate row (or ``None`` for no reviews) for ``schemas.ScoreStats``."""
+    count = row.review_count if row else 0
+    dimensions = {}
+    for dimension in SCORE_DIMENSIONS:
+        total = getattr(row, f"{dimension}_sum") if row else 0
+        dimensions[dimension] = {
+            "average": total / count if count else None,
+            "histogram": [getattr(row, f"{dimension}_{bucket}") if row else 0 for bucket in SCORE_VALUES],
+        }
+    overall = sum(getattr(row, f"{dimension}_sum") for dimension in OVERALL_DIMENSIONS) if count else 0
+    return {
+        "review_count": count,
+        "overall_average": overall / (count * len(OVERALL_DIMENSIONS)) if count else None,
+        "dimensions": dimensions,
+    }
+
+
+def main() -> None:
+    # Imported here: migrations depends on the rebuild modules. Upgrade the schema, backfills included, first.
+    from . import migrations
+
+    migrations.migrate(engine)
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        db.commit()
+        print("Score aggregates rebuilt.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Anonymous review IDs: four base-62 characters, unique per professor.
+
+Each professor has a counter in ``anon_id_sequences``. The n-th review of a
+professor gets ``encode(permute(professor_id, n))``, where ``permute`` is a
+keyed Feistel network over ``[0, 62**4)`` split into two base-3844 halves, so it
+is a bijection and no cycle walking is needed. Distinct counter values
+therefore always yield distinct IDs: allocation is one atomic counter
+increment, with no uniqueness probe and no retry however full the space is.
+The unique index on ``(professor_id, anon_id)`` is only a backstop.
+"""
+
+import hashlib
+import string
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import AnonIdSequence
+
+ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase
+LENGTH = 4
+SPACE = len(ALPHABET) ** LENGTH
+_HALF = len(ALPHABET) ** (LENGTH // 2)
+ROUNDS = 4
+
+
+class AnonIdSpaceExhausted(Exception):
+    """Raised once a professor has used all 62**4 anonymous IDs."""
+
+
+def _round(professor_id: int, round_number: int, value: int) -> int:
+    digest = hashlib.blake2b(
+        f"{professor_id}:{round_number}:{value}".encode(), key=settings.ANON_ID_KEY.encode()[:64], digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big") % _HALF
+
+
+def permute(professor_id: int, value: int) -> int:
+    left, right = divmod(value, _HALF)
+    for round_number in range(ROUNDS):
+        left, right = right, (left + _round(professor_id, round_number, right)) % _HALF
+    return left * _HALF + right
+
+
+def encode(value: int) -> str:
+    chars = []
+    for _ in range(LENGTH):
+        value, digit = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def anon_id(professor_id: int, sequence: int) -> str:
+    if not 0 <= sequence < SPACE:
+        raise AnonIdSpaceExhausted(f"Professor {professor_id} has no anonymous IDs left")
+    return encode(permute(professor_id, sequence))
+
+
+def reserve(db: Session, professor_id: int, count: int = 1) -> int:
+    """Atomically advance the professor's counter by ``count``; return the first reserved value."""
+    table = AnonIdSequence.__table__
+    statement = (
+        update(table)
+        .where(table.c.professor_id == professor_id)
+        .values(next_value=table.c.next_value + count)
+        .returning(table.c.next_value)
+    )
+    next_value = db.execute(statement).scalar()
+    if next_value is None:
+        try:
+            with db.begin_nested():
+                db.execute(insert(table).values(professor_id=professor_id, next_value=count))
+            next_value = count
+        except IntegrityError:
+            next_value = db.execute(statement).scalar()
+    return next_value - count
+
+
+def allocate(db: Session, professor_id: int) -> str:
+    """Return the next anonymous ID for ``professor_id`` within the caller's transaction."""
+    return anon_id(professor_id, reserve(db, professor_id))
@@ -0,0 +1,393 @@
+"""Per-term archive databases for closed terms.
+
+Almost every request targets the current term, yet every review ever written
+stays in ``reviews`` and its indexes. ``python -m app.archive close <term>``
+moves a finished term out of the live tables into a database of its own,
+named by ``ARCHIVE_URL`` (one SQLite file per term by default; a PostgreSQL
+URL with ``{term}`` in the database name works the same way):
+
+1. The term is registered in ``archived_terms`` as closing, and workers stop
+   accepting reviews and rebuttals for it.
+2. Its courses, reviews, rebuttals, per-course score aggregates, rankings and
+   ranking priors are copied to the archive, with the professors those
+   reviews name, and the archive gets its own search index. The term is then
+   marked archived, and reads for it go to the archive.
+3. The copied reviews, rebuttals, aggregates and rankings are deleted from the
+   live tables. Courses and professors stay live.
+
+Workers reread the registry every ``ARCHIVE_REFRESH_SECONDS``, and ``close``
+waits that long after steps 1 and 2, so no worker writes to or reads from the
+wrong place. Rerunning an interrupted ``close`` resumes at the first
+unfinished step.
+
+``stores`` routes reads. A read for one term gets that term's archive once it
+is archived, and the live database otherwise. A read across terms gets the
+live database plus every archive, and the caller merges the results and drops
+duplicates (rows are in both places between steps 2 and 3). Paginated reads
+across terms go through ``newest_first`` and ``each_store`` instead, which
+read the live tables first and open an archive only when the page still needs
+its rows: step 2 records each archive's newest review for that. The all-terms
+professor statistics and rankings stay live and keep counting archived
+reviews.
+
+In async mode, archive queries issued from a request running on the async
+engine (``app.routing``) go through async archive engines as well, so they are
+awaited on the event loop instead of blocking it.
+"""
+
+import argparse
+import heapq
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Column, Index, MetaData, Table, delete, insert, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.util.concurrency import in_greenlet
+
+from . import search
+from .config import async_driver_url, settings
+from .database import ReadOnlySession, SessionLocal, make_async_engine, make_engine
+from .models import (
+    ArchivedTerm,
+    Course,
+    Professor,
+    ProfessorCourseStats,
+    ProfessorRanking,
+    RankingPrior,
+    Rebuttal,
+    Review,
+)
+
+# Everything a term's reads touch, including the courses and professors its reviews join.
+ARCHIVED_TABLES = tuple(
+    model.__table__ for model in (Course, Professor, Review, Rebuttal, ProfessorCourseStats, ProfessorRanking, RankingPrior)
+)
+# Deletion order for step 3: rebuttals are found through their reviews.
+PURGED_TABLES = tuple(
+    model.__table__ for model in (Rebuttal, Review, ProfessorCourseStats, ProfessorRanking, RankingPrior)
+)
+
+
+class ArchiveError(RuntimeError):
+    """Raised when a term cannot be closed."""
+
+
+class Entry(NamedTuple):
+    term: str
+    url: str
+    # False while the term is closing.
+    archived: bool
+    # (created_at, id) of the newest archived review; None if the term has none.
+    newest: Optional[Tuple[datetime, int]]
+
+
+class Registry:
+    """``archived_terms``, reread at most every ``ARCHIVE_REFRESH_SECONDS``."""
+
+    def __init__(self):
+        self._entries: Dict[str, Entry] = {}
+        self._loaded_at: Optional[float] = None
+
+    def entries(self, db: Session) -> Dict[str, Entry]:
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= settings.ARCHIVE_REFRESH_SECONDS:
+            table = ArchivedTerm.__table__
+            columns = (table.c.term, table.c.url, table.c.archived_at, table.c.newest_review_at, table.c.newest_review_id)
+            self._entries = {
+                term: Entry(term, url, archived_at is not None, None if newest_at is None else (newest_at, newest_id))
+                for term, url, archived_at, newest_at, newest_id in db.execute(select(*columns))
+            }
+            self._loaded_at = now
+        return self._entries
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+
+registry = Registry()
+_engines: Dict[str, Engine] = {}
+_async_engines: Dict[str, object] = {}
+_engines_lock = threading.Lock()
+
+
+def is_closed(db: Session, term: str) -> bool:
+    """Whether ``term`` no longer accepts reviews or rebuttals."""
+    return term in registry.entries(db)
+
+
+def archived_terms(db: Session) -> FrozenSet[str]:
+    """Terms whose reads go to their archive."""
+    return frozenset(term for term, entry in registry.entries(db).items() if entry.archived)
+
+
+def archive_url(term: str) -> str:
+    # Terms are free text; keep the file or database name portable.
+    return settings.ARCHIVE_URL.replace("{term}", re.sub(r"[^0-9A-Za-z_-]", "_", term))
+
+
+def _engine(url: str) -> Engine:
+    with _engines_lock:
+        engine = _engines.get(url)
+        if engine is None:
+            engine = _engines[url] = make_engine(url, "archive")
+        return engine
+
+
+def _read_bind(url: str) -> Engine:
+    if settings.ASYNC_DATABASE and in_greenlet():
+        # Inside AsyncSession.run_sync: statements on the async engine's sync facade are awaited on the event loop.
+        with _engines_lock:
+            engine = _async_engines.get(url)
+            if engine is None:
+                engine = _async_engines[url] = make_async_engine(async_driver_url(url), "archive")
+        return engine.sync_engine
+    return _engine(url)
+
+
+async def dispose() -> None:
+    """Close every archive engine's pooled connections."""
+    with _engines_lock:
+        engines, async_engines = list(_engines.values()), list(_async_engines.values())
+        _engines.clear()
+        _async_engines.clear()
+    for engine in async_engines:
+        await engine.dispose()
+    for engine in engines:
+        engine.dispose()
+
+
+@contextmanager
+def _sessions(urls: Iterable[str]) -> Iterator[List[Session]]:
+    sessions = [ReadOnlySession(bind=_read_bind(url), autoflush=False) for url in sorted(urls)]
+    try:
+        yield sessions
+    finally:
+        for session in sessions:
+            session.close()
+
+
+@contextmanager
+def stores(db: Session, term: Optional[str] = None) -> Iterator[List[Session]]:
+    """Sessions holding ``term``'s rows, or every term's if ``None``; ``db`` stands for the live tables."""
+    entries = registry.entries(db)
+    if term is None:
+        urls = [entry.url for entry in entries.values() if entry.archived]
+    else:
+        entry = entries.get(term)
+        urls = [entry.url] if entry is not None and entry.archived else []
+    with _sessions(urls) as sessions:
+        yield sessions if term is not None and sessions else [db, *sessions]
+
+
+@contextmanager
+def store(db: Session, term: str) -> Iterator[Session]:
+    """The one session holding ``term``'s rows."""
+    entry = registry.entries(db).get(term)
+    if entry is None or not entry.archived:
+        yield db
+        return
+    with _sessions([entry.url]) as (session,):
+        yield session
+
+
+@contextmanager
+def archives(db: Session) -> Iterator[List[Session]]:
+    """One session per archived term."""
+    with _sessions(entry.url for entry in registry.entries(db).values() if entry.archived) as sessions:
+        yield sessions
+
+
+def _newest_archives(db: Session) -> List[Entry]:
+    archived = [entry for entry in registry.entries(db).values() if entry.archived and entry.newest is not None]
+    return sorted(archived, key=lambda entry: entry.newest, reverse=True)
+
+
+def each_store(db: Session, term: Optional[str] = None) -> Iterator[Session]:
+    """``term``'s store, or the live tables and then every archive holding reviews, newest term first.
+
+    Archives are opened one at a time as the caller asks for them, and closed
+    when it asks for the next; close the generator when stopping early.
+    """
+    if term is not None:
+        with store(db, term) as session:
+            yield session
+        return
+    yield db
+    for entry in _newest_archives(db):
+        with _sessions([entry.url]) as (session,):
+            yield session
+
+
+def newest_first(db: Session, statement, limit: int, key: Callable, term: Optional[str] = None) -> List:
+    """The first ``limit`` rows of ``statement``, newest first by review ``key``, across the stores holding ``term``.
+
+    ``statement`` must be ordered newest first and limited to ``limit`` rows.
+    Without a term the live rows come first, and an archive is read only if
+    its newest review would still make the page: a page the live tables fill
+    opens no archive.
+    """
+    if term is not None:
+        with store(db, term) as session:
+            return session.execute(statement).all()
+    rows = db.execute(statement).all()
+    for entry in _newest_archives(db):
+        if len(rows) >= limit and key(rows[limit - 1]) >= entry.newest:
+            break
+        with _sessions([entry.url]) as (session,):
+            rows = list(islice(merge([rows, session.execute(statement).all()], key, reverse=True), limit))
+    return rows
+
+
+def merge(results: Iterable[Iterable], key: Callable, reverse: bool = False) -> Iterator:
+    """Merge per-store results, each sorted by ``key``, keeping one row per key."""
+    results = list(results)
+    if len(results) == 1:
+        return iter(results[0])
+    return _unique(heapq.merge(*results, key=key, reverse=reverse), key)
+
+
+def _unique(rows: Iterator, key: Callable) -> Iterator:
+    previous = object()
+    for row in rows:
+        current = key(row)
+        if current != previous:
+            yield row
+            previous = current
+
+
+def archived_review_exists(db: Session, review_id: int) -> bool:
+    with archives(db) as sessions:
+        return any(session.scalar(select(Review.id).where(Review.id == review_id)) is not None for session in sessions)
+
+
+def _in_term(table: Table, term: str):
+    """Condition selecting ``table``'s rows that belong to ``term``."""
+    courses = select(Course.id).where(Course.term == term)
+    reviews = select(Review.id).where(Review.course_id.in_(courses))
+    return {
+        Course.__table__: Course.term == term,
+        Professor.__table__: Professor.id.in_(select(Review.professor_id).where(Review.course_id.in_(courses))),
+        Review.__table__: Review.course_id.in_(courses),
+        Rebuttal.__table__: Rebuttal.review_id.in_(reviews),
+        ProfessorCourseStats.__table__: ProfessorCourseStats.course_id.in_(courses),
+        ProfessorRanking.__table__: ProfessorRanking.term == term,
+        RankingPrior.__table__: RankingPrior.term == term,
+    }[table]
+
+
+def _archive_metadata() -> MetaData:
+    """The archived tables without foreign keys: users and the rest of the schema stay live."""
+    metadata = MetaData()
+    for source in ARCHIVED_TABLES:
+        table = Table(
+            source.name,
+            metadata,
+            *(
+                Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable, unique=column.unique)
+                for column in source.columns
+            ),
+        )
+        for index in source.indexes:
+            Index(index.name, *(table.c[column.name] for column in index.columns), unique=index.unique)
+    return metadata
+
+
+def _copy(db: Session, term: str, url: str) -> Dict[str, int]:
+    database = make_url(url).database
+    if url.startswith("sqlite") and database:
+        os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+    metadata = _archive_metadata()
+    copied = {}
+    with _engine(url).begin() as conn:
+        # Start over if an earlier attempt stopped half way.
+        search.uninstall(conn)
+        metadata.drop_all(conn)
+        metadata.create_all(conn)
+        for source in ARCHIVED_TABLES:
+            copied[source.name] = 0
+            statement = select(source).where(_in_term(source, term))
+            result = db.execute(statement.execution_options(yield_per=settings.BULK_IMPORT_BATCH_SIZE))
+            for rows in result.partitions():
+                conn.execute(insert(metadata.tables[source.name]), [dict(row._mapping) for row in rows])
+                copied[source.name] += len(rows)
+        search.install(conn)
+    return copied
+
+
+def _newest_review(url: str) -> Optional[Tuple[datetime, int]]:
+    newest = select(Review.created_at, Review.id).order_by(Review.created_at.desc(), Review.id.desc()).limit(1)
+    with _engine(url).connect() as conn:
+        return conn.execute(newest).first()
+
+
+def purge(db: Session, term: str) -> Dict[str, int]:
+    """Delete ``term``'s archived rows from the live tables; return the count per table."""
+    return {table.name: db.execute(delete(table).where(_in_term(table, term))).rowcount for table in PURGED_TABLES}
+
+
+def close(db: Session, term: str, wait: Optional[float] = None, log: Callable[[str], None] = print) -> ArchivedTerm:
+    """Run or resume the three steps above for ``term``."""
+    wait = settings.ARCHIVE_REFRESH_SECONDS if wait is None else wait
+    entry = db.get(ArchivedTerm, term)
+    if entry is None:
+        if db.scalar(select(Course.id).where(Course.term == term).limit(1)) is None:
+            raise ArchiveError(f"No courses in term {term}")
+        entry = ArchivedTerm(term=term, url=archive_url(term))
+        db.add(entry)
+        db.commit()
+        log(f"{term}: closed for new reviews and rebuttals; waiting {wait:g}s for every worker to notice")
+        time.sleep(wait)
+    if entry.archived_at is None:
+        copied = _copy(db, term, entry.url)
+        entry.review_count = copied[Review.__tablename__]
+        entry.rebuttal_count = copied[Rebuttal.__tablename__]
+        entry.newest_review_at, entry.newest_review_id = _newest_review(entry.url) or (None, None)
+        entry.archived_at = datetime.utcnow()
+        db.commit()
+        log(
+            f"{term}: copied {entry.review_count} reviews and {entry.rebuttal_count} rebuttals to {entry.url}; "
+            f"waiting {wait:g}s for every worker to read from it"
+        )
+        time.sleep(wait)
+    removed = purge(db, term)
+    db.commit()
+    registry.invalidate()
+    log(f"{term}: removed {removed[Review.__tablename__]} reviews and {removed[Rebuttal.__tablename__]} rebuttals from the live tables")
+    return entry
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Move closed terms into per-term archive databases.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    close_parser = commands.add_parser("close", help="archive a term, or finish an interrupted run")
+    close_parser.add_argument("term")
+    close_parser.add_argument("--wait", type=float, help="seconds to wait for workers between steps (ARCHIVE_REFRESH_SECONDS)")
+    commands.add_parser("list", help="show closed terms")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == "list":
+            for entry in db.scalars(select(ArchivedTerm).order_by(ArchivedTerm.term)):
+                state = f"archived {entry.archived_at:%Y-%m-%d %H:%M}" if entry.archived_at else "closing"
+                print(f"{entry.term}\t{state}\t{entry.review_count} reviews\t{entry.rebuttal_count} rebuttals\t{entry.url}")
+            return
+        try:
+            close(db, args.term, args.wait)
+        except ArchiveError as exc:
+            print(exc, file=sys.stderr)
+            sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
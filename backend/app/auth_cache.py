@@ -0,0 +1,142 @@
+"""Bounded cache of verified access tokens to the principal they identify.
+
+Entries live until the token expires or ``AUTH_CACHE_TTL_SECONDS`` passes,
+whichever comes first. Changing a user's role or email moves
+``users.token_valid_after`` forward, and deleting the user removes the row:
+every worker rereads that cutoff at most every ``AUTH_REVOCATION_TTL_SECONDS``
+(``RevocationCache``) and resolves tokens issued before it from ``users``
+again. ORM updates of ``User`` set the cutoff automatically; bulk
+``query.update()`` must set ``token_valid_after`` itself. ``invalidate_user``
+applies a change to the current worker at once.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, inspect
+
+from .config import settings
+from .models import RoleEnum, User
+
+
+class Principal(NamedTuple):
+    id: int
+    email: str
+    role: RoleEnum
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Principal, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Tuple[Principal, float]]:
+        """The cached principal and the time it was valid as of, if any."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, token: str, principal: Principal, expires_at: float, valid_at: float) -> None:
+        """Cache ``principal``, known to be current at ``valid_at`` (claim issue or lookup time)."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (min(expires_at, time.time() + self.ttl), principal, valid_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def invalidate_user(self, user_id: int, deleted: bool = False) -> None:
+        with self._lock:
+            for token in [token for token, (_, principal, _) in self._entries.items() if principal.id == user_id]:
+                del self._entries[token]
+        revocations.put(user_id, math.inf if deleted else time.time())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class RevocationCache:
+    """``users.token_valid_after`` per user as a timestamp, kept for ``ttl`` seconds.
+
+    Missing users map to infinity: no token of theirs is valid.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[float]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1]
+
+    def put(self, user_id: int, cutoff: float) -> None:
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, cutoff)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def cutoff_timestamp(valid_after: Optional[datetime]) -> float:
+    """``users.token_valid_after`` (naive UTC, like ``iat``) as a timestamp; 0 if never set."""
+    return valid_after.replace(tzinfo=timezone.utc).timestamp() if valid_after is not None else 0.0
+
+
+principal_cache = PrincipalCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+revocations = RevocationCache(settings.AUTH_CACHE_SIZE, settings.AUTH_REVOCATION_TTL_SECONDS)
+
+
+@event.listens_for(User, "before_update")
+def _revoke_on_update(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if state.attrs.role.history.has_changes() or state.attrs.email.history.has_changes():
+        target.token_valid_after = datetime.utcnow()
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_update(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if state.attrs.role.history.has_changes() or state.attrs.email.history.has_changes():
+        principal_cache.invalidate_user(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target: User) -> None:
+    principal_cache.invalidate_user(target.id, deleted=True)
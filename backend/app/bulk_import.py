@@ -0,0 +1,302 @@
+"""Batched bulk import of users, courses, professors and course assignments.
+
+Records are read lazily from CSV or NDJSON, validated in batches with one
+set-based lookup per batch, inserted with executemany-style statements and
+committed per batch. Invalid or duplicate rows are reported and skipped.
+
+    python -m app.bulk_import courses courses.csv
+    python -m app.bulk_import users users.ndjson --batch-size 2000
+
+CSV columns match the JSON field names. Professors take ``course_codes`` as a
+``;``-separated list in CSV or an array in NDJSON; assignments take
+``professor_id`` and ``course_code``.
+"""
+
+import argparse
+import csv
+import enum
+import json
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import admins, changes, migrations, schemas, versioning
+from .config import settings
+from .database import SessionLocal, engine
+from .models import Course, Professor, RoleEnum, User, course_professor_association
+from .security import hash_passwords
+
+MAX_REPORTED_ERRORS = 1000
+
+Record = Tuple[int, Optional[dict]]
+
+
+class ImportEntity(str, enum.Enum):
+    USERS = "users"
+    COURSES = "courses"
+    PROFESSORS = "professors"
+    ASSIGNMENTS = "assignments"
+
+
+class ProfessorImport(schemas.ProfessorBase):
+    user_id: Optional[int] = None
+    course_codes: List[str] = Field(default_factory=list)
+
+
+class AssignmentImport(BaseModel):
+    professor_id: int
+    course_code: str
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, line: int, detail: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "detail": detail})
+
+    def as_dict(self) -> dict:
+        return {"created": self.created, "failed": self.failed, "errors": self.errors}
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    if filename:
+        if filename.endswith(".csv"):
+            return "csv"
+        if filename.endswith((".ndjson", ".jsonl")):
+            return "ndjson"
+    return None
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Record]:
+    """Yield ``(line, record)`` pairs; ``record`` is ``None`` for unparsable lines."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if value not in ("", None)}
+    elif fmt == "ndjson":
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            yield line_no, record if isinstance(record, dict) else None
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _validated(records: Iterable[Record], model, result: ImportResult) -> Iterator[Tuple[int, BaseModel]]:
+    for line, record in records:
+        if record is None:
+            result.fail(line, "Malformed record")
+            continue
+        if model is ProfessorImport and isinstance(record.get("course_codes"), str):
+            record["course_codes"] = [code.strip() for code in record["course_codes"].split(";") if code.strip()]
+        try:
+            yield line, model(**record)
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            result.fail(line, f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}")
+
+
+def _insert_rows(db: Session, table, rows: List[Tuple[int, dict]], result: ImportResult, conflict: str) -> List[dict]:
+    """Insert ``(line, row)`` pairs in one statement; return the rows stored.
+
+    The callers' duplicate checks run before the insert, so a concurrent
+    request can still store a conflicting row first. Then the batch is retried
+    row by row, each in a savepoint, and the conflicting lines fail.
+    """
+    if not rows:
+        return []
+    try:
+        with db.begin_nested():
+            db.execute(insert(table), [row for _, row in rows])
+        return [row for _, row in rows]
+    except IntegrityError:
+        pass
+    stored = []
+    for line, row in rows:
+        try:
+            with db.begin_nested():
+                db.execute(insert(table), row)
+        except IntegrityError:
+            result.fail(line, conflict)
+            continue
+        stored.append(row)
+    return stored
+
+
+def _insert_users(db: Session, batch, result: ImportResult) -> None:
+    existing = set(db.scalars(select(User.email).where(User.email.in_({user.email for _, user in batch}))))
+    accepted = []
+    for line, user in batch:
+        if user.email in existing:
+            result.fail(line, "Email already registered")
+            continue
+        existing.add(user.email)
+        accepted.append((line, user))
+    if not accepted:
+        return
+    hashes = hash_passwords([user.password for _, user in accepted])
+    if any(user.role == RoleEnum.ADMIN for _, user in accepted):
+        admins.guard(db)
+    rows = [
+        (line, {"email": user.email, "name": user.name, "role": user.role, "hashed_password": hashed})
+        for (line, user), hashed in zip(accepted, hashes)
+    ]
+    result.created += len(_insert_rows(db, User.__table__, rows, result, "Email already registered"))
+
+
+def _insert_courses(db: Session, batch, result: ImportResult) -> None:
+    existing = set(db.scalars(select(Course.code).where(Course.code.in_({course.code for _, course in batch}))))
+    rows = []
+    for line, course in batch:
+        if course.code in existing:
+            result.fail(line, "Course code already exists")
+            continue
+        existing.add(course.code)
+        rows.append((line, course.dict()))
+    stored = _insert_rows(db, Course.__table__, rows, result, "Course code already exists")
+    if stored:
+        new_ids = _course_ids_by_code(db, [row["code"] for row in stored]).values()
+        changes.record(db, changes.COURSE, changes.CREATED, sorted(new_ids))
+        result.created += len(stored)
+
+
+def _course_ids_by_code(db: Session, codes) -> dict:
+    return dict(db.execute(select(Course.code, Course.id).where(Course.code.in_(set(codes)))).all())
+
+
+def _insert_professors(db: Session, batch, result: ImportResult) -> None:
+    course_ids = _course_ids_by_code(db, [code for _, professor in batch for code in professor.course_codes])
+    user_ids = {professor.user_id for _, professor in batch if professor.user_id is not None}
+    professor_accounts = set(db.scalars(select(User.id).where(User.id.in_(user_ids), User.role == RoleEnum.PROFESSOR)))
+    linked_accounts = set(db.scalars(select(Professor.user_id).where(Professor.user_id.in_(user_ids))))
+    accepted = []
+    for line, professor in batch:
+        if professor.user_id is not None:
+            if professor.user_id not in professor_accounts:
+                result.fail(line, "Invalid professor account")
+                continue
+            if professor.user_id in linked_accounts:
+                result.fail(line, "Professor account already linked")
+                continue
+            linked_accounts.add(professor.user_id)
+        unknown = [code for code in professor.course_codes if code not in course_ids]
+        if unknown:
+            result.fail(line, f"Unknown course codes: {', '.join(unknown)}")
+            continue
+        accepted.append(professor)
+    if not accepted:
+        return
+    new_ids = db.scalars(
+        insert(Professor).returning(Professor.id, sort_by_parameter_order=True),
+        [{"name": p.name, "department": p.department, "user_id": p.user_id} for p in accepted],
+    ).all()
+    changes.record(db, changes.PROFESSOR, changes.CREATED, new_ids)
+    links = {
+        (professor_id, course_ids[code])
+        for professor_id, professor in zip(new_ids, accepted)
+        for code in professor.course_codes
+    }
+    if links:
+        db.execute(
+            insert(course_professor_association),
+            [{"professor_id": professor_id, "course_id": course_id} for professor_id, course_id in links],
+        )
+    result.created += len(accepted)
+
+
+def _insert_assignments(db: Session, batch, result: ImportResult) -> None:
+    course_ids = _course_ids_by_code(db, [assignment.course_code for _, assignment in batch])
+    professor_ids = {assignment.professor_id for _, assignment in batch}
+    known_professors = set(db.scalars(select(Professor.id).where(Professor.id.in_(professor_ids))))
+    association = course_professor_association
+    existing = set(
+        db.execute(
+            select(association.c.professor_id, association.c.course_id).where(
+                association.c.professor_id.in_(professor_ids)
+            )
+        ).all()
+    )
+    rows = []
+    for line, assignment in batch:
+        if assignment.professor_id not in known_professors:
+            result.fail(line, "Professor not found")
+            continue
+        if assignment.course_code not in course_ids:
+            result.fail(line, "Unknown course code")
+            continue
+        pair = (assignment.professor_id, course_ids[assignment.course_code])
+        if pair in existing:
+            result.fail(line, "Course already assigned")
+            continue
+        existing.add(pair)
+        rows.append((line, {"professor_id": pair[0], "course_id": pair[1]}))
+    stored = _insert_rows(db, association, rows, result, "Course already assigned")
+    if stored:
+        changes.record(db, changes.PROFESSOR, changes.UPDATED, sorted({row["professor_id"] for row in stored}))
+        result.created += len(stored)
+
+
+IMPORTERS: dict = {
+    ImportEntity.USERS: (schemas.UserCreate, _insert_users, ()),
+    ImportEntity.COURSES: (schemas.CourseCreate, _insert_courses, (versioning.COURSES,)),
+    ImportEntity.PROFESSORS: (ProfessorImport, _insert_professors, (versioning.PROFESSORS,)),
+    ImportEntity.ASSIGNMENTS: (AssignmentImport, _insert_assignments, (versioning.PROFESSORS,)),
+}
+
+
+def run_import(db: Session, entity: ImportEntity, records: Iterable[Record], batch_size: Optional[int] = None) -> ImportResult:
+    """Validate and insert ``records``, committing after every batch."""
+    model, insert_batch, scopes = IMPORTERS[entity]
+    batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+    result = ImportResult()
+    validated = _validated(records, model, result)
+    while True:
+        batch = list(islice(validated, batch_size))
+        if not batch:
+            break
+        created = result.created
+        insert_batch(db, batch, result)
+        if result.created > created:
+            versioning.bump(db, *scopes)
+        db.commit()
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk import OpenRater records from CSV or NDJSON.")
+    parser.add_argument("entity", choices=[entity.value for entity in ImportEntity])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=settings.BULK_IMPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("cannot infer format from file name, pass --format")
+
+    migrations.migrate(engine)
+    db = SessionLocal()
+    try:
+        with open(args.path, newline="", encoding="utf-8") as stream:
+            result = run_import(db, ImportEntity(args.entity), read_records(stream, fmt), args.batch_size)
+    finally:
+        db.close()
+    print(f"Created {result.created}, failed {result.failed}.")
+    for error in result.errors:
+        print(f"  line {error['line']}: {error['detail']}")
+
+
+if __name__ == "__main__":
+    main()
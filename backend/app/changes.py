@@ -0,0 +1,223 @@
+"""Append-only change log behind ``GET /changes``.
+
+Every create and update of a course, professor, review or rebuttal calls
+``record`` inside the writer's own transaction, so an entry exists exactly
+when its change committed. Entries are numbered by ``seq``. Review and rebuttal
+entries also name the owning professor and reviewer, and ``feed`` filters on
+those so each role sees what its list routes show. Entries carry the entity's
+current state, read with the ``fast_reads`` column readers, so clients apply
+them as upserts keyed by ``(entity, entity_id)``. A new rebuttal is logged as
+a rebuttal create plus an update of the review that embeds it.
+
+A client calls ``GET /changes`` without ``since`` to learn the head, loads the
+collections, then polls ``since=<next>``. ``compact`` (``python -m
+app.changes``, e.g. from cron) drops entries superseded by a later one for the
+same entity, which no client needs, and entries older than
+``CHANGES_RETENTION_DAYS``. The highest seq removed for age becomes the
+horizon; a feed starting below it raises ``ChangesCompacted`` and the client
+reloads.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete, exists, func, insert, literal, null, or_, select, text
+from sqlalchemy.orm import Session
+
+from . import archive, fast_reads
+from .config import settings
+from .database import SessionLocal
+from .models import ChangeLogCompaction, ChangeLogEntry, Course, Professor, Rebuttal, Review
+
+COURSE = "course"
+PROFESSOR = "professor"
+REVIEW = "review"
+REBUTTAL = "rebuttal"
+
+CREATED = "created"
+UPDATED = "updated"
+
+# Held until commit on PostgreSQL so entries become visible in seq order; SQLite has one writer anyway.
+_PG_LOCK_KEY = 0x6368616E
+
+
+class ChangesCompacted(Exception):
+    def __init__(self, horizon: int):
+        super().__init__(f"Changes up to {horizon} have been compacted")
+        self.horizon = horizon
+
+
+def record(
+    db: Session,
+    entity: str,
+    operation: str,
+    entity_ids: Iterable[int],
+    professor_id: Optional[int] = None,
+    reviewer_id: Optional[int] = None,
+) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {
+            "entity": entity,
+            "entity_id": entity_id,
+            "operation": operation,
+            "professor_id": professor_id,
+            "reviewer_id": reviewer_id,
+            "created_at": now,
+        }
+        for entity_id in entity_ids
+    ]
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_LOCK_KEY})
+    db.execute(insert(ChangeLogEntry.__table__), rows)
+
+
+def visible_to(reviewer_id: Optional[int] = None, professor_id: Optional[int] = None):
+    """Filter for a non-admin: course and professor entries, plus review and rebuttal entries they own."""
+    entries = ChangeLogEntry.__table__
+    owned = []
+    if reviewer_id is not None:
+        owned.append(entries.c.reviewer_id == reviewer_id)
+    if professor_id is not None:
+        owned.append(entries.c.professor_id == professor_id)
+    return or_(entries.c.professor_id.is_(None), *owned)
+
+
+def horizon(db: Session) -> int:
+    return db.scalar(select(func.max(ChangeLogCompaction.horizon))) or 0
+
+
+def head(db: Session) -> int:
+    return db.scalar(select(func.max(ChangeLogEntry.seq))) or 0
+
+
+def feed(db: Session, since: Optional[int], limit: int, condition=None) -> dict:
+    """Entries after ``since`` matching ``condition``, oldest first, with the ``since`` to poll next."""
+    if since is None:
+        return {"changes": [], "next": head(db), "has_more": False}
+    compacted = horizon(db)
+    if since < compacted:
+        raise ChangesCompacted(compacted)
+    # Read the head first and stop there: an entry committing after this point is
+    # left for the next poll instead of being skipped by a head read after the rows.
+    last = head(db)
+    entries = ChangeLogEntry.__table__
+    statement = select(entries).where(entries.c.seq > since, entries.c.seq <= last)
+    if condition is not None:
+        statement = statement.where(condition)
+    rows = db.execute(statement.order_by(entries.c.seq).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    # Skip past entries this caller cannot see, so the next poll does not rescan them.
+    next_seq = rows[-1].seq if has_more else max(last, since)
+    states = _states(db, rows)
+    changes = [
+        {
+            "seq": row.seq,
+            "entity": row.entity,
+            "entity_id": row.entity_id,
+            "operation": row.operation,
+            "created_at": row.created_at,
+            "data": states[row.entity].get(row.entity_id),
+        }
+        for row in rows
+    ]
+    return {"changes": changes, "next": next_seq, "has_more": has_more}
+
+
+def _states(db: Session, rows) -> Dict[str, Dict[int, dict]]:
+    """Current state of every entity in ``rows``, shaped like the list routes' items."""
+    ids = defaultdict(set)
+    for row in rows:
+        ids[row.entity].add(row.entity_id)
+    states: Dict[str, Dict[int, dict]] = defaultdict(dict)
+    if ids[COURSE]:
+        courses = db.execute(select(*fast_reads.COURSE_COLUMNS).where(Course.id.in_(ids[COURSE])))
+        states[COURSE] = {course["id"]: course for course in map(fast_reads.course_dict, courses)}
+    if ids[PROFESSOR]:
+        states[PROFESSOR] = {professor["id"]: professor for professor in fast_reads.professors(db, ids[PROFESSOR])}
+    readers = {
+        REVIEW: lambda session, missing: map(
+            fast_reads.review_dict, session.execute(fast_reads.reviews_statement().where(Review.id.in_(missing)))
+        ),
+        REBUTTAL: lambda session, missing: map(
+            fast_reads.rebuttal_dict, session.execute(select(*fast_reads.REBUTTAL_COLUMNS).where(Rebuttal.id.in_(missing)))
+        ),
+    }
+    for entity, read in readers.items():
+        if not ids[entity]:
+            continue
+        states[entity] = {item["id"]: item for item in read(db, ids[entity])}
+        missing = ids[entity] - states[entity].keys()
+        if missing:
+            # Reviews and rebuttals of closed terms live on in their archives.
+            with archive.archives(db) as sessions:
+                for session in sessions:
+                    states[entity].update((item["id"], item) for item in read(session, missing))
+    return states
+
+
+def compact(db: Session, retention: Optional[timedelta] = None, now: Optional[datetime] = None) -> dict:
+    """Drop superseded entries and those older than ``retention``; record the new horizon."""
+    entries = ChangeLogEntry.__table__
+    newer = entries.alias("newer")
+    superseded = db.execute(
+        delete(entries).where(
+            exists().where(
+                newer.c.entity == entries.c.entity,
+                newer.c.entity_id == entries.c.entity_id,
+                newer.c.seq > entries.c.seq,
+            )
+        )
+    ).rowcount
+    cutoff = (now or datetime.utcnow()) - (retention or timedelta(days=settings.CHANGES_RETENTION_DAYS))
+    previous = horizon(db)
+    expired_through = db.scalar(select(func.max(entries.c.seq)).where(entries.c.created_at < cutoff))
+    expired = 0
+    if expired_through is not None and expired_through > previous:
+        expired = db.execute(delete(entries).where(entries.c.seq <= expired_through)).rowcount
+    new_horizon = max(previous, expired_through or 0)
+    if superseded or expired:
+        db.add(ChangeLogCompaction(horizon=new_horizon, removed=superseded + expired))
+    return {"superseded": superseded, "expired": expired, "horizon": new_horizon}
+
+
+def backfill(db) -> None:
+    """Log existing rows as created, so a feed from ``since=0`` covers data older than the log."""
+    entries = ChangeLogEntry.__table__
+    if db.execute(select(entries.c.seq).limit(1)).first() is not None:
+        return
+    now = literal(datetime.utcnow())
+    columns = ["entity", "entity_id", "operation", "professor_id", "reviewer_id", "created_at"]
+    sources = [
+        select(literal(COURSE), Course.id, literal(CREATED), null(), null(), now).order_by(Course.id),
+        select(literal(PROFESSOR), Professor.id, literal(CREATED), null(), null(), now).order_by(Professor.id),
+        select(literal(REVIEW), Review.id, literal(CREATED), Review.professor_id, Review.reviewer_id, now).order_by(
+            Review.id
+        ),
+        select(literal(REBUTTAL), Rebuttal.id, literal(CREATED), Review.professor_id, Review.reviewer_id, now)
+        .join(Review, Review.id == Rebuttal.review_id)
+        .order_by(Rebuttal.id),
+    ]
+    for source in sources:
+        db.execute(insert(entries).from_select(columns, source))
+
+
+def main() -> None:
+    db = SessionLocal()
+    try:
+        result = compact(db)
+        db.commit()
+        print(
+            f"Removed {result['superseded']} superseded and {result['expired']} expired changes; "
+            f"feeds must start at or after {result['horizon']}."
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,98 @@ from datetime import timedelta
 class Settings:
     PROJECT_NAME: str = "OpenRater"
     SECRET_KEY: str = os.getenv("OPENRATER_SECRET_KEY", "supersecretkeychange")
+    # Keys the permutation behind anonymous review IDs; must never change once reviews exist.
+    ANON_ID_KEY: str = os.getenv("OPENRATER_ANON_ID_KEY", "openrater-anon-id")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("OPENRATER_TOKEN_MINUTES", "60"))
     DATABASE_URL: str = os.getenv("OPENRATER_DATABASE_URL", "sqlite:///./openrater.db")
+    # Serve database-bound routes from an AsyncEngine (aiosqlite / asyncpg) instead of the threadpool.
+    ASYNC_DATABASE: bool = os.getenv("OPENRATER_ASYNC_DB", "false").lower() in ("1", "true", "yes")
+    ASYNC_DATABASE_URL: str = os.getenv("OPENRATER_ASYNC_DATABASE_URL", "")
+    # Optional read replica for GET/HEAD requests; reads use DATABASE_URL when unset.
+    READ_DATABASE_URL: str = os.getenv("OPENRATER_READ_DATABASE_URL", "")
+    ASYNC_READ_DATABASE_URL: str = os.getenv("OPENRATER_ASYNC_READ_DATABASE_URL", "")
+    # SQLite profile, applied as PRAGMAs on every new connection.
+    SQLITE_JOURNAL_MODE: str = os.getenv("OPENRATER_SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("OPENRATER_SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("OPENRATER_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE: int = int(os.getenv("OPENRATER_SQLITE_CACHE_SIZE", "-64000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("OPENRATER_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # PostgreSQL profile: connection pool sizing.
+    DB_POOL_SIZE: int = int(os.getenv("OPENRATER_DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("OPENRATER_DB_MAX_OVERFLOW", "20"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("OPENRATER_DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("OPENRATER_DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # Apply pending migrations at startup instead of refusing to start; on by default for SQLite development databases.
+    AUTO_MIGRATE: bool = os.getenv(
+        "OPENRATER_AUTO_MIGRATE", "true" if DATABASE_URL.startswith("sqlite") else "false"
+    ).lower() in ("1", "true", "yes")
+    WARMUP: bool = os.getenv("OPENRATER_WARMUP", "true").lower() in ("1", "true", "yes")
+    WARMUP_CONNECTIONS: int = int(os.getenv("OPENRATER_WARMUP_CONNECTIONS", "4"))
+    # Token buckets per "METHOD /route/path", as "<requests>/<second|minute|hour|day>", separated by ";".
+    RATE_LIMITS: str = os.getenv(
+        "OPENRATER_RATE_LIMITS",
+        "POST /auth/token=10/minute;POST /auth/register=30/minute;POST /auth/bootstrap=5/minute;"
+        "POST /reviews=20/minute;POST /reviews/{review_id}/rebuttal=20/minute;GET /reviews/search=60/minute;"
+        "POST /bulk/{entity}=10/hour;GET /export/reviews=10/hour",
+    )
+    RATE_LIMIT_ENABLED: bool = os.getenv("OPENRATER_RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+    # "memory" keeps buckets per worker; a redis:// URL shares them across workers (needs the redis package).
+    RATE_LIMIT_BACKEND: str = os.getenv("OPENRATER_RATE_LIMIT_BACKEND", "memory")
+    # "memory" fans events out within one worker; a redis:// URL relays them between workers (needs the redis package).
+    EVENTS_BROKER: str = os.getenv("OPENRATER_EVENTS_BROKER", "memory")
+    EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv("OPENRATER_EVENTS_HEARTBEAT_SECONDS", "15"))
+    # Events buffered per subscriber before a slow consumer is disconnected.
+    EVENTS_QUEUE_SIZE: int = int(os.getenv("OPENRATER_EVENTS_QUEUE_SIZE", "100"))
+    # Group-commit review and rebuttal inserts through one writer thread (see app.write_queue).
+    WRITE_QUEUE: bool = os.getenv("OPENRATER_WRITE_QUEUE", "false").lower() in ("1", "true", "yes")
+    WRITE_QUEUE_MAX_BATCH: int = int(os.getenv("OPENRATER_WRITE_QUEUE_MAX_BATCH", "64"))
+    WRITE_QUEUE_MAX_DELAY_MS: float = float(os.getenv("OPENRATER_WRITE_QUEUE_MAX_DELAY_MS", "2"))
+    BCRYPT_ROUNDS: int = int(os.getenv("OPENRATER_BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("OPENRATER_PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE: int = int(os.getenv("OPENRATER_PASSWORD_HASH_QUEUE", "32"))
+    BULK_IMPORT_BATCH_SIZE: int = int(os.getenv("OPENRATER_BULK_IMPORT_BATCH_SIZE", "1000"))
+    # "trigram" matches substrings, which also works for CJK text; requires SQLite >= 3.34.
+    SEARCH_TOKENIZER: str = os.getenv("OPENRATER_SEARCH_TOKENIZER", "trigram")
+    SEARCH_PG_CONFIG: str = os.getenv("OPENRATER_SEARCH_PG_CONFIG", "simple")
+    # Bearer token Prometheus sends to scrape GET /metrics; the endpoint answers 404 while this is unset.
+    METRICS_TOKEN: str = os.getenv("OPENRATER_METRICS_TOKEN", "")
+    SLOW_QUERY_MS: float = float(os.getenv("OPENRATER_SLOW_QUERY_MS", "200"))
+    AUTH_CACHE_SIZE: int = int(os.getenv("OPENRATER_AUTH_CACHE_SIZE", "10000"))
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("OPENRATER_AUTH_CACHE_TTL", "300"))
+    # How long a worker trusts its copy of a user's token_valid_after before rereading it.
+    AUTH_REVOCATION_TTL_SECONDS: float = float(os.getenv("OPENRATER_AUTH_REVOCATION_TTL", "5"))
+    # Weight of the prior mean in Bayesian-smoothed rankings, in reviews; rebuild rankings after changing it.
+    RANKING_PRIOR_WEIGHT: float = float(os.getenv("OPENRATER_RANKING_PRIOR_WEIGHT", "10"))
+    # How often each worker applies the change log to its public snapshot (see app.public).
+    PUBLIC_REFRESH_SECONDS: float = float(os.getenv("OPENRATER_PUBLIC_REFRESH_SECONDS", "1"))
+    PUBLIC_CACHE_MAX_AGE: int = int(os.getenv("OPENRATER_PUBLIC_CACHE_MAX_AGE", "5"))
+    # Where `python -m app.archive close <term>` puts a closed term's reviews; "{term}" is replaced by the term.
+    ARCHIVE_URL: str = os.getenv("OPENRATER_ARCHIVE_URL", "sqlite:///./archive/{term}.db")
+    # How often each worker rereads the list of closed terms; closing a term waits this long between steps.
+    ARCHIVE_REFRESH_SECONDS: float = float(os.getenv("OPENRATER_ARCHIVE_REFRESH_SECONDS", "10"))
+    # GET /changes entries older than this are dropped by `python -m app.changes`.
+    CHANGES_RETENTION_DAYS: float = float(os.getenv("OPENRATER_CHANGES_RETENTION_DAYS", "30"))
+    PAGE_SIZE_MAX: int = int(os.getenv("OPENRATER_PAGE_SIZE_MAX", "500"))
+    STREAM_CHUNK_SIZE: int = int(os.getenv("OPENRATER_STREAM_CHUNK_SIZE", "500"))
 
     @property
     def access_token_expires(self) -> timedelta:
         return timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES)
 
+    @property
+    def async_database_url(self) -> str:
+        return self.ASYNC_DATABASE_URL or async_driver_url(self.DATABASE_URL)
+
+    @property
+    def async_read_database_url(self) -> str:
+        return self.ASYNC_READ_DATABASE_URL or async_driver_url(self.READ_DATABASE_URL)
+
+
+def async_driver_url(url: str) -> str:
+    for prefix, driver in (("sqlite://", "sqlite+aiosqlite://"), ("postgresql://", "postgresql+asyncpg://")):
+        if url.startswith(prefix):
+            return driver + url[len(prefix):]
+    return url
+
 
 settings = Settings()
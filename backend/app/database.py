@@ -1,18 +1,114 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 from .config import settings
+from .metrics import instrument_engine
 
-engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
-)
+READ_METHODS = {"GET", "HEAD"}
+
+
+def _engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    }
+
+
+def _apply_sqlite_pragmas(engine) -> None:
+    pragmas = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+    }
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, "savepoint")
+    def _on_savepoint(conn, name):
+        # pysqlite opens a transaction only before DML, so a SAVEPOINT issued first
+        # would start one of its own and its RELEASE would commit. Savepoints here
+        # always precede writes: open the real transaction with the write lock.
+        dbapi_connection = conn.connection.dbapi_connection
+        # The aiosqlite adapter keeps the sqlite3-style connection one level down.
+        if not getattr(dbapi_connection, "_connection", dbapi_connection).in_transaction:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _configure(engine, url: str, name: str):
+    if url.startswith("sqlite"):
+        _apply_sqlite_pragmas(engine)
+    instrument_engine(engine, name)
+    return engine
+
+
+class ReadOnlySession(Session):
+    """Session for GET requests; refuses to flush so writes never reach a replica."""
+
+
+@event.listens_for(ReadOnlySession, "before_flush")
+def _forbid_writes(session, flush_context, instances) -> None:
+    raise RuntimeError("Attempted to flush changes through a read-only session")
+
+
+def make_engine(url: str, name: str):
+    """Create an engine with the connection profile and instrumentation of the primary one."""
+    return _configure(create_engine(url, **_engine_options(url)), url, name)
+
+
+def make_async_engine(url: str, name: str):
+    """``make_engine`` for an async driver URL."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    created = create_async_engine(url, **_engine_options(url))
+    _configure(created.sync_engine, url, name)
+    return created
+
+
+engine = make_engine(settings.DATABASE_URL, "primary")
+read_engine = make_engine(settings.READ_DATABASE_URL, "replica") if settings.READ_DATABASE_URL else engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, class_=ReadOnlySession)
 Base = declarative_base()
 
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if settings.ASYNC_DATABASE:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = make_async_engine(settings.async_database_url, "primary")
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+    async_read_engine = (
+        make_async_engine(settings.async_read_database_url, "replica") if settings.READ_DATABASE_URL else async_engine
+    )
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, sync_session_class=ReadOnlySession)
+
 
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    """Yield a session for the request; GET and HEAD requests get a read-only one."""
+    db = ReadSessionLocal() if request.method in READ_METHODS else SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request):
+    factory = AsyncReadSessionLocal if request.method in READ_METHODS else AsyncSessionLocal
+    async with factory() as db:
+        yield db
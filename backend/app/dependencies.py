@@ -1,15 +1,74 @@
+import math
+import time
+
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 
-from . import models
-from .database import get_db
+from . import database, models
+from .auth_cache import Principal, cutoff_timestamp, principal_cache, revocations
+from .config import settings
 from .security import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+def _load_principal_sync(email: str) -> Optional[Principal]:
+    db = database.SessionLocal()
+    try:
+        user = db.execute(select(models.User).where(models.User.email == email)).scalar_one_or_none()
+        return Principal(user.id, user.email, user.role) if user else None
+    finally:
+        db.close()
+
+
+async def load_principal(email: str) -> Optional[Principal]:
+    """Resolve a principal from ``users`` without blocking the event loop."""
+    if settings.ASYNC_DATABASE:
+        async with database.AsyncSessionLocal() as db:
+            user = (await db.execute(select(models.User).where(models.User.email == email))).scalar_one_or_none()
+            return Principal(user.id, user.email, user.role) if user else None
+    return await run_in_threadpool(_load_principal_sync, email)
+
+
+def _cutoff_statement(user_id: int):
+    return select(models.User.id, models.User.token_valid_after).where(models.User.id == user_id)
+
+
+def _load_cutoff_sync(user_id: int) -> float:
+    db = database.SessionLocal()
+    try:
+        row = db.execute(_cutoff_statement(user_id)).first()
+    finally:
+        db.close()
+    return cutoff_timestamp(row.token_valid_after) if row else math.inf
+
+
+async def token_cutoff(user_id: int) -> float:
+    """Tokens of ``user_id`` valid before this time no longer speak for the user (``users.token_valid_after``)."""
+    cutoff = revocations.get(user_id)
+    if cutoff is not None:
+        return cutoff
+    if settings.ASYNC_DATABASE:
+        async with database.AsyncSessionLocal() as db:
+            row = (await db.execute(_cutoff_statement(user_id))).first()
+        cutoff = cutoff_timestamp(row.token_valid_after) if row else math.inf
+    else:
+        cutoff = await run_in_threadpool(_load_cutoff_sync, user_id)
+    revocations.put(user_id, cutoff)
+    return cutoff
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
+    cached = principal_cache.get(token)
+    if cached is not None:
+        principal, valid_at = cached
+        if valid_at > await token_cutoff(principal.id):
+            return principal
+        principal_cache.discard(token)
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -21,14 +80,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     email = payload.get("sub")
     if email is None:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
-        raise credentials_exception
-    return user
+    user_id, role, issued_at = payload.get("uid"), payload.get("role"), payload.get("iat", 0)
+    if user_id is None or role is None or issued_at <= await token_cutoff(user_id):
+        # Tokens without principal claims, or issued before the user changed, fall back to the database.
+        valid_at = time.time()
+        principal = await load_principal(email)
+        if principal is None:
+            raise credentials_exception
+    else:
+        try:
+            principal = Principal(user_id, email, models.RoleEnum(role))
+        except ValueError:
+            raise credentials_exception
+        valid_at = issued_at
+    principal_cache.put(token, principal, payload["exp"], valid_at)
+    return principal
 
 
 def require_role(*roles: models.RoleEnum):
-    def dependency(user: models.User = Depends(get_current_user)) -> models.User:
+    def dependency(user: Principal = Depends(get_current_user)) -> Principal:
         if user.role not in roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
         return user
@@ -0,0 +1,229 @@
+"""Server-sent events for new reviews and rebuttals.
+
+Dashboards open ``GET /events`` and receive ``review.created`` and
+``rebuttal.created`` events instead of re-fetching whole lists. Each
+authenticated user listens on their own channel, ``user:<id>``: a professor
+account hears about reviews of the professor it is linked to, a reviewer about
+their own reviews and rebuttals to them.
+
+Routes ``publish`` after their transaction commits. The ``EventBroker``
+carries the message to every worker; each worker's ``Hub`` fans it out to the
+streams open in that worker. ``MemoryBroker`` only reaches the local hub;
+``RedisBroker`` relays through Redis pub/sub for multi-worker deployments.
+
+Every stream gets a bounded queue. A client that stops reading until its queue
+fills is sent a ``reset`` event and disconnected rather than buffering without
+limit; it should reload its lists and reconnect. Idle streams get a comment
+line every ``EVENTS_HEARTBEAT_SECONDS`` so proxies keep them open; each
+heartbeat also checks for a disconnect, since not every server fails the
+write to a closed connection.
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from .config import settings
+from .metrics import EVENT_SUBSCRIBERS, EVENTS_DROPPED
+from .models import Rebuttal, Review
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = ": heartbeat\n\n"
+# Client reconnect delay sent with the first frame.
+RETRY_MS = 3000
+
+
+def format_event(kind: str, data: dict) -> str:
+    return f"event: {kind}\ndata: {json.dumps(data, default=_default, separators=(',', ':'))}\n\n"
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class Subscriber:
+    def __init__(self, maxsize: int):
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, message: str) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            EVENTS_DROPPED.inc()
+
+
+class Hub:
+    """Open streams in this worker, by channel. Only touched from the event loop."""
+
+    def __init__(self):
+        self._channels: Dict[str, Set[Subscriber]] = defaultdict(set)
+
+    def subscribe(self, channel: str, maxsize: Optional[int] = None) -> Subscriber:
+        subscriber = Subscriber(maxsize or settings.EVENTS_QUEUE_SIZE)
+        self._channels[channel].add(subscriber)
+        EVENT_SUBSCRIBERS.inc()
+        return subscriber
+
+    def unsubscribe(self, channel: str, subscriber: Subscriber) -> None:
+        subscribers = self._channels.get(channel)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._channels[channel]
+        EVENT_SUBSCRIBERS.dec()
+
+    def dispatch(self, channel: str, message: str) -> None:
+        for subscriber in tuple(self._channels.get(channel, ())):
+            subscriber.offer(message)
+
+
+class EventBroker(ABC):
+    @abstractmethod
+    async def publish(self, channel: str, message: str) -> None:
+        """Deliver ``message`` to the streams on ``channel`` in every worker."""
+
+    async def start(self, hub: Hub) -> None:
+        """Begin delivering published messages to ``hub``; called once per worker."""
+
+    async def stop(self) -> None:
+        pass
+
+
+class MemoryBroker(EventBroker):
+    """Delivers to the local hub only; enough for a single worker."""
+
+    def __init__(self):
+        self._hub: Optional[Hub] = None
+
+    async def start(self, hub: Hub) -> None:
+        self._hub = hub
+
+    async def publish(self, channel: str, message: str) -> None:
+        if self._hub is not None:
+            self._hub.dispatch(channel, message)
+
+
+class RedisBroker(EventBroker):
+    """Relays through Redis pub/sub so a stream hears events published by any worker."""
+
+    def __init__(self, url: str, prefix: str = "openrater:events:"):
+        import redis.asyncio
+
+        self.prefix = prefix
+        self._client = redis.asyncio.Redis.from_url(url)
+        self._listener: Optional[asyncio.Task] = None
+
+    async def publish(self, channel: str, message: str) -> None:
+        await self._client.publish(self.prefix + channel, message)
+
+    async def start(self, hub: Hub) -> None:
+        pubsub = self._client.pubsub()
+        await pubsub.psubscribe(self.prefix + "*")
+        self._listener = asyncio.create_task(self._listen(pubsub, hub))
+
+    async def _listen(self, pubsub, hub: Hub) -> None:
+        try:
+            while True:
+                try:
+                    async for item in pubsub.listen():
+                        if item["type"] == "pmessage":
+                            hub.dispatch(item["channel"].decode()[len(self.prefix) :], item["data"].decode())
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Event relay from Redis failed; resubscribing")
+                    await asyncio.sleep(1)
+                    await pubsub.psubscribe(self.prefix + "*")
+        finally:
+            await pubsub.aclose()
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        await self._client.aclose()
+
+
+def create_broker(spec: str) -> EventBroker:
+    if spec == "memory":
+        return MemoryBroker()
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(spec)
+    raise ValueError(f"Unknown event broker {spec!r}")
+
+
+hub = Hub()
+broker = create_broker(settings.EVENTS_BROKER)
+
+
+async def start() -> None:
+    await broker.start(hub)
+
+
+async def stop() -> None:
+    await broker.stop()
+
+
+async def publish(user_ids: Iterable[Optional[int]], kind: str, data: dict) -> None:
+    message = format_event(kind, data)
+    for user_id in {user_id for user_id in user_ids if user_id is not None}:
+        try:
+            await broker.publish(user_channel(user_id), message)
+        except Exception:
+            # The write is already committed; a lost notification only delays a dashboard refresh.
+            logger.exception("Publishing %s to user %s failed", kind, user_id)
+
+
+def review_created(review: Review) -> dict:
+    # No reviewer_id: professors receive this payload.
+    return {
+        "review_id": review.id,
+        "anon_id": review.anon_id,
+        "professor_id": review.professor_id,
+        "course_id": review.course_id,
+        "created_at": review.created_at,
+    }
+
+
+def rebuttal_created(rebuttal: Rebuttal) -> dict:
+    return {"rebuttal_id": rebuttal.id, "review_id": rebuttal.review_id, "created_at": rebuttal.created_at}
+
+
+async def stream(
+    channel: str, is_disconnected: Callable[[], Awaitable[bool]], heartbeat: Optional[float] = None
+) -> AsyncIterator[str]:
+    """Yield SSE frames for ``channel`` until the client disconnects or falls behind."""
+    heartbeat = heartbeat or settings.EVENTS_HEARTBEAT_SECONDS
+    subscriber = hub.subscribe(channel)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            if subscriber.overflowed:
+                yield format_event("reset", {"reason": "slow consumer"})
+                return
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                yield HEARTBEAT
+                continue
+            yield message
+    finally:
+        hub.unsubscribe(channel, subscriber)
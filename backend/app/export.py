@@ -0,0 +1,191 @@
+"""Streaming export of reviews for analytics.
+
+Each review is flattened with its scores, course, term, professor and rebuttal
+status and written as NDJSON or CSV. Rows are read through a server-side
+cursor in ``STREAM_CHUNK_SIZE`` batches, so memory use does not grow with the
+table. Closed terms are read from their archives (``app.archive``) and
+merged in creation order.
+
+Every export reports the change-log head (``app.changes``) it was taken at.
+Passing that back as ``since`` exports only the reviews created or updated
+after it, including those that gained a rebuttal, so nightly jobs fetch what
+changed and upsert it by ``review_id``.
+
+    python -m app.export reviews.ndjson
+    python -m app.export reviews.ndjson --since 1042
+    python -m app.export - --format csv > reviews.csv
+"""
+
+import argparse
+import csv
+import enum
+import io
+import json
+import sys
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from . import archive, changes
+from .config import settings
+from .database import ReadSessionLocal
+from .models import ChangeLogEntry, Course, Professor, Rebuttal, Review
+
+COLUMNS = (
+    Review.id.label("review_id"),
+    Review.anon_id,
+    Review.created_at,
+    Review.reviewer_id,
+    Review.professor_id,
+    Professor.name.label("professor_name"),
+    Professor.department,
+    Review.course_id,
+    Course.code.label("course_code"),
+    Course.name.label("course_name"),
+    Course.term,
+    Review.fairness,
+    Review.clarity,
+    Review.engagement,
+    Review.workload,
+    Review.confidence,
+    Review.summary,
+    Review.strengths,
+    Review.weaknesses,
+    Rebuttal.id.label("rebuttal_id"),
+    Rebuttal.created_at.label("rebuttal_created_at"),
+)
+FIELDNAMES = [column.key for column in COLUMNS]
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {ExportFormat.NDJSON: "application/x-ndjson", ExportFormat.CSV: "text/csv"}
+
+
+def changed_reviews(since: int, until: int):
+    """Ids of the reviews with a change-log entry in ``(since, until]``."""
+    entries = ChangeLogEntry.__table__
+    return select(entries.c.entity_id).where(
+        entries.c.entity == changes.REVIEW, entries.c.seq > since, entries.c.seq <= until
+    )
+
+
+def export_statement(review_ids=None):
+    """Every review, or those whose id is in ``review_ids`` (a subquery or a list)."""
+    statement = (
+        select(*COLUMNS)
+        .join(Course, Course.id == Review.course_id)
+        .join(Professor, Professor.id == Review.professor_id)
+        .outerjoin(Rebuttal, Rebuttal.review_id == Review.id)
+        .order_by(Review.created_at, Review.id)
+    )
+    if review_ids is not None:
+        statement = statement.where(Review.id.in_(review_ids))
+    return statement
+
+
+def iter_rows(db: Session, review_ids=None) -> Iterator[dict]:
+    statement = export_statement(review_ids).execution_options(stream_results=True, yield_per=settings.STREAM_CHUNK_SIZE)
+    for row in db.execute(statement).mappings():
+        yield dict(row)
+
+
+def _text(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def iter_ndjson(rows: Iterable[dict]) -> Iterator[str]:
+    chunk: List[str] = []
+    for row in rows:
+        chunk.append(json.dumps({key: _text(value) for key, value in row.items()}, ensure_ascii=False))
+        if len(chunk) >= settings.STREAM_CHUNK_SIZE:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def iter_csv(rows: Iterable[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDNAMES)
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow({key: _text(value) for key, value in row.items()})
+        if count % settings.STREAM_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+ENCODERS = {ExportFormat.NDJSON: iter_ndjson, ExportFormat.CSV: iter_csv}
+
+
+def open_export(fmt: ExportFormat, since: Optional[int] = None) -> Tuple[int, Iterator[str]]:
+    """The change-log head to pass as the next ``since``, and the encoded chunks up to it.
+
+    Raises ``ChangesCompacted`` if entries after ``since`` have been compacted away.
+    """
+    db = ReadSessionLocal()
+    try:
+        if since is not None:
+            compacted = changes.horizon(db)
+            if since < compacted:
+                raise changes.ChangesCompacted(compacted)
+        head = changes.head(db)
+    except BaseException:
+        db.close()
+        raise
+    return head, _stream(db, fmt, since, head)
+
+
+def _stream(db: Session, fmt: ExportFormat, since: Optional[int], head: int) -> Iterator[str]:
+    """Yield encoded chunks, reading through ``db``, which the generator closes."""
+    try:
+        with archive.stores(db) as sessions:
+            live = archived = None
+            if since is not None:
+                live = changed_reviews(since, head)
+                if len(sessions) > 1:
+                    # Archives have no change log; hand them the ids, inlined to stay clear of bind-parameter limits.
+                    archived = bindparam("review_ids", db.scalars(live).all(), expanding=True, literal_execute=True)
+            rows = archive.merge(
+                (iter_rows(session, live if session is db else archived) for session in sessions),
+                key=lambda row: (row["created_at"], row["review_id"]),
+            )
+            yield from ENCODERS[fmt](rows)
+    finally:
+        db.close()
+
+
+def write_export(out: TextIO, fmt: ExportFormat, since: Optional[int] = None) -> int:
+    """Write the export to ``out`` and return the ``since`` for the next one."""
+    head, chunks = open_export(fmt, since)
+    for chunk in chunks:
+        out.write(chunk)
+    return head
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export OpenRater reviews as NDJSON or CSV.")
+    parser.add_argument("path", help="output file, or - for stdout")
+    parser.add_argument("--format", choices=[fmt.value for fmt in ExportFormat], help="defaults to the file extension")
+    parser.add_argument("--since", type=int, help="only reviews created or updated after this change-log position")
+    args = parser.parse_args(argv)
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    if args.path == "-":
+        head = write_export(sys.stdout, ExportFormat(fmt), args.since)
+    else:
+        with open(args.path, "w", newline="", encoding="utf-8") as out:
+            head = write_export(out, ExportFormat(fmt), args.since)
+    print(f"next export: --since {head}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
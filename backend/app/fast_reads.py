@@ -0,0 +1,215 @@
+"""Column-level read path for the list routes.
+
+The ORM path hydrates ``Review``/``Course``/``Rebuttal`` objects and then
+validates them into pydantic models before encoding. Here only the columns the
+read schemas expose are selected, each row becomes a plain dict with keys in
+schema field order, and the result is encoded with orjson. The bytes match what
+FastAPI produces from ``CourseRead``, ``ProfessorRead``, ``ReviewRead`` and
+``RebuttalRead``; ``python -m benchmarks.serialization`` checks that and
+compares the cost of both paths.
+
+Review and rebuttal lists also read closed terms from their archives
+(``app.archive``) and merge them with the live rows.
+"""
+
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Iterator, List, Optional, Sequence
+
+import orjson
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+
+from . import archive
+from .config import settings
+from .database import ReadSessionLocal
+from .models import Course, Professor, Rebuttal, Review, course_professor_association
+from .pagination import NEXT_CURSOR_HEADER, encode_cursor, keyset_order
+
+COURSE_COLUMNS = (Course.name, Course.code, Course.term, Course.id)
+REBUTTAL_COLUMNS = (Rebuttal.content, Rebuttal.id, Rebuttal.created_at)
+
+_course = aliased(Course)
+_rebuttal = aliased(Rebuttal)
+REVIEW_COLUMNS = (
+    Review.professor_id,
+    Review.course_id,
+    Review.summary,
+    Review.strengths,
+    Review.weaknesses,
+    Review.fairness,
+    Review.clarity,
+    Review.engagement,
+    Review.workload,
+    Review.confidence,
+    Review.id,
+    Review.anon_id,
+    Review.created_at,
+    _rebuttal.content,
+    _rebuttal.id,
+    _rebuttal.created_at,
+    _course.name,
+    _course.code,
+    _course.term,
+    _course.id,
+)
+
+# Position of (created_at, id) in a REVIEW_COLUMNS row: the keyset order.
+_review_order = itemgetter(12, 10)
+
+# selectinload batches parent ids the same way; keeping it preserves course order.
+_IN_BATCH_SIZE = 500
+
+
+def course_dict(row) -> dict:
+    name, code, term, course_id = row
+    return {"name": name, "code": code, "term": term, "id": course_id}
+
+
+def rebuttal_dict(row) -> dict:
+    content, rebuttal_id, created_at = row
+    return {"content": content, "id": rebuttal_id, "created_at": created_at}
+
+
+def review_dict(row) -> dict:
+    return {
+        "professor_id": row[0],
+        "course_id": row[1],
+        "summary": row[2],
+        "strengths": row[3],
+        "weaknesses": row[4],
+        "fairness": row[5],
+        "clarity": row[6],
+        "engagement": row[7],
+        "workload": row[8],
+        "confidence": row[9],
+        "id": row[10],
+        "anon_id": row[11],
+        "created_at": row[12],
+        "rebuttal": None if row[14] is None else {"content": row[13], "id": row[14], "created_at": row[15]},
+        "course": {"name": row[16], "code": row[17], "term": row[18], "id": row[19]},
+    }
+
+
+def courses(db: Session) -> List[dict]:
+    return [course_dict(row) for row in db.execute(select(*COURSE_COLUMNS))]
+
+
+def professors(db: Session, ids: Optional[Sequence[int]] = None) -> List[dict]:
+    statement = select(Professor.name, Professor.department, Professor.id, Professor.user_id)
+    if ids is not None:
+        statement = statement.where(Professor.id.in_(ids))
+    result = [
+        {"name": name, "department": department, "id": professor_id, "courses": [], "user_id": user_id}
+        for name, department, professor_id, user_id in db.execute(statement)
+    ]
+    by_id = {professor["id"]: professor for professor in result}
+    ids = list(by_id)
+    association = course_professor_association
+    for start in range(0, len(ids), _IN_BATCH_SIZE):
+        statement = (
+            select(association.c.professor_id, *COURSE_COLUMNS)
+            .join(Course, Course.id == association.c.course_id)
+            .where(association.c.professor_id.in_(ids[start : start + _IN_BATCH_SIZE]))
+            .order_by(association.c.professor_id, Course.id)
+        )
+        for professor_id, group in groupby(db.execute(statement), key=itemgetter(0)):
+            by_id[professor_id]["courses"].extend(course_dict(row[1:]) for row in group)
+    return result
+
+
+def rebuttals(db: Session) -> List[dict]:
+    with archive.stores(db) as sessions:
+        rows = archive.merge(
+            (session.execute(select(*REBUTTAL_COLUMNS).order_by(Rebuttal.id)) for session in sessions), key=itemgetter(1)
+        )
+        return [rebuttal_dict(row) for row in rows]
+
+
+def reviews_statement(reviewer_id: Optional[int] = None, professor_id: Optional[int] = None, term: Optional[str] = None):
+    statement = (
+        select(*REVIEW_COLUMNS)
+        .outerjoin(_course, _course.id == Review.course_id)
+        .outerjoin(_rebuttal, _rebuttal.review_id == Review.id)
+    )
+    if reviewer_id is not None:
+        statement = statement.where(Review.reviewer_id == reviewer_id)
+    if professor_id is not None:
+        statement = statement.where(Review.professor_id == professor_id)
+    if term is not None:
+        statement = statement.where(_course.term == term)
+    return statement
+
+
+def json_response(content, response: Optional[Response] = None) -> Response:
+    """Encode ``content`` with orjson, keeping headers already set on the route's ``response``."""
+    body = orjson.dumps(content)
+    encoded = Response(content=body, media_type="application/json")
+    if response is not None:
+        encoded.headers.raw.extend(response.headers.raw)
+    return encoded
+
+
+def stream_reviews(statement, limit: Optional[int] = None, term: Optional[str] = None) -> StreamingResponse:
+    """Serialize ``statement`` as a JSON array, ``STREAM_CHUNK_SIZE`` rows at a time, merging every store that holds ``term``.
+
+    The request session may be closed before the body is sent, so the rows are
+    read through a session owned by the generator.
+    """
+
+    def generate():
+        db = ReadSessionLocal()
+        try:
+            if limit is not None:
+                yield from _encode_chunks(iter(archive.newest_first(db, statement, limit, _review_order, term)))
+                return
+            with archive.stores(db, term) as sessions:
+                results = [
+                    session.execute(statement.execution_options(yield_per=settings.STREAM_CHUNK_SIZE)) for session in sessions
+                ]
+                yield from _encode_chunks(archive.merge(results, _review_order, reverse=True))
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/json")
+
+
+def _encode_chunks(rows: Iterator) -> Iterator[bytes]:
+    yield b"["
+    separator = b""
+    while chunk := list(islice(rows, settings.STREAM_CHUNK_SIZE)):
+        yield separator + orjson.dumps([review_dict(row) for row in chunk])[1:-1]
+        separator = b","
+    yield b"]"
+
+
+def paginate_reviews(
+    db: Session,
+    statement,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    term: Optional[str] = None,
+) -> Response:
+    """Apply the ``limit``/``cursor``/``stream`` contract of the review lists, across the stores holding ``term``.
+
+    Without ``limit`` every remaining row is returned. With ``limit`` one extra
+    row is fetched to decide whether to emit the ``X-Next-Cursor`` header.
+    """
+    statement = keyset_order(statement, Review, cursor)
+    if limit is not None:
+        statement = statement.limit(limit if stream else limit + 1)
+    if stream:
+        return stream_reviews(statement, limit, term)
+    if limit is None:
+        with archive.stores(db, term) as sessions:
+            rows = archive.merge((session.execute(statement) for session in sessions), _review_order, reverse=True)
+            return json_response([review_dict(row) for row in rows], response)
+    rows = archive.newest_first(db, statement, limit + 1, _review_order, term)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1][12], rows[-1][10])
+    return json_response([review_dict(row) for row in rows], response)
@@ -2,6 +2,9 @@
 
 from getpass import getpass
 
+from sqlalchemy.exc import IntegrityError
+
+from . import admins
 from .database import SessionLocal
 from .models import RoleEnum, User
 from .security import get_password_hash
@@ -10,8 +13,7 @@ from .security import get_password_hash
 def main() -> None:
     db = SessionLocal()
     try:
-        existing = db.query(User).filter(User.role == RoleEnum.ADMIN).first()
-        if existing:
+        if admins.exists(db):
             print("Admin already exists. Aborting.")
             return
         email = input("Admin email: ")
@@ -20,9 +22,23 @@ def main() -> None:
         if len(password) < 8:
             print("Password too short.")
             return
-        user = User(email=email, name=name, role=RoleEnum.ADMIN, hashed_password=get_password_hash(password))
+        user = User(
+            email=email,
+            name=name,
+            role=RoleEnum.ADMIN,
+            hashed_password=get_password_hash(password),
+        )
+        # An admin may have been added while prompting; claiming the guard row settles it.
+        db.rollback()
+        if not admins.claim(db):
+            print("Admin already exists. Aborting.")
+            return
         db.add(user)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            print("Email already exists. Aborting.")
+            return
         print("Admin created successfully.")
     finally:
         db.close()
@@ -1,19 +1,36 @@
-from typing import List
-
-from fastapi import Depends, FastAPI, HTTPException, status
+import hmac
+import io
+from contextlib import closing
+from functools import partial
+from typing import List, Optional
+
+from fastapi import BackgroundTasks, Depends, FastAPI, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
-from . import models, schemas
+from . import admins, aggregates, anon_ids, archive, bulk_import, changes, events, export, fast_reads, metrics, models, public, queries, rankings, rate_limit, schemas, search, startup, versioning, write_queue
+from .auth_cache import Principal, principal_cache
 from .config import settings
-from .database import Base, engine, get_db
+from .database import get_db
 from .dependencies import get_current_user, require_role
-from .security import create_access_token, get_password_hash, verify_password
-
-Base.metadata.create_all(bind=engine)
+from .pagination import NEXT_CURSOR_HEADER
+from .routing import SessionRoute, keep_in_threadpool
+from .security import (
+    PasswordHasherBusy,
+    create_access_token,
+    get_password_hash_async,
+    password_needs_rehash,
+    verify_password_async,
+)
 
-app = FastAPI(title=settings.PROJECT_NAME)
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=startup.lifespan, dependencies=[Depends(rate_limit.enforce)])
+app.router.route_class = SessionRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,82 +38,138 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", NEXT_CURSOR_HEADER],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.register_collector(
+    lambda: [
+        ("openrater_auth_cache_hits_total", "counter", "Token cache hits.", principal_cache.hits),
+        ("openrater_auth_cache_misses_total", "counter", "Token cache misses.", principal_cache.misses),
+        ("openrater_auth_cache_entries", "gauge", "Tokens currently cached.", len(principal_cache)),
+    ]
+)
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
+def _insert_user(db: Session, user: models.User, bootstrap: bool = False) -> models.User:
+    if bootstrap:
+        # The guard row's primary key admits one bootstrap while no admin exists; see app.admins.
+        if not admins.claim(db):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Admin already exists")
+    elif user.role == models.RoleEnum.ADMIN:
+        admins.guard(db)
+    db.add(user)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    db.refresh(user)
+    return user
 
 
+# The auth routes are coroutines: they await bcrypt on the hash pool and only
+# borrow a threadpool worker for their brief database calls.
 @app.post("/auth/register", response_model=schemas.UserRead, status_code=status.HTTP_201_CREATED)
-def register_user(user_in: schemas.UserCreate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def register_user(user_in: schemas.UserCreate, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
     if current_user.role != models.RoleEnum.ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can create accounts")
-    existing = db.query(models.User).filter(models.User.email == user_in.email).first()
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
     user = models.User(
         email=user_in.email,
         name=user_in.name,
         role=user_in.role,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash_async(user_in.password),
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await run_in_threadpool(_insert_user, db, user)
 
 
 @app.post("/auth/bootstrap", response_model=schemas.UserRead, status_code=status.HTTP_201_CREATED)
-def bootstrap_admin(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+async def bootstrap_admin(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     if user_in.role != models.RoleEnum.ADMIN:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bootstrap must create an admin")
-    admin_exists = db.query(models.User).filter(models.User.role == models.RoleEnum.ADMIN).first()
-    if admin_exists:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Admin already exists")
     user = models.User(
         email=user_in.email,
         name=user_in.name,
         role=user_in.role,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash_async(user_in.password),
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    return await run_in_threadpool(_insert_user, db, user, bootstrap=True)
+
+
+def _user_by_email(db: Session, email: str) -> Optional[models.User]:
+    """Load the user and end the transaction, so no connection is held while bcrypt runs."""
+    user = db.query(models.User).filter(models.User.email == email).first()
+    if user is not None:
+        db.expunge(user)
+    db.rollback()
     return user
 
 
+def _store_password_hash(db: Session, user_id: int, hashed_password: str) -> None:
+    db.execute(update(models.User).where(models.User.id == user_id).values(hashed_password=hashed_password))
+    db.commit()
+
+
 @app.post("/auth/token", response_model=schemas.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_user_by_email, db, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
-    access_token = create_access_token({"sub": user.email})
+    access_token = create_access_token({"sub": user.email, "uid": user.id, "role": user.role.value})
+    if password_needs_rehash(user.hashed_password):
+        await run_in_threadpool(_store_password_hash, db, user.id, await get_password_hash_async(form_data.password))
     return {"access_token": access_token}
 
 
 @app.get("/users/me", response_model=schemas.UserRead)
-def read_users_me(current_user: models.User = Depends(get_current_user)):
-    return current_user
+def read_users_me(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    user = db.get(models.User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    return user
 
 
 @app.post("/courses", response_model=schemas.CourseRead, status_code=status.HTTP_201_CREATED)
-def create_course(course_in: schemas.CourseCreate, _: models.User = Depends(require_role(models.RoleEnum.ADMIN)), db: Session = Depends(get_db)):
-    existing = db.query(models.Course).filter(models.Course.code == course_in.code).first()
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Course code already exists")
+def create_course(course_in: schemas.CourseCreate, _: Principal = Depends(require_role(models.RoleEnum.ADMIN)), db: Session = Depends(get_db)):
     course = models.Course(**course_in.dict())
     db.add(course)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Course code already exists")
+    changes.record(db, changes.COURSE, changes.CREATED, [course.id])
+    versioning.bump(db, versioning.COURSES)
     db.commit()
     db.refresh(course)
     return course
 
 
 @app.get("/courses", response_model=List[schemas.CourseRead])
-def list_courses(_: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return db.query(models.Course).all()
+def list_courses(
+    request: Request,
+    response: Response,
+    _: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    not_modified = versioning.not_modified(request, response, db, versioning.COURSES)
+    if not_modified:
+        return not_modified
+    return fast_reads.json_response(fast_reads.courses(db), response)
 
 
 @app.post("/professors", response_model=schemas.ProfessorRead, status_code=status.HTTP_201_CREATED)
 def create_professor(
     professor_in: schemas.ProfessorCreate,
-    _: models.User = Depends(require_role(models.RoleEnum.ADMIN)),
+    _: Principal = Depends(require_role(models.RoleEnum.ADMIN)),
     db: Session = Depends(get_db),
 ):
     professor = models.Professor(name=professor_in.name, department=professor_in.department)
@@ -111,14 +184,105 @@ def create_professor(
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid course ids")
         professor.courses = courses
     db.add(professor)
+    db.flush()
+    changes.record(db, changes.PROFESSOR, changes.CREATED, [professor.id])
+    versioning.bump(db, versioning.PROFESSORS)
     db.commit()
     db.refresh(professor)
     return professor
 
 
 @app.get("/professors", response_model=List[schemas.ProfessorRead])
-def list_professors(_: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return db.query(models.Professor).all()
+def list_professors(
+    request: Request,
+    response: Response,
+    _: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    not_modified = versioning.not_modified(request, response, db, versioning.PROFESSORS)
+    if not_modified:
+        return not_modified
+    return fast_reads.json_response(fast_reads.professors(db), response)
+
+
+@app.get("/public/professors", response_model=List[schemas.PublicProfessor])
+async def read_public_professors(request: Request):
+    return _public_response(request, public.snapshot.professors())
+
+
+@app.get("/public/professors/{professor_id}", response_model=schemas.PublicProfessor)
+async def read_public_professor(professor_id: int, request: Request):
+    return _public_response(request, public.snapshot.professor(professor_id))
+
+
+@app.get("/public/professors/{professor_id}/reviews", response_model=List[schemas.ReviewRead])
+async def read_public_reviews(professor_id: int, request: Request, term: Optional[str] = None):
+    return _public_response(request, await public.reviews(professor_id, term))
+
+
+def _public_response(request: Request, encoded: Optional[public.Encoded]) -> Response:
+    if public.snapshot.seq is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Public data is loading", headers={"Retry-After": "1"}
+        )
+    if encoded is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Professor not found")
+    return public.respond(request, encoded)
+
+
+@app.get("/professors/{professor_id}/stats", response_model=schemas.ProfessorStatsRead)
+def read_professor_stats(professor_id: int, _: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    overall = db.get(models.ProfessorStats, professor_id)
+    if overall is None and db.get(models.Professor, professor_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Professor not found")
+    per_course = {}
+    # Courses of archived terms keep their statistics in the archive.
+    with archive.stores(db) as sessions:
+        for session in sessions:
+            for row in session.query(models.ProfessorCourseStats).filter(models.ProfessorCourseStats.professor_id == professor_id):
+                per_course.setdefault(row.course_id, aggregates.stats_payload(row))
+    return {
+        "professor_id": professor_id,
+        **aggregates.stats_payload(overall),
+        "courses": [{"course_id": course_id, **payload} for course_id, payload in sorted(per_course.items())],
+    }
+
+
+DIMENSION_PATTERN = f"^({'|'.join(models.SCORE_DIMENSIONS)})$"
+
+
+@app.get("/rankings", response_model=List[schemas.RankingEntry])
+def read_rankings(
+    dimension: str = Query(..., pattern=DIMENSION_PATTERN),
+    department: Optional[str] = None,
+    term: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=settings.PAGE_SIZE_MAX),
+    _: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if term is None:
+        return rankings.top(db, dimension, rankings.ALL_TERMS, department, limit)
+    with archive.store(db, term) as session:
+        return rankings.top(session, dimension, term, department, limit)
+
+
+@app.get("/rankings/{professor_id}", response_model=schemas.RankingPosition)
+def read_professor_rank(
+    professor_id: int,
+    dimension: str = Query(..., pattern=DIMENSION_PATTERN),
+    department: Optional[str] = None,
+    term: Optional[str] = None,
+    _: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if term is None:
+        position = rankings.rank_of(db, professor_id, dimension, rankings.ALL_TERMS, department)
+    else:
+        with archive.store(db, term) as session:
+            position = rankings.rank_of(session, professor_id, dimension, term, department)
+    if position is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Professor not ranked in this scope")
+    return position
 
 
 @app.post(
@@ -129,7 +293,7 @@ def list_professors(_: models.User = Depends(get_current_user), db: Session = De
 def assign_course_to_professor(
     professor_id: int,
     assignment: schemas.CourseAssignmentRequest,
-    _: models.User = Depends(require_role(models.RoleEnum.ADMIN)),
+    _: Principal = Depends(require_role(models.RoleEnum.ADMIN)),
     db: Session = Depends(get_db),
 ):
     professor = db.query(models.Professor).filter(models.Professor.id == professor_id).first()
@@ -139,41 +303,122 @@ def assign_course_to_professor(
     if len(courses) != len(set(assignment.course_ids)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid course ids")
     professor.courses = courses
+    changes.record(db, changes.PROFESSOR, changes.UPDATED, [professor.id])
+    versioning.bump(db, versioning.PROFESSORS)
     db.commit()
     db.refresh(professor)
     return professor
 
 
+def _insert_review(db: Session, reviewer_id: int, review_in: schemas.ReviewCreate, term: str) -> models.Review:
+    try:
+        anon_id = anon_ids.allocate(db, review_in.professor_id)
+    except anon_ids.AnonIdSpaceExhausted:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No anonymous IDs left for this professor")
+    review = models.Review(
+        reviewer_id=reviewer_id,
+        anon_id=anon_id,
+        **review_in.dict(),
+    )
+    db.add(review)
+    db.flush()
+    changes.record(
+        db, changes.REVIEW, changes.CREATED, [review.id], professor_id=review.professor_id, reviewer_id=reviewer_id
+    )
+    aggregates.record_review(db, review)
+    rankings.record_review(db, review, term)
+    versioning.bump(db, versioning.professor_reviews(review.professor_id))
+    return review
+
+
+def _queued_review(db: Session, **kwargs) -> models.Review:
+    review = _insert_review(db, **kwargs)
+    # The writer's session is closed before the response is built; load what ReviewRead reads.
+    set_committed_value(review, "course", db.get(models.Course, review.course_id))
+    set_committed_value(review, "rebuttal", None)
+    return review
+
+
 @app.post("/reviews", response_model=schemas.ReviewRead, status_code=status.HTTP_201_CREATED)
+@write_queue.route
 def create_review(
     review_in: schemas.ReviewCreate,
-    reviewer: models.User = Depends(require_role(models.RoleEnum.REVIEWER)),
+    background_tasks: BackgroundTasks,
+    reviewer: Principal = Depends(require_role(models.RoleEnum.REVIEWER)),
     db: Session = Depends(get_db),
 ):
     professor = db.query(models.Professor).filter(models.Professor.id == review_in.professor_id).first()
     if not professor:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Professor not found")
-    if review_in.course_id not in [course.id for course in professor.courses]:
+    course = next((course for course in professor.courses if course.id == review_in.course_id), None)
+    if course is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Professor not assigned to course")
-    review = models.Review(
-        reviewer_id=reviewer.id,
-        **review_in.dict(),
+    if archive.is_closed(db, course.term):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Term {course.term} is closed")
+    values = {"reviewer_id": reviewer.id, "review_in": review_in, "term": course.term}
+    if settings.WRITE_QUEUE:
+        # Return this request's connection first: the writer draws from the same pool.
+        db.close()
+        review = write_queue.writer.submit(partial(_queued_review, **values))
+    else:
+        review = _insert_review(db, **values)
+        db.commit()
+        db.refresh(review)
+    background_tasks.add_task(
+        events.publish, (professor.user_id, reviewer.id), "review.created", events.review_created(review)
     )
-    db.add(review)
-    db.commit()
-    db.refresh(review)
     return review
 
 
 @app.get("/reviews", response_model=List[schemas.ReviewRead])
 def list_reviews(
-    user: models.User = Depends(require_role(models.RoleEnum.ADMIN, models.RoleEnum.REVIEWER)),
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    term: Optional[str] = None,
+    user: Principal = Depends(require_role(models.RoleEnum.ADMIN, models.RoleEnum.REVIEWER)),
+    db: Session = Depends(get_db),
+):
+    reviewer_id = user.id if user.role == models.RoleEnum.REVIEWER else None
+    statement = fast_reads.reviews_statement(reviewer_id=reviewer_id, term=term)
+    return fast_reads.paginate_reviews(db, statement, response, limit, cursor, stream, term)
+
+
+@app.get("/reviews/search", response_model=List[schemas.ReviewRead])
+def search_reviews(
+    q: str = Query(..., min_length=1),
+    professor_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    term: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=settings.PAGE_SIZE_MAX),
+    offset: int = Query(0, ge=0),
+    _: Principal = Depends(require_role(models.RoleEnum.ADMIN)),
     db: Session = Depends(get_db),
 ):
-    query = db.query(models.Review).order_by(models.Review.created_at.desc())
-    if user.role == models.RoleEnum.REVIEWER:
-        query = query.filter(models.Review.reviewer_id == user.id)
-    return query.all()
+    backend = search.get_backend(db.get_bind().dialect.name)
+    if backend is None:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Search is not supported on this database")
+    # Matches are paged through the live tables first, then each archive, newest term first: SQLite's bm25
+    # weighs words by their frequency in each store, so scores from different stores do not compare.
+    page, seen, skip = [], set(), offset
+    with closing(archive.each_store(db, term)) as sessions:
+        for session in sessions:
+            store_backend = search.get_backend(session.get_bind().dialect.name)
+            try:
+                matches = store_backend.search(session, q, professor_id, course_id, term, skip + limit - len(page))
+            except search.SearchQueryError as exc:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+            # Between copying and purging a term its reviews match in both places.
+            ids = [review_id for review_id, _ in matches if review_id not in seen]
+            seen.update(ids)
+            ids, skip = ids[skip:], max(0, skip - len(ids))
+            if ids:
+                reviews = {review.id: review for review in queries.reviews(session).filter(models.Review.id.in_(ids))}
+                page.extend(reviews[review_id] for review_id in ids if review_id in reviews)
+            if len(page) >= limit:
+                break
+    return page
 
 
 @app.get(
@@ -182,7 +427,13 @@ def list_reviews(
 )
 def list_reviews_for_professor(
     professor_id: int,
-    user: models.User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    term: Optional[str] = None,
+    user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     professor = db.query(models.Professor).filter(models.Professor.id == professor_id).first()
@@ -193,13 +444,29 @@ def list_reviews_for_professor(
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cannot view other professors' reviews")
     elif user.role not in {models.RoleEnum.ADMIN, models.RoleEnum.REVIEWER}:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
-    reviews = (
-        db.query(models.Review)
-        .filter(models.Review.professor_id == professor_id)
-        .order_by(models.Review.created_at.desc())
-        .all()
-    )
-    return reviews
+    not_modified = versioning.not_modified(request, response, db, versioning.professor_reviews(professor_id))
+    if not_modified:
+        return not_modified
+    statement = fast_reads.reviews_statement(professor_id=professor_id, term=term)
+    return fast_reads.paginate_reviews(db, statement, response, limit, cursor, stream, term)
+
+
+def _insert_rebuttal(
+    db: Session, review_id: int, professor_id: int, reviewer_id: int, user_id: int, content: str
+) -> models.Rebuttal:
+    rebuttal = models.Rebuttal(review_id=review_id, professor_id=user_id, content=content)
+    db.add(rebuttal)
+    try:
+        db.flush()
+    except IntegrityError:
+        # The review already has a rebuttal, possibly committed by a concurrent request.
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Rebuttal already exists")
+    owners = {"professor_id": professor_id, "reviewer_id": reviewer_id}
+    changes.record(db, changes.REBUTTAL, changes.CREATED, [rebuttal.id], **owners)
+    # Reviews embed their rebuttal.
+    changes.record(db, changes.REVIEW, changes.UPDATED, [review_id], **owners)
+    versioning.bump(db, versioning.professor_reviews(professor_id))
+    return rebuttal
 
 
 @app.post(
@@ -207,32 +474,138 @@ def list_reviews_for_professor(
     response_model=schemas.RebuttalRead,
     status_code=status.HTTP_201_CREATED,
 )
+@write_queue.route
 def create_rebuttal(
     review_id: int,
     rebuttal_in: schemas.RebuttalCreate,
-    professor_user: models.User = Depends(require_role(models.RoleEnum.PROFESSOR)),
+    background_tasks: BackgroundTasks,
+    professor_user: Principal = Depends(require_role(models.RoleEnum.PROFESSOR)),
     db: Session = Depends(get_db),
 ):
-    review = db.query(models.Review).filter(models.Review.id == review_id).first()
-    if not review:
+    review = queries.rebuttal_target(db, review_id)
+    if review is None:
+        if archive.archived_review_exists(db, review_id):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Review belongs to a closed term")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Review not found")
-    professor = db.query(models.Professor).filter(models.Professor.id == review.professor_id).first()
-    if not professor or professor.user_id != professor_user.id:
+    if review.professor_user_id != professor_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Cannot rebut reviews for other professors")
-    if review.rebuttal:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Rebuttal already exists")
-    rebuttal = models.Rebuttal(review_id=review.id, professor_id=professor_user.id, content=rebuttal_in.content)
-    db.add(rebuttal)
-    db.commit()
-    db.refresh(rebuttal)
+    if archive.is_closed(db, review.term):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Term {review.term} is closed")
+    # An existing rebuttal is caught by the unique rebuttals.review_id when inserting.
+    values = {
+        "review_id": review.id,
+        "professor_id": review.professor_id,
+        "reviewer_id": review.reviewer_id,
+        "user_id": professor_user.id,
+        "content": rebuttal_in.content,
+    }
+    if settings.WRITE_QUEUE:
+        db.close()
+        rebuttal = write_queue.writer.submit(partial(_insert_rebuttal, **values))
+    else:
+        rebuttal = _insert_rebuttal(db, **values)
+        db.commit()
+        db.refresh(rebuttal)
+    background_tasks.add_task(
+        events.publish, (review.reviewer_id, professor_user.id), "rebuttal.created", events.rebuttal_created(rebuttal)
+    )
     return rebuttal
 
 
+@app.get("/events", response_class=StreamingResponse)
+async def stream_events(request: Request, user: Principal = Depends(get_current_user)):
+    return StreamingResponse(
+        events.stream(events.user_channel(user.id), request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/changes", response_model=schemas.ChangeFeed)
+def read_changes(
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=settings.PAGE_SIZE_MAX),
+    user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if user.role == models.RoleEnum.ADMIN:
+        condition = None
+    elif user.role == models.RoleEnum.REVIEWER:
+        condition = changes.visible_to(reviewer_id=user.id)
+    else:
+        professor_id = db.query(models.Professor.id).filter(models.Professor.user_id == user.id).scalar()
+        condition = changes.visible_to(professor_id=professor_id)
+    try:
+        feed = changes.feed(db, since, limit, condition)
+    except changes.ChangesCompacted as exc:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"Changes up to {exc.horizon} were compacted; reload and resume from GET /changes",
+        )
+    return fast_reads.json_response(feed)
+
+
 @app.get("/rebuttals", response_model=List[schemas.RebuttalRead])
-def list_rebuttals(_: models.User = Depends(require_role(models.RoleEnum.ADMIN)), db: Session = Depends(get_db)):
-    return db.query(models.Rebuttal).all()
+def list_rebuttals(_: Principal = Depends(require_role(models.RoleEnum.ADMIN)), db: Session = Depends(get_db)):
+    return fast_reads.json_response(fast_reads.rebuttals(db))
+
+
+@app.post("/bulk/{entity}", response_model=schemas.BulkImportResult)
+@keep_in_threadpool
+def import_records(
+    entity: bulk_import.ImportEntity,
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    _: Principal = Depends(require_role(models.RoleEnum.ADMIN)),
+    db: Session = Depends(get_db),
+):
+    fmt = format or bulk_import.detect_format(file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Specify format=csv or format=ndjson")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        result = bulk_import.run_import(db, entity, bulk_import.read_records(stream, fmt))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File must be UTF-8 encoded")
+    finally:
+        stream.detach()
+    return result.as_dict()
+
+
+@app.get("/export/reviews")
+def export_reviews(
+    format: export.ExportFormat = export.ExportFormat.NDJSON,
+    since: Optional[int] = Query(None, ge=0),
+    _: Principal = Depends(require_role(models.RoleEnum.ADMIN)),
+):
+    try:
+        head, chunks = export.open_export(format, since)
+    except changes.ChangesCompacted as exc:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"Changes up to {exc.horizon} were compacted; run a full export without since",
+        )
+    return StreamingResponse(
+        chunks,
+        media_type=export.MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="reviews.{format.value}"',
+            NEXT_CURSOR_HEADER: str(head),
+        },
+    )
 
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics(request: Request):
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {settings.METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"}
+        )
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
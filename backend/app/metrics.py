@@ -0,0 +1,247 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+``MetricsMiddleware`` records per-route request counts, latency and in-flight
+requests. ``instrument_engine`` hooks SQLAlchemy cursor events to count and
+time statements, attribute them to the current request and log slow ones, and
+times connection-pool checkouts. ``render`` produces the ``/metrics`` body.
+"""
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+_registry: List["_Metric"] = []
+_collectors: List[Callable[[], Sequence[Tuple[str, str, str, float]]]] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, key, value) -> List[str]:
+        bucket_counts, total, count = value
+        lines = []
+        for bound, bucket_count in [*zip(self.buckets, bucket_counts), ("+Inf", count)]:
+            labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+            lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def register_collector(collector: Callable[[], Sequence[Tuple[str, str, str, float]]]) -> None:
+    """Register a callback yielding ``(name, type, help, value)`` samples at scrape time."""
+    _collectors.append(collector)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        for name, kind, documentation, value in collector():
+            lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUESTS = Counter("openrater_http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("openrater_http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("openrater_http_requests_in_flight", "HTTP requests currently being served.", ("method",))
+DB_STATEMENTS = Counter("openrater_db_statements_total", "SQL statements executed.", ("engine",))
+DB_STATEMENT_LATENCY = Histogram("openrater_db_statement_duration_seconds", "SQL statement latency.", ("engine",))
+DB_SLOW_STATEMENTS = Counter("openrater_db_slow_statements_total", "SQL statements over the slow-query threshold.", ("engine",))
+DB_POOL_CHECKED_OUT = Gauge("openrater_db_pool_checked_out", "Pooled connections currently checked out.", ("engine",))
+DB_POOL_HOLD = Histogram(
+    "openrater_db_pool_hold_seconds", "Time a pooled connection stays checked out.", ("engine",)
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "openrater_request_db_statements", "SQL statements per HTTP request.", ("route",), buckets=COUNT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram("openrater_request_db_seconds", "SQL time per HTTP request.", ("route",))
+RATE_LIMITED = Counter("openrater_rate_limited_total", "Requests rejected by the rate limiter.", ("route",))
+WRITE_BATCH_SIZE = Histogram(
+    "openrater_write_batch_size", "Writes committed per group-commit transaction.", buckets=COUNT_BUCKETS
+)
+EVENT_SUBSCRIBERS = Gauge("openrater_event_subscribers", "Open server-sent event streams.")
+EVENTS_DROPPED = Counter("openrater_event_subscribers_dropped_total", "Event streams closed because the client fell behind.")
+PASSWORD_HASH_LATENCY = Histogram(
+    "openrater_password_hash_seconds", "bcrypt work including queueing for the hash pool.", ("operation",)
+)
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds", "route")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.route = "unmatched"
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("openrater_request_stats", default=None)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware so streaming bodies are timed until the last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        HTTP_IN_FLIGHT.inc(method=method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec(method=method)
+            _request_stats.reset(token)
+            route = _route_label(scope)
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status_code))
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+            REQUEST_DB_STATEMENTS.observe(stats.statements, route=route)
+            REQUEST_DB_TIME.observe(stats.db_seconds, route=route)
+
+
+def instrument_engine(engine: Engine, name: str = "primary") -> None:
+    """Count, time and slow-log statements on ``engine`` and track pooled connections."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("openrater_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["openrater_started"].pop()
+        DB_STATEMENTS.inc(engine=name)
+        DB_STATEMENT_LATENCY.observe(elapsed, engine=name)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+        if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            DB_SLOW_STATEMENTS.inc(engine=name)
+            logger.warning("Slow query (%.1f ms) on %s: %s", elapsed * 1000, name, " ".join(statement.split()))
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        started = context.connection.info.get("openrater_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    # Pool events registered on the engine carry over to the pool engine.dispose() creates.
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["openrater_checked_out"] = time.perf_counter()
+        DB_POOL_CHECKED_OUT.inc(engine=name)
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("openrater_checked_out", None)
+        if started is not None:
+            DB_POOL_CHECKED_OUT.dec(engine=name)
+            DB_POOL_HOLD.observe(time.perf_counter() - started, engine=name)
@@ -0,0 +1,279 @@
+"""Versioned schema migrations.
+
+``Base.metadata.create_all`` only creates missing tables; it never adds indexes
+or columns to tables that already exist. Each step below is idempotent and is
+recorded in ``schema_version`` once applied, so existing databases pick up
+schema changes by running:
+
+    python -m app.migrations
+    python -m app.migrations --check   # exit 1 if migrations are pending
+
+Run it once per deployment before starting workers. Application startup only
+reads the stored version (``stored_version``) and refuses to serve an
+outdated schema, so booting a worker never issues DDL.
+"""
+
+import argparse
+import sys
+from itertools import groupby
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import MetaData, bindparam, func, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateTable
+
+from . import admins, aggregates, anon_ids, changes, rankings, search
+from .database import Base, engine
+from .models import (
+    AdminGuard,
+    AnonIdSequence,
+    ArchivedTerm,
+    ChangeLogCompaction,
+    ChangeLogEntry,
+    DataVersion,
+    ProfessorRanking,
+    RankingPrior,
+    Rebuttal,
+    Review,
+    SchemaVersion,
+    RoleEnum,
+    User,
+    course_professor_association,
+)
+
+
+def _create_tables(conn: Connection) -> None:
+    Base.metadata.create_all(bind=conn)
+
+
+def _create_table(model) -> Callable[[Connection], None]:
+    def step(conn: Connection) -> None:
+        model.__table__.create(bind=conn, checkfirst=True)
+
+    return step
+
+
+def _create_indexes(table, *names: str) -> Callable[[Connection], None]:
+    def step(conn: Connection) -> None:
+        for index in table.indexes:
+            if index.name in names:
+                index.create(bind=conn, checkfirst=True)
+
+    return step
+
+
+def _add_column(column) -> Callable[[Connection], None]:
+    def step(conn: Connection) -> None:
+        table = column.table
+        if column.name in {existing["name"] for existing in inspect(conn).get_columns(table.name)}:
+            return
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+
+    return step
+
+
+def _backfill_anon_ids(conn: Connection) -> None:
+    """Number existing reviews per professor in creation order, as if allocated live."""
+    reviews = Review.__table__
+    sequences = AnonIdSequence.__table__
+    rows = conn.execute(
+        select(reviews.c.id, reviews.c.professor_id)
+        .where(reviews.c.anon_id.is_(None))
+        .order_by(reviews.c.professor_id, reviews.c.created_at, reviews.c.id)
+    ).all()
+    used = dict(conn.execute(select(sequences.c.professor_id, sequences.c.next_value)).all())
+    for professor_id, group in groupby(rows, key=lambda row: row.professor_id):
+        start = used.get(professor_id, 0)
+        updates = [
+            {"review_id": row.id, "new_anon_id": anon_ids.anon_id(professor_id, start + offset)}
+            for offset, row in enumerate(group)
+        ]
+        conn.execute(
+            reviews.update().where(reviews.c.id == bindparam("review_id")).values(anon_id=bindparam("new_anon_id")),
+            updates,
+        )
+        if professor_id in used:
+            conn.execute(
+                sequences.update()
+                .where(sequences.c.professor_id == professor_id)
+                .values(next_value=start + len(updates))
+            )
+        else:
+            conn.execute(insert(sequences).values(professor_id=professor_id, next_value=len(updates)))
+
+
+def _autoincrement_ids(*models) -> Callable[[Connection], None]:
+    """Rebuild SQLite tables with AUTOINCREMENT, so ids of deleted rows are never handed out again."""
+
+    def step(conn: Connection) -> None:
+        if conn.dialect.name != "sqlite":
+            return
+        # A copy of the schema, so the rebuilt tables' foreign keys resolve.
+        scratch = MetaData()
+        for table in Base.metadata.sorted_tables:
+            table.to_metadata(scratch)
+        rebuilt = False
+        for model in models:
+            table = model.__table__
+            ddl = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+            ).scalar()
+            if "AUTOINCREMENT" in ddl.upper():
+                continue
+            staging = table.to_metadata(scratch, name=f"{table.name}_rebuild")
+            conn.execute(CreateTable(staging))
+            existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+            columns = ", ".join(column.name for column in table.columns if column.name in existing)
+            conn.exec_driver_sql(f"INSERT INTO {staging.name} ({columns}) SELECT {columns} FROM {table.name}")
+            # Takes the old indexes and triggers along; other tables' foreign keys name the table, not the copy.
+            conn.exec_driver_sql(f"DROP TABLE {table.name}")
+            conn.exec_driver_sql(f"ALTER TABLE {staging.name} RENAME TO {table.name}")
+            for index in table.indexes:
+                index.create(bind=conn)
+            rebuilt = True
+        if rebuilt:
+            # The full-text triggers were dropped with ``reviews``.
+            search.install(conn)
+
+    return step
+
+
+def _seed_admin_guard(conn: Connection) -> None:
+    """Close bootstrap on databases that already have an admin."""
+    guard = AdminGuard.__table__
+    admin = select(User.id).where(User.role == RoleEnum.ADMIN)
+    if conn.execute(select(admin.exists())).scalar() and conn.execute(select(guard.c.id)).first() is None:
+        conn.execute(insert(guard).values(id=admins.GUARD_ID, version=0))
+
+
+def _steps(*steps: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    def run(conn: Connection) -> None:
+        for step in steps:
+            step(conn)
+
+    return run
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    # Databases from before the score aggregates get those tables empty here; fill them for step 6 to rank.
+    (1, "Create tables", _steps(_create_tables, aggregates.rebuild)),
+    (
+        2,
+        "Add review, rebuttal and course assignment access-path indexes",
+        _steps(
+            _create_indexes(
+                Review.__table__,
+                "ix_reviews_professor_created",
+                "ix_reviews_reviewer_created",
+                "ix_reviews_created",
+                "ix_reviews_course_id",
+            ),
+            _create_indexes(Rebuttal.__table__, "ix_rebuttals_professor_id"),
+            _create_indexes(course_professor_association, "ix_course_professor_professor_id"),
+        ),
+    ),
+    (3, "Add data_versions for conditional GETs", _create_table(DataVersion)),
+    (4, "Add review full-text search index", search.install),
+    (
+        5,
+        "Add per-professor anonymous review IDs",
+        _steps(
+            _add_column(Review.__table__.c.anon_id),
+            _create_table(AnonIdSequence),
+            _backfill_anon_ids,
+            _create_indexes(Review.__table__, "uq_reviews_professor_anon_id"),
+        ),
+    ),
+    (
+        6,
+        "Add precomputed professor rankings",
+        _steps(_create_table(RankingPrior), _create_table(ProfessorRanking), rankings.rebuild),
+    ),
+    (
+        7,
+        "Add change log for GET /changes",
+        _steps(_create_table(ChangeLogEntry), _create_table(ChangeLogCompaction), changes.backfill),
+    ),
+    (8, "Add admin_guard so only one bootstrap admin can be created", _steps(_create_table(AdminGuard), _seed_admin_guard)),
+    (
+        9,
+        "Add archived_terms registry for closed terms; stop SQLite reusing review and rebuttal ids",
+        _steps(_create_table(ArchivedTerm), _autoincrement_ids(Review, Rebuttal)),
+    ),
+    (10, "Add users.token_valid_after for cross-worker token revocation", _add_column(User.__table__.c.token_valid_after)),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Arbitrary key for pg_advisory_xact_lock so concurrent migrate() calls serialize.
+_PG_LOCK_KEY = 0x6F70656E
+
+
+class SchemaOutOfDate(RuntimeError):
+    def __init__(self, version: int):
+        super().__init__(
+            f"Database schema is at version {version}, expected {LATEST_VERSION}; run `python -m app.migrations`"
+        )
+        self.version = version
+
+
+def current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(SchemaVersion.__tablename__):
+        return 0
+    return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+def stored_version(bind: Engine = engine) -> int:
+    """Read the recorded schema version with one query and no DDL introspection."""
+    try:
+        with bind.connect() as conn:
+            return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+
+def check(bind: Engine = engine) -> None:
+    version = stored_version(bind)
+    if version < LATEST_VERSION:
+        raise SchemaOutOfDate(version)
+
+
+def migrate(bind: Engine = engine) -> List[int]:
+    """Apply every pending migration in one transaction; return the versions applied."""
+    applied = []
+    with bind.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_LOCK_KEY})
+        elif conn.dialect.name == "sqlite":
+            # Take the write lock before reading the version, so workers migrating at startup run one after another.
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        version = current_version(conn)
+        for number, description, step in MIGRATIONS:
+            if number <= version:
+                continue
+            step(conn)
+            conn.execute(insert(SchemaVersion.__table__).values(version=number, description=description))
+            applied.append(number)
+    return applied
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Apply pending OpenRater schema migrations.")
+    parser.add_argument("--check", action="store_true", help="only report whether migrations are pending")
+    args = parser.parse_args(argv)
+    if args.check:
+        version = stored_version()
+        print(f"Schema version {version}, latest {LATEST_VERSION}.")
+        sys.exit(0 if version >= LATEST_VERSION else 1)
+
+    applied = migrate()
+    if applied:
+        print(f"Applied migrations: {', '.join(str(number) for number in applied)}")
+    else:
+        print(f"Schema is up to date (version {LATEST_VERSION}).")
+
+
+if __name__ == "__main__":
+    main()
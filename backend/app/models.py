@@ -1,12 +1,16 @@
 import enum
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, String, Table, Text, UniqueConstraint
+from sqlalchemy import Column, DateTime, Enum, Float, ForeignKey, Index, Integer, String, Table, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from .database import Base
 
 
+SCORE_DIMENSIONS = ("fairness", "clarity", "engagement", "workload", "confidence")
+SCORE_VALUES = range(1, 6)
+
+
 class RoleEnum(str, enum.Enum):
     ADMIN = "admin"
     REVIEWER = "reviewer"
@@ -19,6 +23,7 @@ course_professor_association = Table(
     Column("course_id", ForeignKey("courses.id"), primary_key=True),
     Column("professor_id", ForeignKey("professors.id"), primary_key=True),
     UniqueConstraint("course_id", "professor_id", name="uq_course_professor"),
+    Index("ix_course_professor_professor_id", "professor_id"),
 )
 
 
@@ -30,6 +35,8 @@ class User(Base):
     name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(Enum(RoleEnum), nullable=False, index=True)
+    # Tokens issued before this are resolved from the database again (see app.auth_cache).
+    token_valid_after = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     reviews = relationship("Review", back_populates="reviewer", cascade="all,delete")
@@ -63,6 +70,7 @@ class Professor(Base):
         "Course",
         secondary=course_professor_association,
         back_populates="professors",
+        order_by="Course.id",
     )
     reviews = relationship("Review", back_populates="professor", cascade="all,delete")
     account = relationship("User")
@@ -70,6 +78,16 @@ class Professor(Base):
 
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Keyset pagination orders by (created_at, id) within each access path.
+        Index("ix_reviews_professor_created", "professor_id", "created_at", "id"),
+        Index("ix_reviews_reviewer_created", "reviewer_id", "created_at", "id"),
+        Index("ix_reviews_created", "created_at", "id"),
+        Index("ix_reviews_course_id", "course_id"),
+        Index("uq_reviews_professor_anon_id", "professor_id", "anon_id", unique=True),
+        # Archiving deletes the newest rows of a term; AUTOINCREMENT keeps SQLite from handing their ids out again.
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True)
     reviewer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -83,6 +101,8 @@ class Review(Base):
     engagement = Column(Integer, nullable=False)
     workload = Column(Integer, nullable=False)
     confidence = Column(Integer, nullable=False)
+    # Four base-62 characters from app.anon_ids, unique per professor.
+    anon_id = Column(String(4), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     reviewer = relationship("User", back_populates="reviews")
@@ -93,12 +113,150 @@ class Review(Base):
 
 class Rebuttal(Base):
     __tablename__ = "rebuttals"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True)
     review_id = Column(Integer, ForeignKey("reviews.id"), unique=True, nullable=False)
-    professor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    professor_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     review = relationship("Review", back_populates="rebuttal")
     professor = relationship("User", back_populates="rebuttals")
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AnonIdSequence(Base):
+    """Per-professor counter of allocated anonymous IDs."""
+
+    __tablename__ = "anon_id_sequences"
+
+    professor_id = Column(Integer, ForeignKey("professors.id"), primary_key=True)
+    next_value = Column(Integer, nullable=False, default=0)
+
+
+class ScoreAggregateMixin:
+    """Review count plus, per dimension, a running sum and one counter per score.
+
+    Columns are ``<dimension>_sum`` and ``<dimension>_1`` .. ``<dimension>_5``.
+    """
+
+    review_count = Column(Integer, nullable=False, default=0)
+
+
+for _dimension in SCORE_DIMENSIONS:
+    setattr(ScoreAggregateMixin, f"{_dimension}_sum", Column(Integer, nullable=False, default=0))
+    for _score in SCORE_VALUES:
+        setattr(ScoreAggregateMixin, f"{_dimension}_{_score}", Column(Integer, nullable=False, default=0))
+
+
+class ProfessorStats(ScoreAggregateMixin, Base):
+    __tablename__ = "professor_stats"
+
+    professor_id = Column(Integer, ForeignKey("professors.id"), primary_key=True)
+
+
+class ProfessorCourseStats(ScoreAggregateMixin, Base):
+    __tablename__ = "professor_course_stats"
+
+    professor_id = Column(Integer, ForeignKey("professors.id"), primary_key=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), primary_key=True)
+
+
+class RankingPrior(Base):
+    """Mean score per ranking scope, used as the Bayesian prior until the next rebuild."""
+
+    __tablename__ = "ranking_priors"
+
+    # "" ranks across all terms.
+    term = Column(String, primary_key=True)
+    dimension = Column(String, primary_key=True)
+    mean = Column(Float, nullable=False)
+
+
+class ProfessorRanking(Base):
+    __tablename__ = "professor_rankings"
+    __table_args__ = (
+        # Top-k walks these backwards: score DESC, professor_id DESC.
+        Index("ix_professor_rankings_score", "term", "dimension", "score", "professor_id"),
+        Index("ix_professor_rankings_department_score", "term", "dimension", "department", "score", "professor_id"),
+    )
+
+    term = Column(String, primary_key=True)
+    dimension = Column(String, primary_key=True)
+    professor_id = Column(Integer, ForeignKey("professors.id"), primary_key=True)
+    department = Column(String, nullable=False)
+    review_count = Column(Integer, nullable=False)
+    average = Column(Float, nullable=False)
+    score = Column(Float, nullable=False)
+
+
+class ChangeLogEntry(Base):
+    """One create or update of a course, professor, review or rebuttal; see app.changes."""
+
+    __tablename__ = "change_log"
+    __table_args__ = (
+        # Compaction finds the newest entry per entity; AUTOINCREMENT keeps seq from being reused after it.
+        Index("ix_change_log_entity", "entity", "entity_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(16), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String(16), nullable=False)
+    # Owners of review and rebuttal entries; both NULL for entries every role may see.
+    professor_id = Column(Integer, nullable=True)
+    reviewer_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ChangeLogCompaction(Base):
+    __tablename__ = "change_log_compactions"
+
+    id = Column(Integer, primary_key=True)
+    # Entries up to this seq may be gone; feeds starting before it must reload.
+    horizon = Column(Integer, nullable=False)
+    removed = Column(Integer, nullable=False)
+    compacted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ArchivedTerm(Base):
+    """A closed term whose reviews moved to a read-only archive database; see app.archive."""
+
+    __tablename__ = "archived_terms"
+
+    term = Column(String, primary_key=True)
+    url = Column(String, nullable=False)
+    review_count = Column(Integer, nullable=False, default=0)
+    rebuttal_count = Column(Integer, nullable=False, default=0)
+    closed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # NULL while the term is closing: writes are refused but reads still use the live tables.
+    archived_at = Column(DateTime, nullable=True)
+    # The newest archived review: newest-first reads across terms skip the archive once a page ends after it.
+    newest_review_at = Column(DateTime, nullable=True)
+    newest_review_id = Column(Integer, nullable=True)
+
+
+class AdminGuard(Base):
+    """The single row every admin-creating transaction updates first; see app.admins."""
+
+    __tablename__ = "admin_guard"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
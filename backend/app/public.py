@@ -0,0 +1,217 @@
+"""Anonymous read tier served from an in-memory snapshot.
+
+``/public/professors``, ``/public/professors/{id}`` and
+``/public/professors/{id}/reviews`` need no token and never open a database
+session: each worker keeps every professor, its score statistics and its
+reviews in memory, already encoded with orjson and tagged with an ``ETag``.
+Reviews carry the same fields as ``ReviewRead``: no reviewer identity, only the
+anonymous ID. Professors drop the linked account id.
+
+The snapshot is built at startup and then follows the change log
+(``app.changes``) every ``PUBLIC_REFRESH_SECONDS``: a new or rebutted review
+re-encodes only its professor and the professor list, and writes made in other
+workers or by bulk imports are picked up the same way. If the log has been
+compacted past the snapshot, it is rebuilt.
+
+Only live reviews are kept. Once a term is archived (``app.archive``) the
+snapshot is rebuilt without it, and ``?term=`` reads of an archived term are
+answered from its archive on request. The professors' score statistics still
+count every term. Responses allow shared caches to keep them for
+``PUBLIC_CACHE_MAX_AGE`` seconds.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+import orjson
+from fastapi import Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import aggregates, archive, changes, fast_reads
+from .config import settings
+from .database import ReadSessionLocal
+from .models import ProfessorStats
+
+logger = logging.getLogger(__name__)
+
+
+class Encoded(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def encode(content) -> Encoded:
+    body = orjson.dumps(content)
+    return Encoded(body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"')
+
+
+def _public_professor(professor: dict) -> dict:
+    return {key: value for key, value in professor.items() if key != "user_id"}
+
+
+def _newest_first(reviews: Iterable[dict]) -> List[dict]:
+    return sorted(reviews, key=lambda review: (review["created_at"], review["id"]), reverse=True)
+
+
+class PublicSnapshot:
+    """Encoded public responses as of change-log entry ``seq``.
+
+    Only the refresh thread mutates it; request handlers read whole ``Encoded``
+    values, which are replaced rather than modified.
+    """
+
+    def __init__(self):
+        self.seq: Optional[int] = None
+        self._archived: FrozenSet[str] = frozenset()
+        self._professors: Dict[int, dict] = {}
+        self._reviews: Dict[int, Dict[int, dict]] = defaultdict(dict)
+        self._list: Optional[Encoded] = None
+        self._details: Dict[int, Encoded] = {}
+        self._review_lists: Dict[int, Encoded] = {}
+
+    def professors(self) -> Optional[Encoded]:
+        return self._list
+
+    def professor(self, professor_id: int) -> Optional[Encoded]:
+        return self._details.get(professor_id)
+
+    def reviews(self, professor_id: int, term: Optional[str] = None) -> Optional[Encoded]:
+        if term is None:
+            return self._review_lists.get(professor_id)
+        if professor_id not in self._professors:
+            return None
+        reviews = self._reviews.get(professor_id, {}).values()
+        return encode(_newest_first(review for review in reviews if review["course"]["term"] == term))
+
+    def rebuild(self, db: Session) -> None:
+        seq = changes.head(db)
+        professors = {professor["id"]: _public_professor(professor) for professor in fast_reads.professors(db)}
+        stats = {row.professor_id: row for row in db.scalars(select(ProfessorStats))}
+        for professor_id, professor in professors.items():
+            professor.update(aggregates.stats_payload(stats.get(professor_id)))
+        archived = archive.archived_terms(db)
+        reviews: Dict[int, Dict[int, dict]] = defaultdict(dict)
+        for row in db.execute(fast_reads.reviews_statement()):
+            review = fast_reads.review_dict(row)
+            # Between copying and purging a term its rows are in both places.
+            if review["course"]["term"] not in archived:
+                reviews[review["professor_id"]][review["id"]] = review
+        self._professors, self._reviews, self._archived = professors, reviews, archived
+        self._details = {professor_id: encode(professor) for professor_id, professor in professors.items()}
+        self._review_lists = {
+            professor_id: encode(_newest_first(reviews[professor_id].values())) for professor_id in professors
+        }
+        self._list = encode(list(professors.values()))
+        self.seq = seq
+
+    def refresh(self, db: Session) -> None:
+        """Apply change-log entries after ``seq``; rebuild if there is no snapshot, the log was compacted or a term was archived."""
+        if self.seq is None or archive.archived_terms(db) != self._archived:
+            self.rebuild(db)
+            return
+        touched, rescored = set(), set()
+        while True:
+            try:
+                feed = changes.feed(db, self.seq, settings.PAGE_SIZE_MAX)
+            except changes.ChangesCompacted:
+                self.rebuild(db)
+                return
+            for change in feed["changes"]:
+                data = change["data"]
+                if data is None:
+                    continue
+                if change["entity"] == changes.PROFESSOR:
+                    # Statistics are filled in below.
+                    self._professors[data["id"]] = _public_professor(data)
+                    rescored.add(data["id"])
+                    touched.add(data["id"])
+                elif change["entity"] == changes.REVIEW:
+                    # Rebuttals arrive as an update of the review that embeds them.
+                    self._reviews[data["professor_id"]][data["id"]] = data
+                    rescored.add(data["professor_id"])
+                    touched.add(data["professor_id"])
+            self.seq = feed["next"]
+            if not feed["has_more"]:
+                break
+        if not touched:
+            return
+        rescored &= self._professors.keys()
+        stats = {
+            row.professor_id: row
+            for row in db.scalars(select(ProfessorStats).where(ProfessorStats.professor_id.in_(rescored)))
+        }
+        for professor_id in rescored:
+            self._professors[professor_id].update(aggregates.stats_payload(stats.get(professor_id)))
+        for professor_id in touched & self._professors.keys():
+            self._details[professor_id] = encode(self._professors[professor_id])
+            self._review_lists[professor_id] = encode(_newest_first(self._reviews[professor_id].values()))
+        self._list = encode(list(self._professors.values()))
+
+
+snapshot = PublicSnapshot()
+_poller: Optional[asyncio.Task] = None
+
+
+def _archived_reviews(professor_id: int, term: str) -> Optional[Encoded]:
+    db = ReadSessionLocal()
+    try:
+        with archive.store(db, term) as session:
+            if session is db:
+                return None
+            rows = session.execute(fast_reads.reviews_statement(professor_id=professor_id, term=term))
+            return encode(_newest_first(fast_reads.review_dict(row) for row in rows))
+    finally:
+        db.close()
+
+
+async def reviews(professor_id: int, term: Optional[str] = None) -> Optional[Encoded]:
+    """``professor_id``'s live reviews, or its reviews in ``term`` wherever that term is stored."""
+    if term is not None and snapshot.professor(professor_id) is not None:
+        encoded = await run_in_threadpool(_archived_reviews, professor_id, term)
+        if encoded is not None:
+            return encoded
+    return snapshot.reviews(professor_id, term)
+
+
+def _refresh() -> None:
+    db = ReadSessionLocal()
+    try:
+        snapshot.refresh(db)
+    finally:
+        db.close()
+
+
+async def _poll() -> None:
+    while True:
+        await asyncio.sleep(settings.PUBLIC_REFRESH_SECONDS)
+        try:
+            await run_in_threadpool(_refresh)
+        except Exception:
+            logger.exception("Refreshing the public snapshot failed")
+
+
+async def start() -> None:
+    global _poller
+    await run_in_threadpool(_refresh)
+    _poller = asyncio.create_task(_poll())
+
+
+async def stop() -> None:
+    global _poller
+    if _poller is not None:
+        _poller.cancel()
+        await asyncio.gather(_poller, return_exceptions=True)
+        _poller = None
+
+
+def respond(request: Request, encoded: Encoded) -> Response:
+    headers = {"ETag": encoded.etag, "Cache-Control": f"public, max-age={settings.PUBLIC_CACHE_MAX_AGE}"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and encoded.etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=encoded.body, media_type="application/json", headers=headers)
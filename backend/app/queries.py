@@ -0,0 +1,47 @@
+"""Read queries shared by the routes and the query-plan checks."""
+
+from typing import Optional
+
+from sqlalchemy import Row, select
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
+
+from . import models
+
+# Eager-load everything the read schemas touch so serialization never lazy loads.
+PROFESSOR_READ_OPTIONS = (selectinload(models.Professor.courses),)
+REVIEW_READ_OPTIONS = (joinedload(models.Review.course), joinedload(models.Review.rebuttal))
+
+
+def professors(db: Session) -> Query:
+    return db.query(models.Professor).options(*PROFESSOR_READ_OPTIONS)
+
+
+def reviews(db: Session, reviewer_id: Optional[int] = None) -> Query:
+    query = db.query(models.Review).options(*REVIEW_READ_OPTIONS)
+    if reviewer_id is not None:
+        query = query.filter(models.Review.reviewer_id == reviewer_id)
+    return query
+
+
+def reviews_for_professor(db: Session, professor_id: int) -> Query:
+    return (
+        db.query(models.Review)
+        .options(*REVIEW_READ_OPTIONS)
+        .filter(models.Review.professor_id == professor_id)
+    )
+
+
+def rebuttal_target(db: Session, review_id: int) -> Optional[Row]:
+    """The review's owners, its professor's account and its term in one round trip; ``None`` if there is no such review."""
+    return db.execute(
+        select(
+            models.Review.id,
+            models.Review.professor_id,
+            models.Review.reviewer_id,
+            models.Professor.user_id.label("professor_user_id"),
+            models.Course.term,
+        )
+        .join(models.Professor, models.Professor.id == models.Review.professor_id)
+        .join(models.Course, models.Course.id == models.Review.course_id)
+        .where(models.Review.id == review_id)
+    ).first()
@@ -0,0 +1,254 @@
+"""Professor leaderboards ranked by a Bayesian-smoothed average.
+
+A professor with few reviews is pulled toward the mean of the scope:
+
+    score = (C * m + sum) / (C + n)
+
+where ``n`` and ``sum`` come from the score aggregates, ``C`` is
+``settings.RANKING_PRIOR_WEIGHT`` and ``m`` is the scope's mean, stored in
+``ranking_priors``. A scope is one dimension across all terms (``term = ""``)
+or within a single term.
+
+``professor_rankings`` holds one precomputed row per scope and professor,
+indexed by ``(term, dimension[, department], score)``, so top-k is a short
+backwards index scan and "rank of professor X" is one index range count.
+``record_review`` rescores the reviewed professor inside the caller's
+transaction. Priors stay fixed between rebuilds so that one review never
+reorders other professors; run ``python -m app.rankings`` (nightly, or after
+changing the prior weight) to refresh them and recompute every row.
+"""
+
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import SessionLocal, engine
+from .models import (
+    SCORE_DIMENSIONS,
+    Course,
+    Professor,
+    ProfessorCourseStats,
+    ProfessorRanking,
+    ProfessorStats,
+    RankingPrior,
+    Review,
+)
+
+ALL_TERMS = ""
+
+
+def bayesian_score(total: float, count: int, mean: float) -> float:
+    weight = settings.RANKING_PRIOR_WEIGHT
+    return (weight * mean + total) / (weight + count)
+
+
+def _scope_statement(term: str, professor_id: Optional[int] = None):
+    """Per-professor ``(professor_id, department, review_count, <dimension>_sum...)`` for a scope."""
+    if term == ALL_TERMS:
+        stats = ProfessorStats
+        statement = select(
+            stats.professor_id,
+            Professor.department,
+            stats.review_count,
+            *[getattr(stats, f"{dimension}_sum") for dimension in SCORE_DIMENSIONS],
+        ).join(Professor, Professor.id == stats.professor_id)
+    else:
+        stats = ProfessorCourseStats
+        statement = (
+            select(
+                stats.professor_id,
+                Professor.department,
+                func.sum(stats.review_count),
+                *[func.sum(getattr(stats, f"{dimension}_sum")) for dimension in SCORE_DIMENSIONS],
+            )
+            .join(Course, Course.id == stats.course_id)
+            .join(Professor, Professor.id == stats.professor_id)
+            .where(Course.term == term)
+            .group_by(stats.professor_id, Professor.department)
+        )
+    if professor_id is not None:
+        statement = statement.where(stats.professor_id == professor_id)
+    return statement
+
+
+def _means(rows) -> Dict[str, float]:
+    count = sum(row[2] for row in rows)
+    return {
+        dimension: sum(row[3 + index] for row in rows) / count if count else 0.0
+        for index, dimension in enumerate(SCORE_DIMENSIONS)
+    }
+
+
+def _ranking_rows(row, term: str, means: Dict[str, float]) -> List[dict]:
+    professor_id, department, count = row[0], row[1], row[2]
+    return [
+        {
+            "term": term,
+            "dimension": dimension,
+            "professor_id": professor_id,
+            "department": department,
+            "review_count": count,
+            "average": row[3 + index] / count,
+            "score": bayesian_score(row[3 + index], count, means[dimension]),
+        }
+        for index, dimension in enumerate(SCORE_DIMENSIONS)
+    ]
+
+
+def rebuild(db: Session) -> None:
+    """Recompute priors and every ranking row from the score aggregates."""
+    db.execute(delete(ProfessorRanking.__table__))
+    db.execute(delete(RankingPrior.__table__))
+    terms = [ALL_TERMS, *db.scalars(select(Course.term).distinct().order_by(Course.term))]
+    for term in terms:
+        rows = db.execute(_scope_statement(term)).all()
+        if not rows:
+            continue
+        means = _means(rows)
+        db.execute(
+            insert(RankingPrior.__table__),
+            [{"term": term, "dimension": dimension, "mean": mean} for dimension, mean in means.items()],
+        )
+        db.execute(insert(ProfessorRanking.__table__), [entry for row in rows for entry in _ranking_rows(row, term, means)])
+
+
+def _priors(db: Session, term: str) -> Dict[str, float]:
+    table = RankingPrior.__table__
+    means = dict(db.execute(select(table.c.dimension, table.c.mean).where(table.c.term == term)).all())
+    if len(means) == len(SCORE_DIMENSIONS):
+        return means
+    # First review in a scope created since the last rebuild: seed its prior from what is there now.
+    means = _means(db.execute(_scope_statement(term)).all())
+    try:
+        with db.begin_nested():
+            db.execute(
+                insert(table), [{"term": term, "dimension": dimension, "mean": mean} for dimension, mean in means.items()]
+            )
+    except IntegrityError:
+        means = dict(db.execute(select(table.c.dimension, table.c.mean).where(table.c.term == term)).all())
+    return means
+
+
+_table = ProfessorRanking.__table__
+_UPDATE = (
+    update(_table)
+    .where(
+        _table.c.term == bindparam("b_term"),
+        _table.c.dimension == bindparam("b_dimension"),
+        _table.c.professor_id == bindparam("b_professor_id"),
+    )
+    .values(
+        department=bindparam("b_department"),
+        review_count=bindparam("b_review_count"),
+        average=bindparam("b_average"),
+        score=bindparam("b_score"),
+    )
+)
+
+
+def _update(db: Session, entries: List[dict]) -> None:
+    db.execute(_UPDATE, [{f"b_{name}": value for name, value in entry.items()} for entry in entries])
+
+
+def record_review(db: Session, review: Review, term: str) -> None:
+    """Rescore ``review``'s professor in the all-terms and ``term`` scopes.
+
+    Call after ``aggregates.record_review`` so the sums already include the review.
+    """
+    for scope in (ALL_TERMS, term):
+        row = db.execute(_scope_statement(scope, review.professor_id)).first()
+        if row is None:
+            continue
+        entries = _ranking_rows(row, scope, _priors(db, scope))
+        exists = db.execute(
+            select(_table.c.professor_id)
+            .where(
+                _table.c.term == scope,
+                _table.c.dimension == SCORE_DIMENSIONS[0],
+                _table.c.professor_id == review.professor_id,
+            )
+        ).first()
+        if exists:
+            _update(db, entries)
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(insert(_table), entries)
+        except IntegrityError:
+            # A concurrent writer ranked this professor first; our totals are at least as new.
+            _update(db, entries)
+
+
+def _scope(statement, dimension: str, term: str, department: Optional[str]):
+    statement = statement.where(ProfessorRanking.term == term, ProfessorRanking.dimension == dimension)
+    if department is not None:
+        statement = statement.where(ProfessorRanking.department == department)
+    return statement
+
+
+def _entry(rank: int, ranking: ProfessorRanking, name: str) -> dict:
+    return {
+        "rank": rank,
+        "professor_id": ranking.professor_id,
+        "name": name,
+        "department": ranking.department,
+        "review_count": ranking.review_count,
+        "average": ranking.average,
+        "score": ranking.score,
+    }
+
+
+def top(
+    db: Session, dimension: str, term: str = ALL_TERMS, department: Optional[str] = None, limit: int = 20
+) -> List[dict]:
+    statement = _scope(
+        select(ProfessorRanking, Professor.name).join(Professor, Professor.id == ProfessorRanking.professor_id),
+        dimension,
+        term,
+        department,
+    )
+    rows = db.execute(
+        statement.order_by(ProfessorRanking.score.desc(), ProfessorRanking.professor_id.desc()).limit(limit)
+    ).all()
+    return [_entry(rank, ranking, name) for rank, (ranking, name) in enumerate(rows, start=1)]
+
+
+def rank_of(
+    db: Session, professor_id: int, dimension: str, term: str = ALL_TERMS, department: Optional[str] = None
+) -> Optional[dict]:
+    """Return the professor's entry with its 1-based rank and the scope size, or ``None`` if unranked."""
+    ranking = db.get(ProfessorRanking, (term, dimension, professor_id))
+    if ranking is None or (department is not None and ranking.department != department):
+        return None
+    ahead = db.scalar(
+        _scope(select(func.count()).select_from(ProfessorRanking), dimension, term, department).where(
+            or_(
+                ProfessorRanking.score > ranking.score,
+                and_(ProfessorRanking.score == ranking.score, ProfessorRanking.professor_id > professor_id),
+            )
+        )
+    )
+    total = db.scalar(_scope(select(func.count()).select_from(ProfessorRanking), dimension, term, department))
+    name = db.scalar(select(Professor.name).where(Professor.id == professor_id))
+    return {**_entry(ahead + 1, ranking, name), "total": total}
+
+
+def main() -> None:
+    # Imported here: migrations depends on the rebuild modules. Upgrade the schema, backfills included, first.
+    from . import migrations
+
+    migrations.migrate(engine)
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        db.commit()
+        print("Professor rankings rebuilt.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Per-principal token-bucket rate limiting.
+
+``enforce`` runs as an application-wide dependency before each route's own
+dependencies. Routes listed in ``settings.RATE_LIMITS`` get a bucket per
+caller: the user id for a valid bearer token, otherwise the client IP. A
+request that finds its bucket empty is rejected with 429 and a ``Retry-After``
+header before any expensive work (bcrypt, writes) starts.
+
+Buckets live in a ``RateLimitBackend``. ``MemoryBackend`` keeps them per
+worker; ``RedisBackend`` shares them across workers and hosts through an
+atomic Lua script. Other stores can be plugged in with ``limiter.backend``.
+"""
+
+import math
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.security.utils import get_authorization_scheme_param
+
+from .config import settings
+from .dependencies import get_current_user
+from .metrics import RATE_LIMITED
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class Limit(NamedTuple):
+    capacity: int
+    per_second: float
+
+    @classmethod
+    def parse(cls, text: str) -> "Limit":
+        count, _, period = text.strip().partition("/")
+        if period not in PERIODS or not count.isdigit() or int(count) < 1:
+            raise ValueError(f"Invalid rate limit {text!r}, expected e.g. '10/minute'")
+        return cls(int(count), int(count) / PERIODS[period])
+
+
+def parse_limits(text: str) -> Dict[str, Limit]:
+    """Parse ``"POST /auth/token=10/minute;GET /reviews=100/minute"``."""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in text.split(";"))):
+        route, _, limit = entry.rpartition("=")
+        limits[" ".join(route.split())] = Limit.parse(limit)
+    return limits
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def take(self, key: str, limit: Limit) -> float:
+        """Take one token from ``key``'s bucket; return 0 if allowed, else seconds until one is available."""
+
+
+class MemoryBackend(RateLimitBackend):
+    """Buckets in this worker's memory, evicting the least recently used beyond ``max_keys``."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, limit: Limit) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated) * limit.per_second)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / limit.per_second
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(retry_after)
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """Buckets shared by every worker through Redis; time comes from the Redis server clock."""
+
+    def __init__(self, url: str, prefix: str = "openrater:ratelimit:"):
+        import redis.asyncio
+
+        self.prefix = prefix
+        self._client = redis.asyncio.Redis.from_url(url)
+        self._script = self._client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, limit: Limit) -> float:
+        return float(await self._script(keys=[self.prefix + key], args=[limit.capacity, limit.per_second]))
+
+
+def create_backend(spec: str) -> RateLimitBackend:
+    if spec == "memory":
+        return MemoryBackend()
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(spec)
+    raise ValueError(f"Unknown rate limit backend {spec!r}")
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, Limit], backend: RateLimitBackend, enabled: bool = True):
+        self.limits = limits
+        self.backend = backend
+        self.enabled = enabled
+
+
+limiter = RateLimiter(
+    parse_limits(settings.RATE_LIMITS), create_backend(settings.RATE_LIMIT_BACKEND), settings.RATE_LIMIT_ENABLED
+)
+
+
+async def _caller(request: Request) -> str:
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    if scheme.lower() == "bearer" and token:
+        try:
+            return f"user:{(await get_current_user(token)).id}"
+        except HTTPException:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def enforce(request: Request) -> None:
+    if not limiter.enabled:
+        return
+    route = request.scope.get("route")
+    name = f"{request.method} {getattr(route, 'path', '')}"
+    limit: Optional[Limit] = limiter.limits.get(name)
+    if limit is None:
+        return
+    retry_after = await limiter.backend.take(f"{name}|{await _caller(request)}", limit)
+    if retry_after > 0:
+        RATE_LIMITED.inc(route=name)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
@@ -0,0 +1,81 @@
+"""Route class that moves database-bound endpoints onto the async engine.
+
+Endpoints are written once, synchronously, against ``db: Session =
+Depends(get_db)``. With ``settings.ASYNC_DATABASE`` enabled, ``SessionRoute``
+turns each of them into a coroutine that runs the body through
+``AsyncSession.run_sync``: the ORM code is unchanged but every round trip is
+awaited on the event loop instead of occupying a threadpool worker. The
+response model is validated inside the same greenlet so lazy relationships can
+still load. CPU-bound endpoints opt out with ``@keep_in_threadpool``.
+"""
+
+import inspect
+from typing import Any, Callable
+
+from fastapi import Depends
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import Response
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+from .config import settings
+from .database import get_async_db, get_db
+
+
+def keep_in_threadpool(endpoint: Callable) -> Callable:
+    """Keep ``endpoint`` on the threadpool and sync engine even in async mode."""
+    endpoint.keep_in_threadpool = True
+    return endpoint
+
+
+def _sync_db_parameter(endpoint: Callable):
+    for parameter in inspect.signature(endpoint).parameters.values():
+        if getattr(parameter.default, "dependency", None) is get_db:
+            return parameter
+    return None
+
+
+def _run_on_async_session(endpoint: Callable, response_model: Any) -> Callable:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    signature = inspect.signature(endpoint)
+    db_name = _sync_db_parameter(endpoint).name
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+
+    def call(session, kwargs):
+        result = endpoint(**{**kwargs, db_name: session})
+        if adapter is None or isinstance(result, Response):
+            return result
+        return adapter.validate_python(result, from_attributes=True)
+
+    async def wrapper(**kwargs):
+        db = kwargs.pop(db_name)
+        return await db.run_sync(call, kwargs)
+
+    # Deliberately no functools.wraps: FastAPI unwraps __wrapped__ to decide whether to await.
+    wrapper.__name__ = endpoint.__name__
+    wrapper.__doc__ = endpoint.__doc__
+    wrapper.__signature__ = signature.replace(
+        parameters=[
+            parameter.replace(default=Depends(get_async_db), annotation=AsyncSession)
+            if parameter.name == db_name
+            else parameter
+            for parameter in signature.parameters.values()
+        ]
+    )
+    return wrapper
+
+
+class SessionRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        if (
+            settings.ASYNC_DATABASE
+            and not inspect.iscoroutinefunction(endpoint)
+            and not getattr(endpoint, "keep_in_threadpool", False)
+            and _sync_db_parameter(endpoint) is not None
+        ):
+            response_model = kwargs.get("response_model")
+            if isinstance(response_model, DefaultPlaceholder):
+                response_model = response_model.value
+            endpoint = _run_on_async_session(endpoint, response_model)
+        super().__init__(path, endpoint, **kwargs)
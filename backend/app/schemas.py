@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, EmailStr, Field
 
@@ -93,6 +93,7 @@ class ReviewCreate(ReviewBase):
 
 class ReviewRead(ReviewBase):
     id: int
+    anon_id: str
     created_at: datetime
     rebuttal: Optional["RebuttalRead"] = None
     course: CourseRead
@@ -117,4 +118,73 @@ class RebuttalRead(RebuttalBase):
         orm_mode = True
 
 
+class DimensionStats(BaseModel):
+    average: Optional[float]
+    histogram: List[int]
+
+
+class ScoreStats(BaseModel):
+    review_count: int
+    # Mean of the fairness, clarity and engagement scores.
+    overall_average: Optional[float]
+    dimensions: Dict[str, DimensionStats]
+
+
+class CourseScoreStats(ScoreStats):
+    course_id: int
+
+
+class ProfessorStatsRead(ScoreStats):
+    professor_id: int
+    courses: List[CourseScoreStats] = Field(default_factory=list)
+
+
+class PublicProfessor(ProfessorBase):
+    id: int
+    courses: List[CourseRead] = Field(default_factory=list)
+    review_count: int
+    dimensions: Dict[str, DimensionStats]
+
+
+class RankingEntry(BaseModel):
+    rank: int
+    professor_id: int
+    name: str
+    department: str
+    review_count: int
+    average: float
+    score: float
+
+
+class RankingPosition(RankingEntry):
+    total: int
+
+
+class ChangeEntry(BaseModel):
+    seq: int
+    entity: str
+    entity_id: int
+    operation: str
+    created_at: datetime
+    # The entity as its list route returns it; null if it no longer exists.
+    data: Optional[dict]
+
+
+class ChangeFeed(BaseModel):
+    changes: List[ChangeEntry]
+    next: int
+    has_more: bool
+
+
+class BulkImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class BulkImportResult(BaseModel):
+    created: int
+    failed: int
+    errors: List[BulkImportError]
+
+
 ReviewRead.update_forward_refs()
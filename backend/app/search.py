@@ -0,0 +1,160 @@
+"""Full-text search over review summaries, strengths and weaknesses.
+
+The backend is picked from the database dialect. SQLite keeps an
+external-content FTS5 table in sync with ``reviews`` through triggers, so
+every insert path (routes, bulk imports, manual SQL) is indexed in the same
+transaction. PostgreSQL uses a GIN index over a ``to_tsvector`` expression.
+``install`` creates whatever the database needs and runs as a migration.
+"""
+
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import column, func, literal_column, select, table
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import Course, Review
+
+
+class SearchQueryError(ValueError):
+    """Raised when a search string contains nothing that can be matched."""
+
+
+class SearchBackend(ABC):
+    @abstractmethod
+    def install(self, conn: Connection) -> None:
+        """Create the index and whatever keeps it in sync with ``reviews``."""
+
+    @abstractmethod
+    def uninstall(self, conn: Connection) -> None:
+        """Drop what ``install`` created."""
+
+    @abstractmethod
+    def search(
+        self,
+        db: Session,
+        text: str,
+        professor_id: Optional[int] = None,
+        course_id: Optional[int] = None,
+        term: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> List[Tuple[int, float]]:
+        """Return ``(review id, score)`` pairs, best match first."""
+
+    @staticmethod
+    def _filter(statement, professor_id, course_id, term):
+        if professor_id is not None:
+            statement = statement.where(Review.professor_id == professor_id)
+        if course_id is not None:
+            statement = statement.where(Review.course_id == course_id)
+        if term is not None:
+            statement = statement.join(Course, Course.id == Review.course_id).where(Course.term == term)
+        return statement
+
+
+class SqliteFtsBackend(SearchBackend):
+    TABLE = "reviews_fts"
+
+    def install(self, conn: Connection) -> None:
+        columns = "summary, strengths, weaknesses"
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE} USING fts5({columns}, "
+            f"content='reviews', content_rowid='id', tokenize='{settings.SEARCH_TOKENIZER}')"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {self.TABLE}_ai AFTER INSERT ON reviews BEGIN "
+            f"INSERT INTO {self.TABLE}(rowid, {columns}) VALUES (new.id, new.summary, new.strengths, new.weaknesses); END"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {self.TABLE}_ad AFTER DELETE ON reviews BEGIN "
+            f"INSERT INTO {self.TABLE}({self.TABLE}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, old.summary, old.strengths, old.weaknesses); END"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {self.TABLE}_au AFTER UPDATE OF {columns} ON reviews BEGIN "
+            f"INSERT INTO {self.TABLE}({self.TABLE}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, old.summary, old.strengths, old.weaknesses); "
+            f"INSERT INTO {self.TABLE}(rowid, {columns}) VALUES (new.id, new.summary, new.strengths, new.weaknesses); END"
+        )
+        conn.exec_driver_sql(f"INSERT INTO {self.TABLE}({self.TABLE}) VALUES ('rebuild')")
+
+    def uninstall(self, conn: Connection) -> None:
+        for suffix in ("ai", "ad", "au"):
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {self.TABLE}_{suffix}")
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {self.TABLE}")
+
+    def match_expression(self, text: str) -> str:
+        # Quote every word so user input can never be parsed as FTS5 query syntax.
+        min_length = 3 if settings.SEARCH_TOKENIZER.startswith("trigram") else 1
+        words = [word for word in re.findall(r"\w+", text) if len(word) >= min_length]
+        if not words:
+            raise SearchQueryError(f"Search needs at least one word of {min_length} or more characters")
+        return " ".join(f'"{word}"' for word in words)
+
+    def search(self, db, text, professor_id=None, course_id=None, term=None, limit=20, offset=0):
+        fts_table = table(self.TABLE, column("rowid"))
+        fts = literal_column(self.TABLE)
+        rank = func.bm25(fts)
+        statement = (
+            select(Review.id, rank)
+            .select_from(Review)
+            .join(fts_table, fts_table.c.rowid == Review.id)
+            .where(fts.op("MATCH")(self.match_expression(text)))
+        )
+        statement = self._filter(statement, professor_id, course_id, term)
+        # bm25() is lower-is-better; flip it so scores read like ts_rank.
+        rows = db.execute(statement.order_by(rank, Review.id.desc()).limit(limit).offset(offset)).all()
+        return [(review_id, -score) for review_id, score in rows]
+
+
+class PostgresFtsBackend(SearchBackend):
+    INDEX = "ix_reviews_fts"
+
+    @property
+    def document(self) -> str:
+        return (
+            f"to_tsvector('{settings.SEARCH_PG_CONFIG}', coalesce(summary, '') || ' ' || "
+            "coalesce(strengths, '') || ' ' || coalesce(weaknesses, ''))"
+        )
+
+    def install(self, conn: Connection) -> None:
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {self.INDEX} ON reviews USING GIN ({self.document})")
+
+    def uninstall(self, conn: Connection) -> None:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {self.INDEX}")
+
+    def search(self, db, text, professor_id=None, course_id=None, term=None, limit=20, offset=0):
+        if not re.search(r"\w", text):
+            raise SearchQueryError("Search needs at least one word")
+        document = literal_column(self.document)
+        query = func.websearch_to_tsquery(settings.SEARCH_PG_CONFIG, text)
+        rank = func.ts_rank(document, query)
+        statement = select(Review.id, rank).where(document.op("@@")(query))
+        statement = self._filter(statement, professor_id, course_id, term)
+        return db.execute(statement.order_by(rank.desc(), Review.id.desc()).limit(limit).offset(offset)).all()
+
+
+BACKENDS: Dict[str, SearchBackend] = {
+    "sqlite": SqliteFtsBackend(),
+    "postgresql": PostgresFtsBackend(),
+}
+
+
+def get_backend(dialect_name: str) -> Optional[SearchBackend]:
+    return BACKENDS.get(dialect_name)
+
+
+def install(conn: Connection) -> None:
+    backend = get_backend(conn.dialect.name)
+    if backend is not None:
+        backend.install(conn)
+
+
+def uninstall(conn: Connection) -> None:
+    backend = get_backend(conn.dialect.name)
+    if backend is not None:
+        backend.uninstall(conn)
@@ -1,26 +1,105 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Deque, List, Optional, Sequence
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from .config import settings
+from .metrics import PASSWORD_HASH_LATENCY
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min and max rounds to the configured cost makes needs_update() flag
+# hashes created under any other cost, so logins migrate them transparently.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a thread pool gives real parallelism. The
+# semaphore bounds running plus queued jobs; beyond that callers are shed.
+# Routes await the jobs (``*_async``) rather than blocking a threadpool worker
+# on them, so a burst of logins cannot take the threadpool from other routes.
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool is saturated."""
+
+
+def _submit(operation: str, func, *args, wait: bool = False) -> Future:
+    """Queue ``func`` on the hash pool; shed with ``PasswordHasherBusy`` unless ``wait``."""
+    if not _hash_slots.acquire(blocking=wait):
+        raise PasswordHasherBusy()
+    started = time.perf_counter()
+    try:
+        future = _hash_executor.submit(func, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+
+    def done(_) -> None:
+        _hash_slots.release()
+        PASSWORD_HASH_LATENCY.observe(time.perf_counter() - started, operation=operation)
+
+    future.add_done_callback(done)
+    return future
+
+
+def warm_up() -> None:
+    """Load the bcrypt backend and start the hash pool threads before the first login."""
+    pwd_context.handler().get_backend()
+    for future in [_hash_executor.submit(time.sleep, 0.01) for _ in range(settings.PASSWORD_HASH_WORKERS)]:
+        future.result()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _submit("verify", pwd_context.verify, plain_password, hashed_password).result()
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _submit("hash", pwd_context.hash, password).result()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.wrap_future(_submit("verify", pwd_context.verify, plain_password, hashed_password))
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit("hash", pwd_context.hash, password))
+
+
+def hash_passwords(passwords: Sequence[str]) -> List[str]:
+    """Hash a batch for bulk imports on the shared pool.
+
+    Waits for free slots instead of shedding, but keeps at most
+    ``PASSWORD_HASH_WORKERS`` jobs in flight so the queue stays open to logins.
+    """
+    hashes: List[str] = []
+    in_flight: Deque[Future] = deque()
+    for password in passwords:
+        if len(in_flight) >= settings.PASSWORD_HASH_WORKERS:
+            hashes.append(in_flight.popleft().result())
+        in_flight.append(_submit("hash", pwd_context.hash, password, wait=True))
+    hashes.extend(future.result() for future in in_flight)
+    return hashes
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or settings.access_token_expires)
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    to_encode.update({"iat": now, "exp": now + (expires_delta or settings.access_token_expires)})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
@@ -0,0 +1,123 @@
+"""Application lifespan: schema check, warm-up hooks and engine disposal.
+
+Importing ``app.main`` opens no connections, so a pre-forking server
+(``gunicorn --preload``, see ``gunicorn.conf.py``) can import the app once in
+the master and share the modules with its workers. Each worker then runs the
+lifespan: it drops any pooled connections inherited across the fork, compares
+the stored schema version with the latest migration, and runs the registered
+warm-up hooks, connects the event broker and loads the public snapshot before
+accepting requests.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from . import archive, database, events, migrations, public, security, write_queue
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+WarmupHook = Callable[[], Awaitable[None]]
+WARMUP_HOOKS: List[WarmupHook] = []
+
+
+def warmup_hook(hook: WarmupHook) -> WarmupHook:
+    """Register an async callable to run once per worker before it serves requests."""
+    WARMUP_HOOKS.append(hook)
+    return hook
+
+
+def _sync_engines():
+    return {id(engine): engine for engine in (database.engine, database.read_engine)}.values()
+
+
+def _async_engines():
+    if not settings.ASYNC_DATABASE:
+        return []
+    return {id(engine): engine for engine in (database.async_engine, database.async_read_engine)}.values()
+
+
+def _connection_count(engine) -> int:
+    size = getattr(engine.pool, "size", None)
+    return max(1, min(settings.WARMUP_CONNECTIONS, size() if callable(size) else 1))
+
+
+def _open_connections(engine) -> None:
+    connections = [engine.connect() for _ in range(_connection_count(engine))]
+    try:
+        for connection in connections:
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+@warmup_hook
+async def warm_mappers() -> None:
+    await run_in_threadpool(configure_mappers)
+
+
+@warmup_hook
+async def warm_connections() -> None:
+    for engine in _sync_engines():
+        await run_in_threadpool(_open_connections, engine)
+    for engine in _async_engines():
+        connections = [await engine.connect() for _ in range(_connection_count(engine.sync_engine))]
+        try:
+            await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in connections))
+        finally:
+            for connection in connections:
+                await connection.close()
+
+
+@warmup_hook
+async def warm_password_hasher() -> None:
+    await run_in_threadpool(security.warm_up)
+
+
+async def run_warmup() -> None:
+    for hook in WARMUP_HOOKS:
+        started = time.perf_counter()
+        try:
+            await hook()
+        except Exception:
+            logger.exception("Warm-up hook %s failed", hook.__name__)
+        else:
+            logger.info("Warm-up hook %s took %.1f ms", hook.__name__, (time.perf_counter() - started) * 1000)
+
+
+def _prepare_schema() -> None:
+    if settings.AUTO_MIGRATE:
+        migrations.migrate()
+    else:
+        migrations.check()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connections pooled before a fork belong to the parent; never reuse them.
+    for engine in _sync_engines():
+        engine.dispose(close=False)
+    await run_in_threadpool(_prepare_schema)
+    if settings.WARMUP:
+        await run_warmup()
+    await events.start()
+    await public.start()
+    yield
+    await public.stop()
+    await events.stop()
+    # Commit submissions still queued for the group-commit writer.
+    await run_in_threadpool(write_queue.writer.stop)
+    await archive.dispose()
+    for engine in _async_engines():
+        await engine.dispose()
+    for engine in _sync_engines():
+        engine.dispose()
@@ -0,0 +1,60 @@
+"""Data-version counters backing conditional GETs.
+
+Writers call ``bump`` for every scope they change, inside their own
+transaction. Read routes call ``not_modified`` before touching any rows: it
+reads a single ``data_versions`` row, sets ``ETag``/``Last-Modified`` and
+returns a ready 304 response when the client's ``If-None-Match`` matches.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import DataVersion
+
+COURSES = "courses"
+PROFESSORS = "professors"
+
+
+def professor_reviews(professor_id: int) -> str:
+    return f"professor:{professor_id}:reviews"
+
+
+def bump(db: Session, *scopes: str) -> None:
+    table = DataVersion.__table__
+    now = datetime.utcnow()
+    for scope in scopes:
+        statement = update(table).where(table.c.scope == scope).values(version=table.c.version + 1, updated_at=now)
+        if db.execute(statement).rowcount:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(insert(table).values(scope=scope, version=1, updated_at=now))
+        except IntegrityError:
+            db.execute(statement)
+
+
+def not_modified(request: Request, response: Response, db: Session, scope: str) -> Optional[Response]:
+    """Tag ``response`` with the scope's version; return a 304 if the client already has it."""
+    row = db.get(DataVersion, scope)
+    version = row.version if row else 0
+    # Query parameters (pagination, streaming) select different bodies for the same data version.
+    variant = hashlib.blake2b(str(request.url.query).encode(), digest_size=6).hexdigest()
+    headers = {"ETag": f'W/"{version}-{variant}"', "Cache-Control": "private, no-cache"}
+    if row is not None:
+        headers["Last-Modified"] = format_datetime(row.updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or headers["ETag"] in _entity_tags(if_none_match)):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def _entity_tags(header: str):
+    return {tag.strip() if tag.strip().startswith("W/") else f"W/{tag.strip()}" for tag in header.split(",")}
@@ -0,0 +1,135 @@
+"""Group commit for review and rebuttal submissions.
+
+With ``OPENRATER_WRITE_QUEUE=true`` the write half of ``POST /reviews`` and
+``POST /reviews/{id}/rebuttal`` is handed to a single writer thread instead of
+committing in the request. The writer takes the first pending job, waits up to
+``WRITE_QUEUE_MAX_DELAY_MS`` for more (at most ``WRITE_QUEUE_MAX_BATCH``), runs
+each job in its own savepoint of one transaction and commits once. On SQLite
+that is one writer-lock acquisition and one fsync per batch rather than per
+submission, so a burst of writers no longer queues on the database lock.
+
+A job that raises (an ``HTTPException`` for a duplicate rebuttal, say) is
+rolled back to its savepoint and the exception is re-raised in its caller;
+the rest of the batch still commits. If the commit itself fails, every job is
+retried in a transaction of its own. Callers block until their batch has
+committed, so the routes stay on the threadpool while the queue is enabled,
+and close their own session first so that waiting requests never hold the
+pool connections the writer needs.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from .config import settings
+from .database import SessionLocal
+from .metrics import WRITE_BATCH_SIZE
+from .routing import keep_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Job = Tuple[Callable[[Session], object], Future]
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, session_factory: sessionmaker, max_batch: int, max_delay: float):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, work: Callable[[Session], T]) -> T:
+        """Run ``work(db)`` in the next batch; return its result once the batch has committed."""
+        self._ensure_started()
+        future: Future = Future()
+        self._jobs.put((work, future))
+        return future.result()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="openrater-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        """Commit what is already queued, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._jobs.put(_STOP)
+            thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            job = self._jobs.get()
+            if job is _STOP:
+                return
+            batch = [job]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._jobs.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    stopping = True
+                    break
+                batch.append(job)
+            WRITE_BATCH_SIZE.observe(len(batch))
+            try:
+                self._commit(batch)
+            except Exception as exc:  # never let the writer die with callers waiting
+                logger.exception("Write batch failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _commit(self, batch: List[Job]) -> None:
+        outcomes = []
+        db = self.session_factory(expire_on_commit=False)
+        try:
+            for work, future in batch:
+                try:
+                    with db.begin_nested():
+                        outcomes.append((future, work(db), None))
+                except Exception as exc:
+                    outcomes.append((future, None, exc))
+            db.commit()
+        except Exception:
+            db.rollback()
+            if len(batch) == 1:
+                raise
+            logger.warning("Group commit of %d writes failed; retrying them one by one", len(batch), exc_info=True)
+            for job in batch:
+                try:
+                    self._commit([job])
+                except Exception as exc:
+                    job[1].set_exception(exc)
+            return
+        finally:
+            db.close()
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+
+writer = WriteQueue(SessionLocal, settings.WRITE_QUEUE_MAX_BATCH, settings.WRITE_QUEUE_MAX_DELAY_MS / 1000)
+
+
+def route(endpoint: Callable) -> Callable:
+    """Keep a queued write route on the threadpool: its caller blocks until the batch commits."""
+    return keep_in_threadpool(endpoint) if settings.WRITE_QUEUE else endpoint
@@ -0,0 +1,10 @@
+"""Load-testing benchmarks for the OpenRater API.
+
+Builds a synthetic dataset through the real models, drives every route with
+concurrent clients (in-process over ASGI or against a local uvicorn) and
+reports latency percentiles, throughput and SQL statements per request.
+Results can be saved as a JSON baseline and compared on later runs:
+
+    python -m benchmarks --reviews 20000 --save baseline.json
+    python -m benchmarks --reviews 20000 --compare baseline.json
+"""
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import uuid
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark every OpenRater route.")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (uvicorn mode)")
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite file in a temp directory")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--only", nargs="*", default=[], help="substrings of endpoint names to run")
+    parser.add_argument("--reviewers", type=int, default=200)
+    parser.add_argument("--professors", type=int, default=100)
+    parser.add_argument("--courses", type=int, default=300)
+    parser.add_argument("--courses-per-professor", type=int, default=3)
+    parser.add_argument("--reviews", type=int, default=5000)
+    parser.add_argument("--rebuttal-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="fail on regressions against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Settings are read at import time, so point the app at the benchmark database first.
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='openrater-bench-')}/bench.db"
+    os.environ["OPENRATER_DATABASE_URL"] = database_url
+    # Every scenario reuses a handful of principals; per-caller limits would turn the run into 429s.
+    os.environ.setdefault("OPENRATER_RATE_LIMIT_ENABLED", "false")
+
+    from app import migrations
+    from app.database import SessionLocal
+    from .profiling import StatementCounter
+
+    from . import datagen, runner, scenarios
+
+    migrations.migrate()
+    config = datagen.DatasetConfig(
+        reviewers=args.reviewers,
+        professors=args.professors,
+        courses=args.courses,
+        courses_per_professor=args.courses_per_professor,
+        reviews=args.reviews,
+        rebuttal_ratio=args.rebuttal_ratio,
+        seed=args.seed,
+    )
+    db = SessionLocal()
+    try:
+        if not datagen.is_empty(db):
+            print(f"Refusing to generate data into a non-empty database: {database_url}", file=sys.stderr)
+            return 2
+        dataset = datagen.generate(db, config)
+    finally:
+        db.close()
+    ctx = scenarios.Context(dataset, run_id=uuid.uuid4().hex[:8])
+    selected = scenarios.select_scenarios(args.only)
+
+    async def drive() -> dict:
+        if args.mode == "uvicorn":
+            client_context = runner.uvicorn_client(args.workers, {"OPENRATER_DATABASE_URL": database_url})
+            statement_counter = None
+        else:
+            from app.main import app
+
+            client_context = runner.in_process_client(app)
+            statement_counter = StatementCounter
+        results = {}
+        async with client_context as client:
+            for scenario in selected:
+                results[scenario.name] = await runner.run_scenario(
+                    client, scenario, ctx, args.requests, args.concurrency, statement_counter
+                )
+        return results
+
+    results = asyncio.run(drive())
+    runner.print_report(results)
+
+    meta = {"mode": args.mode, "workers": args.workers, "requests": args.requests, "concurrency": args.concurrency, **vars(config)}
+    if args.save:
+        runner.save_baseline(args.save, meta, results)
+        print(f"Baseline written to {args.save}")
+    if args.compare:
+        regressions = runner.compare_baseline(args.compare, meta, results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Concurrent allocation check for anonymous review IDs.
+
+Starts one professor's counter close to the end of the 62**4 space, then has
+many threads each insert reviews with ``anon_ids.allocate`` in their own
+transactions until the space is full. The run fails if any insert hits the
+``(professor_id, anon_id)`` unique index, if any ID repeats, or if allocating
+past the end does not raise ``AnonIdSpaceExhausted``. ``--full-permutation``
+additionally checks that the permutation is a bijection over the whole space
+(slow: a few minutes).
+
+    python -m benchmarks.anon_ids --threads 32 --per-thread 500
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.anon_ids", description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite file in a temp directory")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--per-thread", type=int, default=250)
+    parser.add_argument("--full-permutation", action="store_true")
+    args = parser.parse_args(argv)
+    os.environ["OPENRATER_DATABASE_URL"] = (
+        args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='openrater-bench-')}/bench.db"
+    )
+
+    from sqlalchemy import func, select, update
+    from sqlalchemy.exc import IntegrityError
+
+    from app import anon_ids, migrations, models
+    from app.database import SessionLocal
+
+    from . import datagen
+
+    # Writers queue on the counter row (and on SQLite's file lock); that wait is expected here.
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)
+    migrations.migrate()
+    db = SessionLocal()
+    try:
+        dataset = datagen.generate(db, datagen.DatasetConfig(reviewers=1, professors=1, courses=1, reviews=0))
+        professor_id = next(iter(dataset.professor_accounts))
+        course_id = dataset.assignments[professor_id][0]
+        reviewer_id = dataset.reviewers[0][0]
+        total = args.threads * args.per_thread
+        start = anon_ids.SPACE - total
+        db.execute(
+            update(models.AnonIdSequence).where(models.AnonIdSequence.professor_id == professor_id).values(next_value=start)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    collisions = []
+    errors = []
+    scores = {dimension: 3 for dimension in models.SCORE_DIMENSIONS}
+
+    def worker() -> None:
+        session = SessionLocal()
+        try:
+            for _ in range(args.per_thread):
+                try:
+                    anon_id = anon_ids.allocate(session, professor_id)
+                    session.add(
+                        models.Review(
+                            reviewer_id=reviewer_id,
+                            professor_id=professor_id,
+                            course_id=course_id,
+                            summary="concurrency check",
+                            anon_id=anon_id,
+                            **scores,
+                        )
+                    )
+                    session.commit()
+                except IntegrityError as exc:
+                    session.rollback()
+                    collisions.append(exc)
+                except Exception as exc:
+                    session.rollback()
+                    errors.append(exc)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    try:
+        stored, distinct = db.execute(
+            select(func.count(models.Review.id), func.count(func.distinct(models.Review.anon_id))).where(
+                models.Review.professor_id == professor_id
+            )
+        ).one()
+        try:
+            anon_ids.allocate(db, professor_id)
+            exhausted = False
+        except anon_ids.AnonIdSpaceExhausted:
+            exhausted = True
+        db.rollback()
+    finally:
+        db.close()
+
+    print(f"{total} allocations on {args.threads} threads in {elapsed:.2f}s ({total / elapsed:.0f}/s)")
+    print(f"fill {start + stored}/{anon_ids.SPACE}")
+    print(f"stored {stored}, distinct {distinct}, collisions {len(collisions)}, other errors {len(errors)}")
+    print(f"allocation past the end raises AnonIdSpaceExhausted: {exhausted}")
+    for error in errors[:5]:
+        print(f"  error: {error!r}")
+    failed = collisions or errors or stored != total or distinct != total or not exhausted
+
+    if args.full_permutation:
+        seen = bytearray(anon_ids.SPACE)
+        for value in range(anon_ids.SPACE):
+            seen[anon_ids.permute(professor_id, value)] = 1
+        bijective = all(seen)
+        print(f"permutation covers all {anon_ids.SPACE} values: {bijective}")
+        failed = failed or not bijective
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Hot-path latency before and after archiving the closed terms.
+
+Builds a dataset spread over ``datagen.TERMS``, measures the current-term
+reads and writes, the cross-term review list and search, then closes every
+term but the last with ``app.archive`` and measures them again. The first
+page of each list must be the same right before and right after the move
+(search is exempt: it lists live matches before archived ones).
+Exits 1 if one differs or a request fails. ``sql/req`` counts statements on
+the live database only.
+
+    python -m benchmarks.archive --reviews 50000 --requests 200
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import uuid
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.archive", description=__doc__.splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=20000)
+    parser.add_argument("--professors", type=int, default=200)
+    parser.add_argument("--courses", type=int, default=600)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and phase")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args(argv)
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)
+    directory = tempfile.mkdtemp(prefix="openrater-bench-")
+    os.environ["OPENRATER_DATABASE_URL"] = f"sqlite:///{directory}/bench.db"
+    os.environ["OPENRATER_ARCHIVE_URL"] = f"sqlite:///{directory}/archive/{{term}}.db"
+    os.environ.setdefault("OPENRATER_RATE_LIMIT_ENABLED", "false")
+
+    from sqlalchemy import func, select
+
+    from app import archive, migrations, models
+    from app.database import SessionLocal
+    from app.main import app
+    from .profiling import StatementCounter
+
+    from . import datagen, runner
+    from .scenarios import Context, Scenario, _review_payload
+
+    migrations.migrate()
+    db = SessionLocal()
+    try:
+        dataset = datagen.generate(
+            db,
+            datagen.DatasetConfig(reviews=args.reviews, professors=args.professors, courses=args.courses),
+        )
+        live_term, closed_terms = datagen.TERMS[-1], datagen.TERMS[:-1]
+        live_courses = set(db.scalars(select(models.Course.id).where(models.Course.term == live_term)))
+    finally:
+        db.close()
+
+    ctx = Context(dataset, uuid.uuid4().hex[:8])
+    ctx.assigned = [pair for pair in ctx.assigned if pair[1] in live_courses]
+    professor_id = ctx.assigned[0][0]
+    professor_headers = ctx.professors[professor_id]
+    reads = (
+        Scenario(
+            f"GET /reviews?term={live_term}&limit=50",
+            lambda ctx, i: ("GET", "/reviews", {"params": {"term": live_term, "limit": 50}, "headers": ctx.admin}),
+        ),
+        Scenario(
+            f"GET /professors/{{id}}/reviews?term={live_term}",
+            lambda ctx, i: (
+                "GET",
+                f"/professors/{professor_id}/reviews",
+                {"params": {"term": live_term, "limit": 50}, "headers": professor_headers},
+            ),
+        ),
+        Scenario(
+            "GET /professors/{id}/reviews?limit=50 (all terms)",
+            lambda ctx, i: ("GET", f"/professors/{professor_id}/reviews", {"params": {"limit": 50}, "headers": professor_headers}),
+        ),
+        Scenario("GET /reviews?limit=50 (all terms)", lambda ctx, i: ("GET", "/reviews", {"params": {"limit": 50}, "headers": ctx.admin})),
+    )
+    others = (
+        Scenario(
+            "GET /reviews/search (all terms)",
+            lambda ctx, i: ("GET", "/reviews/search", {"params": {"q": "lectures"}, "headers": ctx.admin}),
+        ),
+        Scenario(
+            f"POST /reviews ({live_term})",
+            lambda ctx, i: ("POST", "/reviews", {"json": _review_payload(ctx, i), "headers": ctx.reviewer(i)}),
+            expect=(201,),
+        ),
+    )
+
+    def live_reviews() -> int:
+        db = SessionLocal()
+        try:
+            return db.scalar(select(func.count(models.Review.id)))
+        finally:
+            db.close()
+
+    async def measure(client, phase: str, offset: int) -> dict:
+        results = {}
+        for scenario in (*reads, *others):
+            name = f"{scenario.name} [{phase}]"
+            shifted = Scenario(name, lambda ctx, i, build=scenario.build: build(ctx, offset + i), scenario.expect)
+            results[name] = await runner.run_scenario(
+                client, shifted, ctx, args.requests, args.concurrency, StatementCounter
+            )
+        return results
+
+    async def first_pages(client) -> list:
+        pages = []
+        for scenario in reads:
+            method, url, kwargs = scenario.build(ctx, 0)
+            pages.append((await client.request(method, url, **kwargs)).json())
+        return pages
+
+    def close_terms() -> None:
+        db = SessionLocal()
+        try:
+            for term in closed_terms:
+                archive.close(db, term, wait=0, log=lambda message: None)
+        finally:
+            db.close()
+
+    async def run() -> int:
+        async with runner.in_process_client(app) as client:
+            print(f"{live_reviews()} live reviews")
+            results = await measure(client, "live", 0)
+            before = await first_pages(client)
+            await asyncio.get_running_loop().run_in_executor(None, close_terms)
+            after = await first_pages(client)
+            print(f"{live_reviews()} live reviews after closing {', '.join(closed_terms)}")
+            results.update(await measure(client, "archived", args.requests))
+        runner.print_report(dict(sorted(results.items())))
+        mismatched = [scenario.name for scenario, old, new in zip(reads, before, after) if old != new]
+        for name in mismatched:
+            print(f"MISMATCH {name}")
+        failed = any(result["errors"] for result in results.values())
+        return 1 if mismatched or failed else 0
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Racing duplicate creates against the constraint-backed write routes.
+
+For ``POST /auth/bootstrap``, ``/auth/register``, ``/courses`` and
+``/reviews/{id}/rebuttal``, ``--concurrency`` requests for the same admin,
+email, course code or review are fired at once against a fresh database.
+Exactly one may succeed, the others must get the route's usual 400, and the
+table must hold a single matching row. The report also shows the SQL
+statements the race issued per request and those of one more, sequential,
+duplicate. Afterwards an admin is bulk-imported and the bootstrapped admin is
+deleted: bootstrap must stay closed while the imported admin exists, and open
+again once no admin is left. Exits 1 on any duplicate row or unexpected
+response.
+
+    python -m benchmarks.constraints --concurrency 32
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from collections import Counter
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.constraints", description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args(argv)
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)
+    os.environ["OPENRATER_DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='openrater-bench-')}/bench.db"
+    os.environ.setdefault("OPENRATER_RATE_LIMIT_ENABLED", "false")
+    # Every request hashes a password; the race is about the insert, not bcrypt.
+    os.environ.setdefault("OPENRATER_BCRYPT_ROUNDS", "4")
+
+    from sqlalchemy import func, select
+
+    from app import bulk_import, migrations, models
+    from app.database import SessionLocal
+    from app.main import app
+    from .profiling import StatementCounter
+
+    from . import runner
+
+    migrations.migrate()
+
+    def stored(condition) -> int:
+        db = SessionLocal()
+        try:
+            return db.scalar(select(func.count()).select_from(condition.left.table).where(condition))
+        finally:
+            db.close()
+
+    async def contest(client, name: str, build, condition) -> list:
+        """Race ``build(n)`` requests, then send one more; return the raced responses."""
+        with StatementCounter() as raced:
+            responses = await asyncio.gather(*(_send(client, build(n)) for n in range(args.concurrency)))
+        with StatementCounter() as repeated:
+            duplicate = await _send(client, build(args.concurrency))
+        statuses = Counter(response.status_code for response in responses)
+        other = args.concurrency - statuses[201] - statuses[400]
+        rows = stored(condition)
+        print(
+            f"{name:<30}{statuses[201]:>8}{statuses[400]:>6}{other:>7}{rows:>6}"
+            f"{raced.count / args.concurrency:>11.1f}{repeated.count:>11}"
+        )
+        for response in responses:
+            if response.status_code not in (201, 400):
+                print(f"    {response.status_code} {response.text[:200]}")
+                break
+        if statuses[201] != 1 or other or rows != 1 or duplicate.status_code != 400:
+            failures.append(name)
+        return responses
+
+    def delete_user(user_id: int) -> None:
+        db = SessionLocal()
+        try:
+            db.delete(db.get(models.User, user_id))
+            db.commit()
+        finally:
+            db.close()
+
+    def import_admin() -> int:
+        db = SessionLocal()
+        try:
+            record = _account("imported", "admin")
+            bulk_import.run_import(db, bulk_import.ImportEntity.USERS, [(2, record)])
+            return db.scalar(select(models.User.id).where(models.User.email == record["email"]))
+        finally:
+            db.close()
+
+    async def reopen(client, bootstrapped_id: int) -> None:
+        """Bootstrap answers like the baseline's "no admin exists" check, whoever created the admins."""
+        loop = asyncio.get_running_loop()
+        imported_id = await loop.run_in_executor(None, import_admin)
+        await loop.run_in_executor(None, delete_user, bootstrapped_id)
+        expectations = [("POST /auth/bootstrap, imported admin", 400)]
+        statuses = [(await _send(client, ("POST", "/auth/bootstrap", {"json": _account("late", "admin")}))).status_code]
+        await loop.run_in_executor(None, delete_user, imported_id)
+        expectations.append(("POST /auth/bootstrap, no admin", 201))
+        statuses.append((await _send(client, ("POST", "/auth/bootstrap", {"json": _account("again", "admin")}))).status_code)
+        for (name, expected), got in zip(expectations, statuses):
+            print(f"{name:<40}{got:>4} (expected {expected})")
+            if got != expected:
+                failures.append(name)
+
+    async def run() -> None:
+        print(f"{args.concurrency} concurrent requests per route")
+        print(f"{'route':<30}{'created':>8}{'400':>6}{'other':>7}{'rows':>6}{'stmts/req':>11}{'stmts dup':>11}")
+        users = models.User.__table__.c
+        async with runner.in_process_client(app) as client:
+            responses = await contest(
+                client,
+                "POST /auth/bootstrap",
+                lambda n: ("POST", "/auth/bootstrap", {"json": _account(f"admin{n}", "admin")}),
+                users.role == models.RoleEnum.ADMIN.name,
+            )
+            bootstrapped = next(response.json() for response in responses if response.status_code == 201)
+            admin = _headers(bootstrapped)
+            # Resolve the principal once, so the races below measure the routes rather than the auth cache.
+            await client.get("/users/me", headers=admin)
+            await contest(
+                client,
+                "POST /auth/register",
+                lambda n: ("POST", "/auth/register", {"json": _account("racer", "reviewer"), "headers": admin}),
+                users.email == "racer@bench.openrater",
+            )
+            await contest(
+                client,
+                "POST /courses",
+                lambda n: ("POST", "/courses", {"json": {"name": "Race", "code": "RACE", "term": "2026F"}, "headers": admin}),
+                models.Course.__table__.c.code == "RACE",
+            )
+            review_id, professor = await _review_to_rebut(client, admin)
+            await contest(
+                client,
+                "POST /reviews/{id}/rebuttal",
+                lambda n: ("POST", f"/reviews/{review_id}/rebuttal", {"json": {"content": "race"}, "headers": professor}),
+                models.Rebuttal.__table__.c.review_id == review_id,
+            )
+            await reopen(client, bootstrapped["id"])
+
+    failures = []
+    asyncio.run(run())
+    return 1 if failures else 0
+
+
+async def _send(client, request):
+    method, url, kwargs = request
+    return await client.request(method, url, **kwargs)
+
+
+def _account(name: str, role: str) -> dict:
+    from .datagen import PASSWORD
+
+    return {"email": f"{name}@bench.openrater", "name": name, "password": PASSWORD, "role": role}
+
+
+def _headers(user: dict) -> dict:
+    from app.security import create_access_token
+
+    token = create_access_token({"sub": user["email"], "uid": user["id"], "role": user["role"]})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _review_to_rebut(client, admin: dict) -> tuple:
+    """Create a professor account, its professor, a reviewer and one review; return the review id and professor headers."""
+    from app import models
+
+    professor_user = (await client.post("/auth/register", json=_account("professor", "professor"), headers=admin)).json()
+    reviewer_user = (await client.post("/auth/register", json=_account("reviewer", "reviewer"), headers=admin)).json()
+    course_id = (await client.get("/courses", headers=admin)).json()[0]["id"]
+    professor = await client.post(
+        "/professors",
+        json={"name": "Race", "department": "Bench", "course_ids": [course_id], "user_id": professor_user["id"]},
+        headers=admin,
+    )
+    scores = {dimension: 3 for dimension in models.SCORE_DIMENSIONS}
+    review = await client.post(
+        "/reviews",
+        json={"professor_id": professor.json()["id"], "course_id": course_id, "summary": "race", **scores},
+        headers=_headers(reviewer_user),
+    )
+    professor_headers = _headers(professor_user)
+    await client.get("/users/me", headers=professor_headers)
+    return review.json()["id"], professor_headers
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Synthetic dataset generator built on the application models."""
+
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app import admins, aggregates, anon_ids, changes, models, rankings
+from app.security import pwd_context
+
+WORDS = (
+    "clear lectures engaging fair grading heavy workload helpful office hours slides examples "
+    "confusing pace organized feedback responsive assignments projects exams difficult rewarding "
+    "讲课 清楚 作业 偏多 考试 公平 认真 负责 互动 有趣"
+).split()
+TERMS = ("2025S", "2025F", "2026S", "2026F")
+PASSWORD = "benchmark-password"
+
+
+@dataclass
+class DatasetConfig:
+    reviewers: int = 200
+    professors: int = 100
+    courses: int = 300
+    courses_per_professor: int = 3
+    reviews: int = 5000
+    rebuttal_ratio: float = 0.2
+    seed: int = 7
+
+
+@dataclass
+class Dataset:
+    admin: Tuple[int, str] = None
+    reviewers: List[Tuple[int, str]] = field(default_factory=list)
+    # professor id -> (account user id, account email)
+    professor_accounts: Dict[int, Tuple[int, str]] = field(default_factory=dict)
+    course_ids: List[int] = field(default_factory=list)
+    assignments: Dict[int, List[int]] = field(default_factory=dict)
+    # review ids without a rebuttal, with the professor that may rebut them
+    open_reviews: List[Tuple[int, int]] = field(default_factory=list)
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _insert_returning(db: Session, model, rows: List[dict], chunk: int = 1000) -> List[int]:
+    ids = []
+    for start in range(0, len(rows), chunk):
+        ids.extend(
+            db.scalars(
+                insert(model).returning(model.id, sort_by_parameter_order=True), rows[start : start + chunk]
+            ).all()
+        )
+    return ids
+
+
+def generate(db: Session, config: DatasetConfig) -> Dataset:
+    """Populate an empty database and return the ids the scenarios need."""
+    rng = random.Random(config.seed)
+    hashed = pwd_context.hash(PASSWORD)
+    dataset = Dataset()
+
+    def users(role: models.RoleEnum, count: int, prefix: str) -> List[Tuple[int, str]]:
+        emails = [f"{prefix}{i}@bench.openrater" for i in range(count)]
+        rows = [{"email": e, "name": e, "role": role, "hashed_password": hashed} for e in emails]
+        if role == models.RoleEnum.ADMIN:
+            admins.guard(db)
+        return list(zip(_insert_returning(db, models.User, rows), emails))
+
+    dataset.admin = users(models.RoleEnum.ADMIN, 1, "admin")[0]
+    dataset.reviewers = users(models.RoleEnum.REVIEWER, config.reviewers, "reviewer")
+    accounts = users(models.RoleEnum.PROFESSOR, config.professors, "professor")
+
+    dataset.course_ids = _insert_returning(
+        db,
+        models.Course,
+        [{"name": f"Course {i}", "code": f"BENCH{i:05d}", "term": TERMS[i % len(TERMS)]} for i in range(config.courses)],
+    )
+    professor_ids = _insert_returning(
+        db,
+        models.Professor,
+        [
+            {"name": f"Professor {i}", "department": f"Dept {i % 12}", "user_id": accounts[i][0]}
+            for i in range(config.professors)
+        ],
+    )
+    links = []
+    for professor_id, account in zip(professor_ids, accounts):
+        dataset.professor_accounts[professor_id] = account
+        courses = rng.sample(dataset.course_ids, min(config.courses_per_professor, len(dataset.course_ids)))
+        dataset.assignments[professor_id] = courses
+        links.extend({"professor_id": professor_id, "course_id": course_id} for course_id in courses)
+    db.execute(insert(models.course_professor_association), links)
+
+    now = datetime.utcnow()
+    review_rows = []
+    sequences = dict.fromkeys(professor_ids, 0)
+    for _ in range(config.reviews):
+        professor_id = rng.choice(professor_ids)
+        sequence = sequences[professor_id]
+        sequences[professor_id] += 1
+        row = {
+            "anon_id": anon_ids.anon_id(professor_id, sequence),
+            "reviewer_id": rng.choice(dataset.reviewers)[0],
+            "professor_id": professor_id,
+            "course_id": rng.choice(dataset.assignments[professor_id]),
+            "summary": _text(rng, 12),
+            "strengths": _text(rng, 6),
+            "weaknesses": _text(rng, 6),
+            "created_at": now - timedelta(minutes=rng.randrange(525600)),
+        }
+        row.update({dimension: rng.randint(1, 5) for dimension in models.SCORE_DIMENSIONS})
+        review_rows.append(row)
+    review_ids = _insert_returning(db, models.Review, review_rows)
+    db.execute(
+        insert(models.AnonIdSequence),
+        [{"professor_id": professor_id, "next_value": count} for professor_id, count in sequences.items()],
+    )
+
+    rebuttals = []
+    for review_id, row in zip(review_ids, review_rows):
+        account_id = dataset.professor_accounts[row["professor_id"]][0]
+        if rng.random() < config.rebuttal_ratio:
+            rebuttals.append({"review_id": review_id, "professor_id": account_id, "content": _text(rng, 10)})
+        else:
+            dataset.open_reviews.append((review_id, row["professor_id"]))
+    if rebuttals:
+        db.execute(insert(models.Rebuttal), rebuttals)
+
+    aggregates.rebuild(db)
+    rankings.rebuild(db)
+    changes.backfill(db)
+    db.commit()
+    return dataset
+
+
+def is_empty(db: Session) -> bool:
+    return db.execute(select(models.User.id).limit(1)).first() is None
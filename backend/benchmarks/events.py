@@ -0,0 +1,108 @@
+"""Fan-out, heartbeat and backpressure check for ``app.events``.
+
+Opens ``--subscribers`` streams spread over ``--channels`` user channels, all
+reading through ``events.stream`` as ``GET /events`` does, plus one stream
+that never reads. It then publishes ``--events`` events per channel and
+reports delivery throughput and publish-to-receive latency. The run fails if
+a reading stream misses an event, if the stalled stream is not sent ``reset``
+and dropped, if an idle stream gets no heartbeat, or if a disconnected stream
+stays subscribed. ``--broker redis://...`` runs the same check through Redis.
+
+    python -m benchmarks.events --subscribers 2000 --channels 500 --events 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from contextlib import aclosing
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.events", description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=250)
+    parser.add_argument("--events", type=int, default=20, help="events published per channel")
+    parser.add_argument("--broker", default="memory")
+    args = parser.parse_args(argv)
+
+    from app import events
+    from app.config import settings
+
+    return asyncio.run(_run(args, events, settings))
+
+
+async def _run(args, events, settings) -> int:
+    events.broker = events.create_broker(args.broker)
+    await events.start()
+    connected = True
+
+    async def is_disconnected() -> bool:
+        return not connected
+
+    latencies = []
+    received = [0] * args.subscribers
+
+    async def reader(index: int) -> None:
+        channel = events.user_channel(index % args.channels)
+        async with aclosing(events.stream(channel, is_disconnected, heartbeat=5)) as frames:
+            async for frame in frames:
+                if frame.startswith("event: review.created"):
+                    sent = float(frame.rsplit('"sent":', 1)[1].split("}", 1)[0])
+                    latencies.append(time.perf_counter() - sent)
+                    received[index] += 1
+                    if received[index] == args.events:
+                        return
+
+    readers = [asyncio.create_task(reader(index)) for index in range(args.subscribers)]
+    stalled = events.stream(events.user_channel(args.channels), is_disconnected, heartbeat=5)
+    await stalled.__anext__()  # subscribed, then never read again
+    await asyncio.sleep(0.1)
+
+    started = time.perf_counter()
+    for _ in range(args.events):
+        for channel in range(args.channels):
+            await events.publish([channel], "review.created", {"sent": time.perf_counter()})
+        await asyncio.sleep(0)
+    await asyncio.wait_for(asyncio.gather(*readers), timeout=60)
+    elapsed = time.perf_counter() - started
+    for _ in range(settings.EVENTS_QUEUE_SIZE + 1):
+        await events.publish([args.channels], "review.created", {"sent": time.perf_counter()})
+    await asyncio.sleep(0.1)
+
+    frames = [await stalled.__anext__(), None]
+    try:
+        frames[1] = await stalled.__anext__()
+    except StopAsyncIteration:
+        pass
+    stalled_reset = frames[0].startswith("event: reset") and frames[1] is None
+
+    idle = events.stream(events.user_channel(args.channels + 1), is_disconnected, heartbeat=0.05)
+    await idle.__anext__()
+    heartbeat = await idle.__anext__() == events.HEARTBEAT
+    connected = False
+    try:
+        await idle.__anext__()
+        closed = False
+    except StopAsyncIteration:
+        closed = True
+    leaked = sum(len(subscribers) for subscribers in events.hub._channels.values())
+    await events.stop()
+
+    delivered = sum(received)
+    expected = args.subscribers * args.events
+    latencies.sort()
+    print(f"{args.subscribers} streams on {args.channels} channels via {args.broker}, queue {settings.EVENTS_QUEUE_SIZE}")
+    print(f"delivered {delivered}/{expected} events in {elapsed:.2f}s ({delivered / elapsed:.0f}/s)")
+    print(
+        f"latency p50 {statistics.median(latencies) * 1000:.2f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms"
+    )
+    print(f"stalled stream reset and closed: {stalled_reset}")
+    print(f"idle stream heartbeat: {heartbeat}, closed on disconnect: {closed}, subscribers left: {leaked}")
+    return 0 if delivered == expected and stalled_reset and heartbeat and closed and not leaked else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.database import engine as default_engine
+
+
+class StatementCounter:
+    """Count SQL statements executed on an engine while the block is active.
+
+    Used to pin the number of queries an endpoint issues regardless of how many
+    rows it returns::
+
+        with StatementCounter() as counter:
+            client.get("/professors", headers=headers)
+        assert counter.count <= 2
+    """
+
+    def __init__(self, bind: Engine = default_engine):
+        self.bind = bind
+        self.count = 0
+        self.statements = []
+        self.parameters = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    def __enter__(self) -> "StatementCounter":
+        event.listen(self.bind, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.bind, "before_cursor_execute", self._on_execute)
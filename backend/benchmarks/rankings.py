@@ -0,0 +1,166 @@
+"""Compare precomputed rankings with the naive GROUP BY over ``reviews``.
+
+Builds a dataset, rebuilds the rankings, then adds ``--incremental`` reviews
+through ``aggregates.record_review`` + ``rankings.record_review`` the way
+``POST /reviews`` does. Every top-k and rank-of-X answer from
+``app.rankings`` must match the naive query, which recomputes the Bayesian
+score from ``reviews`` with the same stored priors. The report shows the time
+per call of each path.
+
+    python -m benchmarks.rankings --reviews 50000 --professors 2000
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, List, Optional
+
+
+def _best_of(func: Callable, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.rankings", description=__doc__.splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=20000)
+    parser.add_argument("--professors", type=int, default=1000)
+    parser.add_argument("--courses", type=int, default=1500)
+    parser.add_argument("--incremental", type=int, default=500, help="reviews added after the rebuild")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    os.environ["OPENRATER_DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='openrater-bench-')}/bench.db"
+
+    from sqlalchemy import func, literal, select
+
+    from app import aggregates, anon_ids, migrations, models, rankings
+    from app.config import settings
+    from app.database import SessionLocal
+
+    from . import datagen
+
+    def naive(db, dimension: str, term: str, department: Optional[str]) -> List[tuple]:
+        """``(professor_id, score)`` for the whole scope, best first, straight from ``reviews``."""
+        column = getattr(models.Review, dimension)
+        prior = (
+            select(models.RankingPrior.mean)
+            .where(models.RankingPrior.term == term, models.RankingPrior.dimension == dimension)
+            .scalar_subquery()
+        )
+        weight = literal(float(settings.RANKING_PRIOR_WEIGHT))
+        score = ((weight * prior + func.sum(column)) / (weight + func.count(models.Review.id))).label("score")
+        statement = (
+            select(models.Review.professor_id, score)
+            .join(models.Professor, models.Professor.id == models.Review.professor_id)
+            .group_by(models.Review.professor_id)
+        )
+        if term != rankings.ALL_TERMS:
+            statement = statement.join(models.Course, models.Course.id == models.Review.course_id).where(
+                models.Course.term == term
+            )
+        if department is not None:
+            statement = statement.where(models.Professor.department == department)
+        return db.execute(statement.order_by(score.desc(), models.Review.professor_id.desc())).all()
+
+    migrations.migrate()
+    db = SessionLocal()
+    try:
+        dataset = datagen.generate(
+            db, datagen.DatasetConfig(reviews=args.reviews, professors=args.professors, courses=args.courses)
+        )
+        rng = random.Random(11)
+        terms = {course.id: course.term for course in db.query(models.Course)}
+        started = time.perf_counter()
+        for _ in range(args.incremental):
+            professor_id = rng.choice(list(dataset.assignments))
+            course_id = rng.choice(dataset.assignments[professor_id])
+            review = models.Review(
+                reviewer_id=dataset.reviewers[0][0],
+                professor_id=professor_id,
+                course_id=course_id,
+                anon_id=anon_ids.allocate(db, professor_id),
+                summary="ranking check",
+                **{dimension: rng.randint(1, 5) for dimension in models.SCORE_DIMENSIONS},
+            )
+            db.add(review)
+            aggregates.record_review(db, review)
+            rankings.record_review(db, review, terms[course_id])
+            db.commit()
+        incremental_ms = (time.perf_counter() - started) * 1000 / max(args.incremental, 1)
+
+        term = datagen.TERMS[0]
+        department = db.scalar(select(models.Professor.department).limit(1))
+        scopes = [
+            (dimension, scope_term, scope_department)
+            for dimension in models.SCORE_DIMENSIONS
+            for scope_term, scope_department in ((rankings.ALL_TERMS, None), (term, None), (rankings.ALL_TERMS, department))
+        ]
+        mismatches = 0
+        for dimension, scope_term, scope_department in scopes:
+            expected = naive(db, dimension, scope_term, scope_department)
+            top = rankings.top(db, dimension, scope_term, scope_department, args.limit)
+            same_top = [entry["professor_id"] for entry in top] == [row[0] for row in expected[: args.limit]] and all(
+                math.isclose(entry["score"], row[1]) for entry, row in zip(top, expected)
+            )
+            positions = {professor_id: rank for rank, (professor_id, _) in enumerate(expected, start=1)}
+            sample = rng.sample(list(positions), min(20, len(positions)))
+            same_rank = all(
+                (found := rankings.rank_of(db, professor_id, dimension, scope_term, scope_department)) is not None
+                and found["rank"] == positions[professor_id]
+                and found["total"] == len(expected)
+                for professor_id in sample
+            )
+            if not (same_top and same_rank):
+                mismatches += 1
+                print(f"MISMATCH {dimension} term={scope_term!r} department={scope_department!r}")
+
+        professor_id = next(iter(dataset.assignments))
+        timings = [
+            (
+                "top-k",
+                lambda: naive(db, "clarity", rankings.ALL_TERMS, None)[: args.limit],
+                lambda: rankings.top(db, "clarity", limit=args.limit),
+            ),
+            (
+                "top-k department",
+                lambda: naive(db, "clarity", rankings.ALL_TERMS, department)[: args.limit],
+                lambda: rankings.top(db, "clarity", department=department, limit=args.limit),
+            ),
+            (
+                "top-k term",
+                lambda: naive(db, "clarity", term, None)[: args.limit],
+                lambda: rankings.top(db, "clarity", term, limit=args.limit),
+            ),
+            (
+                "rank of professor",
+                lambda: [row[0] for row in naive(db, "clarity", rankings.ALL_TERMS, None)].index(professor_id),
+                lambda: rankings.rank_of(db, professor_id, "clarity"),
+            ),
+        ]
+        print(f"{args.reviews + args.incremental} reviews, {args.professors} professors")
+        print(f"incremental update: {incremental_ms:.2f} ms per review (aggregates + rankings + commit)")
+        print(f"{'query':<20}{'naive ms':>10}{'ranked ms':>11}{'speedup':>9}")
+        for name, naive_path, ranked_path in timings:
+            naive_seconds = _best_of(naive_path, args.repeat)
+            ranked_seconds = _best_of(lambda: (db.expunge_all(), ranked_path()), args.repeat)
+            print(
+                f"{name:<20}{naive_seconds * 1000:>10.2f}{ranked_seconds * 1000:>11.2f}"
+                f"{naive_seconds / ranked_seconds:>8.1f}x"
+            )
+        print(f"{len(scopes) - mismatches}/{len(scopes)} scopes match the naive query")
+    finally:
+        db.close()
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
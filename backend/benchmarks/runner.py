@@ -0,0 +1,149 @@
+"""Concurrent request driver, statistics and baseline comparison."""
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager, nullcontext
+from typing import Dict, List, Optional
+
+import httpx
+
+from .scenarios import Context, Scenario
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    ctx: Context,
+    requests: int,
+    concurrency: int,
+    statement_counter=None,
+) -> dict:
+    if scenario.capacity is not None:
+        requests = min(requests, scenario.capacity(ctx))
+    latencies: List[float] = []
+    errors = 0
+    next_request = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in next_request:
+            method, url, kwargs = scenario.build(ctx, i)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code not in scenario.expect:
+                errors += 1
+
+    counter = statement_counter() if statement_counter else nullcontext()
+    started = time.perf_counter()
+    with counter:
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, requests)))))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "statements_per_request": counter.count / len(latencies) if statement_counter and latencies else None,
+    }
+
+
+@asynccontextmanager
+async def in_process_client(app):
+    # ASGITransport sends no lifespan events; run startup (public snapshot, event broker) as uvicorn would.
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            yield client
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def uvicorn_client(workers: int, env: Dict[str, str]):
+    """Start ``uvicorn app.main:app`` on a free port and yield a client bound to it."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+    )
+    try:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+            for _ in range(200):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.05)
+            else:
+                raise RuntimeError("uvicorn did not become ready")
+            yield client
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def print_report(results: Dict[str, dict]) -> None:
+    header = f"{'endpoint':44} {'req':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'sql/req':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        statements = result["statements_per_request"]
+        print(
+            f"{name:44} {result['requests']:>6} {result['errors']:>4} {result['p50_ms']:>8.2f} "
+            f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['throughput_rps']:>8.1f} "
+            f"{'-' if statements is None else f'{statements:.2f}':>8}"
+        )
+
+
+def save_baseline(path: str, meta: dict, results: Dict[str, dict]) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"meta": meta, "endpoints": results}, handle, indent=2, ensure_ascii=False)
+
+
+def compare_baseline(path: str, meta: dict, results: Dict[str, dict], tolerance: float) -> List[str]:
+    """Return a line per regression: p95 beyond ``tolerance`` or more statements per request."""
+    with open(path, encoding="utf-8") as handle:
+        saved = json.load(handle)
+    baseline = saved["endpoints"]
+    mismatched = sorted(key for key, value in saved.get("meta", {}).items() if meta.get(key) != value)
+    if mismatched:
+        print(f"warning: baseline was recorded with different settings ({', '.join(mismatched)})")
+    regressions = []
+    for name, result in results.items():
+        previous: Optional[dict] = baseline.get(name)
+        if previous is None:
+            continue
+        if result["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        before, after = previous.get("statements_per_request"), result.get("statements_per_request")
+        if before is not None and after is not None and after > before + 1e-9:
+            regressions.append(f"{name}: SQL statements/request {before:.2f} -> {after:.2f}")
+        if result["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {result['errors']}")
+    return regressions
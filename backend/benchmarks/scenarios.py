@@ -0,0 +1,197 @@
+"""One scenario per route in ``app.main``.
+
+A scenario turns a request number into ``(method, url, request kwargs)``.
+Write scenarios use the request number to keep their payloads unique, and
+scenarios that consume a finite resource (open reviews to rebut) cap their
+request count through ``capacity``.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from app import models
+from app.security import create_access_token
+
+from .datagen import PASSWORD, Dataset
+
+Request = Tuple[str, str, dict]
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: Callable[["Context", int], Request]
+    expect: Sequence[int] = (200,)
+    capacity: Optional[Callable[["Context"], int]] = None
+
+
+class Context:
+    def __init__(self, dataset: Dataset, run_id: str):
+        self.dataset = dataset
+        self.run_id = run_id
+        self.admin = self._headers(dataset.admin, models.RoleEnum.ADMIN)
+        self.reviewers = [self._headers(account, models.RoleEnum.REVIEWER) for account in dataset.reviewers]
+        self.professors: Dict[int, dict] = {
+            professor_id: self._headers(account, models.RoleEnum.PROFESSOR)
+            for professor_id, account in dataset.professor_accounts.items()
+        }
+        self.professor_ids = sorted(self.professors)
+        self.assigned = [
+            (professor_id, course_id)
+            for professor_id, courses in dataset.assignments.items()
+            for course_id in courses
+        ]
+        self._open_reviews = iter(dataset.open_reviews)
+
+    @staticmethod
+    def _headers(account: Tuple[int, str], role: models.RoleEnum) -> dict:
+        user_id, email = account
+        token = create_access_token({"sub": email, "uid": user_id, "role": role.value})
+        return {"Authorization": f"Bearer {token}"}
+
+    def reviewer(self, i: int) -> dict:
+        return self.reviewers[i % len(self.reviewers)]
+
+    def professor(self, i: int) -> Tuple[int, dict]:
+        professor_id = self.professor_ids[i % len(self.professor_ids)]
+        return professor_id, self.professors[professor_id]
+
+    def next_open_review(self) -> Tuple[int, int]:
+        return next(self._open_reviews)
+
+
+def _review_payload(ctx: Context, i: int) -> dict:
+    professor_id, course_id = ctx.assigned[i % len(ctx.assigned)]
+    scores = {dimension: 1 + (i + offset) % 5 for offset, dimension in enumerate(models.SCORE_DIMENSIONS)}
+    return {"professor_id": professor_id, "course_id": course_id, "summary": f"benchmark review {i}", **scores}
+
+
+def _rebuttal(ctx: Context, i: int) -> Request:
+    review_id, professor_id = ctx.next_open_review()
+    return "POST", f"/reviews/{review_id}/rebuttal", {"json": {"content": "benchmark rebuttal"}, "headers": ctx.professors[professor_id]}
+
+
+def _bulk_courses(ctx: Context, i: int) -> Request:
+    body = "name,code,term\n" + "".join(f"Bulk,{ctx.run_id}-B{i}-{n},2026F\n" for n in range(50))
+    return "POST", "/bulk/courses", {"files": {"file": ("courses.csv", body)}, "headers": ctx.admin}
+
+
+SCENARIOS: Sequence[Scenario] = (
+    Scenario("GET /health", lambda ctx, i: ("GET", "/health", {})),
+    Scenario(
+        "POST /auth/token",
+        lambda ctx, i: (
+            "POST",
+            "/auth/token",
+            {"data": {"username": ctx.dataset.reviewers[i % len(ctx.dataset.reviewers)][1], "password": PASSWORD}},
+        ),
+        expect=(200, 503),
+    ),
+    Scenario(
+        "POST /auth/register",
+        lambda ctx, i: (
+            "POST",
+            "/auth/register",
+            {
+                "json": {"email": f"{ctx.run_id}-new{i}@bench.openrater", "name": "New", "password": PASSWORD, "role": "reviewer"},
+                "headers": ctx.admin,
+            },
+        ),
+        expect=(201, 503),
+    ),
+    Scenario(
+        "POST /auth/bootstrap",
+        lambda ctx, i: (
+            "POST",
+            "/auth/bootstrap",
+            {"json": {"email": f"{ctx.run_id}-boot{i}@bench.openrater", "name": "Boot", "password": PASSWORD, "role": "admin"}},
+        ),
+        expect=(400,),
+    ),
+    Scenario("GET /users/me", lambda ctx, i: ("GET", "/users/me", {"headers": ctx.reviewer(i)})),
+    Scenario("GET /courses", lambda ctx, i: ("GET", "/courses", {"headers": ctx.reviewer(i)})),
+    Scenario(
+        "POST /courses",
+        lambda ctx, i: (
+            "POST",
+            "/courses",
+            {"json": {"name": "Bench", "code": f"{ctx.run_id}-C{i}", "term": "2026F"}, "headers": ctx.admin},
+        ),
+        expect=(201,),
+    ),
+    Scenario("GET /professors", lambda ctx, i: ("GET", "/professors", {"headers": ctx.reviewer(i)})),
+    Scenario(
+        "POST /professors",
+        lambda ctx, i: (
+            "POST",
+            "/professors",
+            {"json": {"name": f"Bench {i}", "department": "Bench", "course_ids": ctx.dataset.course_ids[:2]}, "headers": ctx.admin},
+        ),
+        expect=(201,),
+    ),
+    Scenario(
+        "GET /professors/{id}/stats",
+        lambda ctx, i: ("GET", f"/professors/{ctx.professor(i)[0]}/stats", {"headers": ctx.reviewer(i)}),
+    ),
+    Scenario("GET /public/professors", lambda ctx, i: ("GET", "/public/professors", {})),
+    Scenario(
+        "GET /public/professors/{id}/reviews",
+        lambda ctx, i: ("GET", f"/public/professors/{ctx.professor(i)[0]}/reviews", {}),
+    ),
+    Scenario("GET /rankings", lambda ctx, i: ("GET", "/rankings?dimension=clarity&limit=20", {"headers": ctx.reviewer(i)})),
+    Scenario(
+        "GET /rankings/{id}",
+        lambda ctx, i: ("GET", f"/rankings/{ctx.professor(i)[0]}?dimension=clarity", {"headers": ctx.reviewer(i)}),
+    ),
+    Scenario(
+        "POST /professors/{id}/assign-course",
+        lambda ctx, i: (
+            "POST",
+            f"/professors/{ctx.professor(i)[0]}/assign-course",
+            {"json": {"course_ids": ctx.dataset.assignments[ctx.professor(i)[0]]}, "headers": ctx.admin},
+        ),
+    ),
+    Scenario(
+        "GET /professors/{id}/reviews",
+        lambda ctx, i: ("GET", f"/professors/{ctx.professor(i)[0]}/reviews", {"headers": ctx.professor(i)[1]}),
+    ),
+    Scenario(
+        "GET /professors/{id}/reviews?limit=50",
+        lambda ctx, i: (
+            "GET",
+            f"/professors/{ctx.professor(i)[0]}/reviews",
+            {"params": {"limit": 50}, "headers": ctx.professor(i)[1]},
+        ),
+    ),
+    Scenario(
+        "POST /reviews",
+        lambda ctx, i: ("POST", "/reviews", {"json": _review_payload(ctx, i), "headers": ctx.reviewer(i)}),
+        expect=(201,),
+    ),
+    Scenario("GET /reviews (reviewer)", lambda ctx, i: ("GET", "/reviews", {"headers": ctx.reviewer(i)})),
+    Scenario("GET /reviews?limit=50 (admin)", lambda ctx, i: ("GET", "/reviews", {"params": {"limit": 50}, "headers": ctx.admin})),
+    Scenario(
+        "GET /reviews/search",
+        lambda ctx, i: ("GET", "/reviews/search", {"params": {"q": ("lectures", "workload", "office hours")[i % 3]}, "headers": ctx.admin}),
+    ),
+    Scenario(
+        "POST /reviews/{id}/rebuttal",
+        _rebuttal,
+        expect=(201,),
+        capacity=lambda ctx: len(ctx.dataset.open_reviews),
+    ),
+    Scenario("GET /rebuttals", lambda ctx, i: ("GET", "/rebuttals", {"headers": ctx.admin})),
+    Scenario(
+        "GET /changes?limit=100 (reviewer)",
+        lambda ctx, i: ("GET", "/changes", {"params": {"since": 0, "limit": 100}, "headers": ctx.reviewer(i)}),
+    ),
+    Scenario("POST /bulk/courses", _bulk_courses),
+)
+
+
+def select_scenarios(patterns: Sequence[str]) -> Sequence[Scenario]:
+    if not patterns:
+        return SCENARIOS
+    return [scenario for scenario in SCENARIOS if any(pattern in scenario.name for pattern in patterns)]
+
+
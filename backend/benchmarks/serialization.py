@@ -0,0 +1,96 @@
+"""Compare the ORM + pydantic read path with ``app.fast_reads``.
+
+For each list route the same rows are produced both ways: ORM objects
+validated and dumped through the response schema (what FastAPI does with
+``response_model``), and column tuples encoded with orjson. The bodies must be
+byte-for-byte identical; the report shows the time per call of each path.
+
+    python -m benchmarks.serialization --reviews 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+
+def _best_of(func: Callable, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization", description=__doc__.splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=5000)
+    parser.add_argument("--professors", type=int, default=100)
+    parser.add_argument("--courses", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    os.environ["OPENRATER_DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='openrater-bench-')}/bench.db"
+
+    from pydantic import TypeAdapter
+
+    from app import fast_reads, migrations, models, queries, schemas
+    from app.database import SessionLocal
+    from app.pagination import keyset_order
+
+    from . import datagen
+
+    migrations.migrate()
+    db = SessionLocal()
+    try:
+        datagen.generate(db, datagen.DatasetConfig(reviews=args.reviews, professors=args.professors, courses=args.courses))
+        professor_id = db.query(models.Review.professor_id).first()[0]
+
+        def orm(schema, query_factory) -> Callable[[], bytes]:
+            adapter = TypeAdapter(List[schema])
+            return lambda: adapter.dump_json(adapter.validate_python(query_factory().all(), from_attributes=True))
+
+        def fast(build) -> Callable[[], bytes]:
+            return lambda: fast_reads.json_response(build()).body
+
+        def fast_reviews(**filters):
+            statement = keyset_order(fast_reads.reviews_statement(**filters), models.Review)
+            return [fast_reads.review_dict(row) for row in db.execute(statement)]
+
+        cases = [
+            ("courses", orm(schemas.CourseRead, lambda: db.query(models.Course)), fast(lambda: fast_reads.courses(db))),
+            ("professors", orm(schemas.ProfessorRead, lambda: queries.professors(db)), fast(lambda: fast_reads.professors(db))),
+            (
+                "reviews",
+                orm(schemas.ReviewRead, lambda: keyset_order(queries.reviews(db), models.Review)),
+                fast(fast_reviews),
+            ),
+            (
+                "professor reviews",
+                orm(schemas.ReviewRead, lambda: keyset_order(queries.reviews_for_professor(db, professor_id), models.Review)),
+                fast(lambda: fast_reviews(professor_id=professor_id)),
+            ),
+            ("rebuttals", orm(schemas.RebuttalRead, lambda: db.query(models.Rebuttal)), fast(lambda: fast_reads.rebuttals(db))),
+        ]
+
+        mismatches = 0
+        print(f"{'route':<20}{'bytes':>12}{'orm ms':>10}{'fast ms':>10}{'speedup':>9}  identical")
+        for name, orm_path, fast_path in cases:
+            db.expunge_all()
+            identical = orm_path() == fast_path()
+            mismatches += not identical
+            orm_seconds = _best_of(lambda: (db.expunge_all(), orm_path()), args.repeat)
+            fast_seconds = _best_of(fast_path, args.repeat)
+            print(
+                f"{name:<20}{len(fast_path()):>12}{orm_seconds * 1000:>10.1f}{fast_seconds * 1000:>10.1f}"
+                f"{orm_seconds / fast_seconds:>8.1f}x  {'yes' if identical else 'NO'}"
+            )
+    finally:
+        db.close()
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
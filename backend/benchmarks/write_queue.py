@@ -0,0 +1,132 @@
+"""Review submission throughput: per-request commit versus the group-commit writer.
+
+Each of ``--threads`` threads submits ``--per-thread`` reviews the way
+``POST /reviews`` does, first committing every review in its own transaction,
+then through ``app.write_queue``. Both runs use a fresh copy of the same
+dataset. The report shows reviews per second, latency percentiles, errors
+(e.g. ``database is locked``) and, for the queue, the mean batch size.
+
+    python -m benchmarks.write_queue --threads 32 --per-thread 50
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.write_queue", description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--per-thread", type=int, default=50)
+    parser.add_argument("--max-batch", type=int)
+    parser.add_argument("--max-delay-ms", type=float)
+    args = parser.parse_args(argv)
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)
+    directory = tempfile.mkdtemp(prefix="openrater-bench-")
+    os.environ["OPENRATER_DATABASE_URL"] = f"sqlite:///{directory}/bench.db"
+
+    from sqlalchemy.orm import sessionmaker
+
+    from app import main as routes
+    from app import migrations, models, schemas, write_queue
+    from app.database import SessionLocal, engine
+
+    from . import datagen
+
+    migrations.migrate()
+    db = SessionLocal()
+    try:
+        dataset = datagen.generate(db, datagen.DatasetConfig(reviews=1000))
+        terms = {course.id: course.term for course in db.query(models.Course)}
+    finally:
+        db.close()
+    engine.dispose()
+    shutil.copy(f"{directory}/bench.db", f"{directory}/pristine.db")
+    scores = {dimension: 4 for dimension in models.SCORE_DIMENSIONS}
+    professors = list(dataset.assignments)
+
+    def submission(thread: int, index: int) -> dict:
+        professor_id = professors[(thread * 7 + index) % len(professors)]
+        course_id = dataset.assignments[professor_id][0]
+        review_in = schemas.ReviewCreate(professor_id=professor_id, course_id=course_id, summary="bench", **scores)
+        return {
+            "reviewer_id": dataset.reviewers[thread % len(dataset.reviewers)][0],
+            "review_in": review_in,
+            "term": terms[course_id],
+        }
+
+    def per_request(values: dict) -> None:
+        session = SessionLocal()
+        try:
+            routes._insert_review(session, **values)
+            session.commit()
+        finally:
+            session.close()
+
+    def queued(values: dict) -> None:
+        write_queue.writer.submit(lambda session: routes._queued_review(session, **values))
+
+    def run(submit) -> tuple:
+        latencies, errors = [], []
+
+        def worker(thread: int) -> None:
+            for index in range(args.per_thread):
+                values = submission(thread, index)
+                started = time.perf_counter()
+                try:
+                    submit(values)
+                    latencies.append(time.perf_counter() - started)
+                except Exception as exc:
+                    errors.append(exc)
+
+        threads = [threading.Thread(target=worker, args=(thread,)) for thread in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, sorted(latencies), errors
+
+    writer = write_queue.writer
+    if args.max_batch:
+        writer.max_batch = args.max_batch
+    if args.max_delay_ms is not None:
+        writer.max_delay = args.max_delay_ms / 1000
+    batches = write_queue.WRITE_BATCH_SIZE
+    print(
+        f"{args.threads} threads x {args.per_thread} reviews, "
+        f"batch <= {writer.max_batch}, delay <= {writer.max_delay * 1000:g} ms"
+    )
+    print(f"{'path':<14}{'reviews/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'batch':>7}")
+    failed = False
+    for name, submit in (("per-request", per_request), ("group commit", queued)):
+        engine.dispose()
+        shutil.copy(f"{directory}/pristine.db", f"{directory}/bench.db")
+        elapsed, latencies, errors = run(submit)
+        writer.stop()
+        # Only the writer observes batch sizes: [bucket counts, sum, count].
+        _, written, count = batches._values.get((), (None, 0, 0))
+        mean_batch = f"{written / count:.1f}" if name == "group commit" and count else ""
+        p50 = statistics.median(latencies) * 1000 if latencies else float("nan")
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000 if latencies else float("nan")
+        print(f"{name:<14}{len(latencies) / elapsed:>10.0f}{p50:>9.1f}{p99:>9.1f}{len(errors):>8}{mean_batch:>7}")
+        for error in errors[:3]:
+            print(f"    {error!r}")
+        check = sessionmaker(bind=engine)()
+        stored = check.query(models.Review).count() - 1000
+        check.close()
+        if stored != len(latencies):
+            print(f"    stored {stored} reviews but {len(latencies)} submissions succeeded")
+            failed = True
+        failed = failed or (name == "group commit" and bool(errors))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
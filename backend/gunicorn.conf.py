@@ -0,0 +1,17 @@
+"""gunicorn settings for multi-worker deployments.
+
+    python -m app.migrations            # once per deployment
+    gunicorn -c gunicorn.conf.py app.main:app
+
+``preload_app`` imports the application once in the master so workers share
+the imported modules copy-on-write; importing ``app.main`` opens no database
+connections, and each worker warms its own pool in the lifespan.
+"""
+
+import os
+
+bind = os.getenv("OPENRATER_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("OPENRATER_WORKERS", str(os.cpu_count() or 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+graceful_timeout = 30
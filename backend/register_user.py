@@ -2,14 +2,15 @@
 
 from getpass import getpass
 
-from app.database import Base, engine, SessionLocal
+from app import admins, migrations
+from app.database import engine, SessionLocal
 from app.models import RoleEnum, User
 from app.security import get_password_hash
 
 
 def main() -> None:
-    # Create tables if they don't exist
-    Base.metadata.create_all(bind=engine)
+    # Bring the schema up to date, backfills included
+    migrations.migrate(engine)
     
     db = SessionLocal()
     try:
@@ -63,6 +64,9 @@ def main() -> None:
             role=role,
             hashed_password=get_password_hash(password)
         )
+        if role == RoleEnum.ADMIN:
+            # Serialize with /auth/bootstrap (see app.admins)
+            admins.guard(db)
         db.add(user)
         db.commit()
         db.refresh(user)
@@ -1,12 +1,14 @@
-"""重置数据库脚本 - 删除所有表并重新创建"""
-import os
+"""重置数据库脚本 - 删除所有表并按迁移重新创建"""
+from app import migrations, models, search  # noqa: F401  导入 models 以注册全部表
 from app.database import Base, engine
 
 def reset_database():
     print("正在删除所有数据库表...")
-    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        search.uninstall(conn)
+        Base.metadata.drop_all(bind=conn)
     print("正在创建新的数据库表...")
-    Base.metadata.create_all(bind=engine)
+    migrations.migrate()
     print("数据库重置完成！")
     print("\n请运行 'python -m app.initial_data' 创建管理员账号")
 
@@ -0,0 +1,128 @@
+"""Fixtures shared by the test suite.
+
+Settings are read when ``app`` is first imported, so the scratch database and
+the test profile are put in the environment here, before any test imports it.
+All tests share one database; each creates its own accounts, courses and
+professors, so none depends on what the others left behind.
+"""
+
+import os
+import tempfile
+import uuid
+
+DIRECTORY = tempfile.mkdtemp(prefix="openrater-tests-")
+os.environ["OPENRATER_DATABASE_URL"] = f"sqlite:///{DIRECTORY}/tests.db"
+os.environ["OPENRATER_ARCHIVE_URL"] = f"sqlite:///{DIRECTORY}/archive/{{term}}.db"
+os.environ.pop("OPENRATER_READ_DATABASE_URL", None)
+os.environ["OPENRATER_RATE_LIMIT_ENABLED"] = "false"
+os.environ["OPENRATER_BCRYPT_ROUNDS"] = "4"
+# Tests refresh the public snapshot and the archive registry themselves.
+os.environ["OPENRATER_PUBLIC_REFRESH_SECONDS"] = "3600"
+os.environ["OPENRATER_ARCHIVE_REFRESH_SECONDS"] = "3600"
+
+import pytest  # noqa: E402
+
+PASSWORD = "test-password"
+SCORES = {"fairness": 4, "clarity": 3, "engagement": 5, "workload": 2, "confidence": 4}
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app import migrations
+    from app.main import app
+
+    migrations.migrate()
+    with TestClient(app) as client:
+        yield client
+
+
+def headers_for(user) -> dict:
+    from app.security import create_access_token
+
+    token = create_access_token({"sub": user.email, "uid": user.id, "role": user.role.value})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def make_user(client):
+    """Insert an account with ``role`` and return ``(user, headers)``."""
+    from app import admins
+    from app.database import SessionLocal
+    from app.models import RoleEnum, User
+    from app.security import get_password_hash
+
+    hashed = get_password_hash(PASSWORD)
+
+    def make(role: RoleEnum):
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            user = User(email=f"{role.value}-{uuid.uuid4().hex[:12]}@tests.openrater", name=role.value, role=role, hashed_password=hashed)
+            if role == RoleEnum.ADMIN:
+                admins.guard(db)
+            db.add(user)
+            db.commit()
+            return user, headers_for(user)
+        finally:
+            db.close()
+
+    return make
+
+
+@pytest.fixture
+def admin(make_user):
+    from app.models import RoleEnum
+
+    return make_user(RoleEnum.ADMIN)[1]
+
+
+@pytest.fixture
+def make_professor(client, admin, make_user):
+    """Create a course and a professor teaching it; return ``(professor, course, account headers)``."""
+    from app.models import RoleEnum
+
+    def make(term: str = "2026F", linked: bool = True):
+        code = f"T{uuid.uuid4().hex[:10]}"
+        course = client.post("/courses", json={"name": code, "code": code, "term": term}, headers=admin)
+        assert course.status_code == 201, course.text
+        body = {"name": f"Professor {code}", "department": "Tests", "course_ids": [course.json()["id"]]}
+        headers = None
+        if linked:
+            account, headers = make_user(RoleEnum.PROFESSOR)
+            body["user_id"] = account.id
+        professor = client.post("/professors", json=body, headers=admin)
+        assert professor.status_code == 201, professor.text
+        return professor.json(), course.json(), headers
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def post_review(client):
+    def post(headers: dict, professor_id: int, course_id: int, summary: str = "clear lectures", **scores) -> dict:
+        response = client.post(
+            "/reviews",
+            json={"professor_id": professor_id, "course_id": course_id, "summary": summary, **{**SCORES, **scores}},
+            headers=headers,
+        )
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return post
+
+
+@pytest.fixture(scope="session")
+def close_term(client):
+    """Archive ``term`` without waiting for other workers."""
+    from app import archive
+    from app.database import SessionLocal
+
+    def close(term: str) -> None:
+        db = SessionLocal()
+        try:
+            archive.close(db, term, wait=0, log=lambda message: None)
+        finally:
+            db.close()
+
+    return close
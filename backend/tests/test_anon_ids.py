@@ -0,0 +1,49 @@
+"""Anonymous review IDs never collide, however many writers allocate at once."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import anon_ids
+from app.database import SessionLocal
+
+WRITERS = 8
+PER_WRITER = 25
+
+
+def test_permutation_is_injective():
+    for professor_id in (1, 2, 977):
+        values = [anon_ids.permute(professor_id, n) for n in range(20000)]
+        assert len(set(values)) == len(values)
+        assert all(0 <= value < anon_ids.SPACE for value in values)
+
+
+def test_ids_differ_between_professors():
+    assert [anon_ids.anon_id(1, n) for n in range(10)] != [anon_ids.anon_id(2, n) for n in range(10)]
+
+
+def test_exhausted_space_raises():
+    assert len(anon_ids.anon_id(1, anon_ids.SPACE - 1)) == anon_ids.LENGTH
+    with pytest.raises(anon_ids.AnonIdSpaceExhausted):
+        anon_ids.anon_id(1, anon_ids.SPACE)
+
+
+def _allocate(professor_id: int) -> list:
+    allocated = []
+    for _ in range(PER_WRITER):
+        db = SessionLocal()
+        try:
+            allocated.append(anon_ids.allocate(db, professor_id))
+            db.commit()
+        finally:
+            db.close()
+    return allocated
+
+
+def test_concurrent_allocations_do_not_collide(make_professor):
+    # A new professor has no counter row yet, so the writers also race to create it.
+    professor, _, _ = make_professor(linked=False)
+    with ThreadPoolExecutor(WRITERS) as pool:
+        allocated = [anon_id for batch in pool.map(_allocate, [professor["id"]] * WRITERS) for anon_id in batch]
+    assert len(allocated) == WRITERS * PER_WRITER
+    assert len(set(allocated)) == len(allocated)
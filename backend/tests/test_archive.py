@@ -0,0 +1,98 @@
+"""Closing a term moves its reviews into an archive without disturbing reads or ids."""
+
+import uuid
+from contextlib import contextmanager
+
+from app import archive
+from app.models import RoleEnum
+
+
+@contextmanager
+def counting_archive_reads(monkeypatch):
+    opened = []
+    sessions = archive._sessions
+
+    @contextmanager
+    def counted(urls):
+        urls = list(urls)
+        opened.extend(urls)
+        with sessions(urls) as result:
+            yield result
+
+    monkeypatch.setattr(archive, "_sessions", counted)
+    yield opened
+
+
+def professor_across_terms(client, admin, term: str):
+    """A professor teaching one course in ``term`` and one in the live term; return ``(professor id, courses)``."""
+    courses = []
+    for course_term in (term, "2026F"):
+        code = f"T{uuid.uuid4().hex[:10]}"
+        courses.append(client.post("/courses", json={"name": code, "code": code, "term": course_term}, headers=admin).json())
+    body = {"name": "Professor", "department": "Tests", "course_ids": [course["id"] for course in courses]}
+    return client.post("/professors", json=body, headers=admin).json()["id"], courses
+
+
+def test_closing_the_term_with_the_newest_rows_keeps_ids_unique(client, admin, make_user, make_professor, post_review, close_term):
+    term = f"A{uuid.uuid4().hex[:8]}"
+    professor, course, professor_headers = make_professor(term=term)
+    _, reviewer = make_user(RoleEnum.REVIEWER)
+    archived = post_review(reviewer, professor["id"], course["id"], summary="archived lectures")
+    rebuttal = client.post(f"/reviews/{archived['id']}/rebuttal", json={"content": "archived"}, headers=professor_headers)
+    assert rebuttal.status_code == 201
+
+    close_term(term)
+
+    live_professor, live_course, live_headers = make_professor()
+    live = post_review(reviewer, live_professor["id"], live_course["id"])
+    live_rebuttal = client.post(f"/reviews/{live['id']}/rebuttal", json={"content": "live"}, headers=live_headers)
+    assert live["id"] > archived["id"]
+    assert live_rebuttal.json()["id"] > rebuttal.json()["id"]
+
+    in_term = client.get("/reviews", params={"term": term}, headers=admin).json()
+    assert [review["id"] for review in in_term] == [archived["id"]]
+    assert in_term[0]["rebuttal"]["id"] == rebuttal.json()["id"]
+    assert client.post(f"/reviews/{archived['id']}/rebuttal", json={"content": "late"}, headers=professor_headers).status_code == 409
+
+
+def test_pages_filled_by_live_reviews_open_no_archive(client, admin, make_user, post_review, close_term, monkeypatch):
+    term = f"A{uuid.uuid4().hex[:8]}"
+    professor_id, (course, live_course) = professor_across_terms(client, admin, term)
+    _, reviewer = make_user(RoleEnum.REVIEWER)
+    archived = post_review(reviewer, professor_id, course["id"])
+    close_term(term)
+    live = [post_review(reviewer, professor_id, live_course["id"])["id"] for _ in range(2)][::-1]
+    url = f"/professors/{professor_id}/reviews"
+
+    def page(**params):
+        response = client.get(url, params=params, headers=admin)
+        return [review["id"] for review in response.json()], response.headers.get("X-Next-Cursor")
+
+    with counting_archive_reads(monkeypatch) as opened:
+        first, cursor = page(limit=1)
+        assert first == live[:1] and opened == []
+        # Whether another page follows depends on the archive.
+        second, cursor = page(limit=1, cursor=cursor)
+        assert second == live[1:] and opened == [archive.archive_url(term)]
+        assert page(limit=1, cursor=cursor) == ([archived["id"]], None)
+        assert page(limit=3, stream=True)[0] == [*live, archived["id"]]
+
+
+def test_search_pages_through_live_matches_before_archives(client, admin, make_user, post_review, close_term):
+    term = f"A{uuid.uuid4().hex[:8]}"
+    professor_id, (course, live_course) = professor_across_terms(client, admin, term)
+    _, reviewer = make_user(RoleEnum.REVIEWER)
+    word = f"w{uuid.uuid4().hex[:12]}"
+    archived = [post_review(reviewer, professor_id, course["id"], summary=f"{word} archived")["id"] for _ in range(2)]
+    close_term(term)
+    live = post_review(reviewer, professor_id, live_course["id"], summary=f"{word} live")["id"]
+
+    def page(**params):
+        response = client.get("/reviews/search", params={"q": word, **params}, headers=admin)
+        assert response.status_code == 200, response.text
+        return [review["id"] for review in response.json()]
+
+    assert page()[0] == live and sorted(page()[1:]) == archived
+    assert page(limit=1) == [live]
+    assert page(limit=2, offset=1) == page()[1:]
+    assert page(offset=3) == []
@@ -0,0 +1,71 @@
+"""Bulk import against rows created concurrently by the API."""
+
+import uuid
+from contextlib import contextmanager
+
+from sqlalchemy import event, func, select, text
+
+from app import bulk_import
+from app.database import SessionLocal, engine
+from app.models import Course, User
+
+from .conftest import PASSWORD
+
+
+@contextmanager
+def racing(prefix: str, statement: str, parameters: dict):
+    """Commit ``statement`` from another connection right before the first SQL starting with ``prefix``."""
+    fired = []
+
+    def before(conn, cursor, sql, params, context, executemany):
+        if not fired and sql.startswith(prefix):
+            fired.append(sql)
+            with engine.begin() as other:
+                other.execute(text(statement), parameters)
+
+    event.listen(engine, "before_cursor_execute", before)
+    try:
+        yield fired
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+
+
+def _import(entity, records):
+    db = SessionLocal()
+    try:
+        return bulk_import.run_import(db, entity, list(enumerate(records, 2)))
+    finally:
+        db.close()
+
+
+def _count(column, values) -> int:
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).where(column.in_(values)))
+    finally:
+        db.close()
+
+
+def test_user_registered_during_import_is_reported_not_raised(client):
+    emails = [f"import-{uuid.uuid4().hex[:10]}@tests.openrater" for _ in range(3)]
+    records = [{"email": email, "name": "imported", "password": PASSWORD, "role": "reviewer"} for email in emails]
+    statement = (
+        "INSERT INTO users (email, name, hashed_password, role, created_at) "
+        "VALUES (:email, 'racer', 'x', 'REVIEWER', CURRENT_TIMESTAMP)"
+    )
+    with racing("BEGIN IMMEDIATE", statement, {"email": emails[1]}) as fired:
+        result = _import(bulk_import.ImportEntity.USERS, records)
+    assert fired
+    assert result.as_dict() == {"created": 2, "failed": 1, "errors": [{"line": 3, "detail": "Email already registered"}]}
+    assert _count(User.email, emails) == 3
+
+
+def test_course_created_during_import_is_reported_not_raised(client):
+    codes = [f"I{uuid.uuid4().hex[:10]}" for _ in range(3)]
+    records = [{"name": code, "code": code, "term": "2026F"} for code in codes]
+    statement = "INSERT INTO courses (name, code, term) VALUES (:code, :code, '2026F')"
+    with racing("BEGIN IMMEDIATE", statement, {"code": codes[2]}) as fired:
+        result = _import(bulk_import.ImportEntity.COURSES, records)
+    assert fired
+    assert result.as_dict() == {"created": 2, "failed": 1, "errors": [{"line": 4, "detail": "Course code already exists"}]}
+    assert _count(Course.code, codes) == 3
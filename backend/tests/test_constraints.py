@@ -0,0 +1,106 @@
+"""Concurrent duplicate creates leave exactly one row, and bootstrap follows the admins."""
+
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func, select
+
+from app import bulk_import
+from app.database import SessionLocal
+from app.models import Course, Rebuttal, RoleEnum, User
+
+from .conftest import PASSWORD
+
+CONCURRENCY = 16
+
+
+def _account(role: str) -> dict:
+    email = f"{role}-{uuid.uuid4().hex[:12]}@tests.openrater"
+    return {"email": email, "name": role, "password": PASSWORD, "role": role}
+
+
+def _race(client, method: str, url: str, bodies, headers=None) -> Counter:
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        responses = list(pool.map(lambda body: client.request(method, url, json=body, headers=headers), bodies))
+    return Counter(response.status_code for response in responses)
+
+
+def _count(condition) -> int:
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).select_from(condition.left.table).where(condition))
+    finally:
+        db.close()
+
+
+def _delete_admins() -> None:
+    db = SessionLocal()
+    try:
+        for user in db.scalars(select(User).where(User.role == RoleEnum.ADMIN)):
+            db.delete(user)
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def no_admin(client):
+    _delete_admins()
+    yield
+    _delete_admins()
+
+
+def test_concurrent_bootstraps_create_one_admin(client, no_admin):
+    statuses = _race(client, "POST", "/auth/bootstrap", [_account("admin") for _ in range(CONCURRENCY)])
+    assert statuses == {201: 1, 400: CONCURRENCY - 1}
+    assert _count(User.role == RoleEnum.ADMIN) == 1
+
+
+def test_bootstrap_stays_closed_while_any_admin_exists(client, no_admin):
+    assert client.post("/auth/bootstrap", json=_account("admin")).status_code == 201
+    db = SessionLocal()
+    try:
+        imported = _account("admin")
+        assert bulk_import.run_import(db, bulk_import.ImportEntity.USERS, [(2, imported)]).created == 1
+    finally:
+        db.close()
+    db = SessionLocal()
+    try:
+        db.delete(db.scalar(select(User).where(User.role == RoleEnum.ADMIN, User.email != imported["email"])))
+        db.commit()
+    finally:
+        db.close()
+    assert client.post("/auth/bootstrap", json=_account("admin")).status_code == 400
+
+    db = SessionLocal()
+    try:
+        db.scalar(select(User).where(User.email == imported["email"])).role = RoleEnum.REVIEWER
+        db.commit()
+    finally:
+        db.close()
+    assert client.post("/auth/bootstrap", json=_account("admin")).status_code == 201
+
+
+def test_concurrent_registrations_create_one_account(client, admin):
+    account = _account("reviewer")
+    assert _race(client, "POST", "/auth/register", [account] * CONCURRENCY, admin) == {201: 1, 400: CONCURRENCY - 1}
+    assert _count(User.email == account["email"]) == 1
+
+
+def test_concurrent_courses_create_one_course(client, admin):
+    code = f"C{uuid.uuid4().hex[:10]}"
+    body = {"name": code, "code": code, "term": "2026F"}
+    assert _race(client, "POST", "/courses", [body] * CONCURRENCY, admin) == {201: 1, 400: CONCURRENCY - 1}
+    assert _count(Course.code == code) == 1
+
+
+def test_concurrent_rebuttals_create_one_rebuttal(client, make_user, make_professor, post_review):
+    professor, course, professor_headers = make_professor()
+    _, reviewer = make_user(RoleEnum.REVIEWER)
+    review = post_review(reviewer, professor["id"], course["id"])
+    body = {"content": "the workload was announced"}
+    statuses = _race(client, "POST", f"/reviews/{review['id']}/rebuttal", [body] * CONCURRENCY, professor_headers)
+    assert statuses == {201: 1, 400: CONCURRENCY - 1}
+    assert _count(Rebuttal.review_id == review["id"]) == 1
@@ -0,0 +1,44 @@
+"""Server-sent event streams that fall behind are reset instead of buffering forever."""
+
+import asyncio
+
+from app import events
+from app.config import settings
+
+
+async def _never_disconnected() -> bool:
+    return False
+
+
+async def _frames(channel: str, count: int, dispatch):
+    stream = events.stream(channel, _never_disconnected, heartbeat=5)
+    frames = [await stream.__anext__()]
+    dispatch()
+    try:
+        while len(frames) < count:
+            frames.append(await asyncio.wait_for(stream.__anext__(), 1))
+    except StopAsyncIteration:
+        pass
+    finally:
+        await stream.aclose()
+    return frames
+
+
+def _publish(channel: str, count: int):
+    return lambda: [events.hub.dispatch(channel, events.format_event("review", {"n": n})) for n in range(count)]
+
+
+def test_overflowed_stream_gets_reset(monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_QUEUE_SIZE", 3)
+    channel = events.user_channel(-1)
+    frames = asyncio.run(_frames(channel, 10, _publish(channel, 4)))
+    assert frames[0].startswith("retry:")
+    assert frames[1:] == [events.format_event("reset", {"reason": "slow consumer"})]
+    assert channel not in events.hub._channels
+
+
+def test_stream_within_queue_size_gets_every_event(monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_QUEUE_SIZE", 3)
+    channel = events.user_channel(-2)
+    frames = asyncio.run(_frames(channel, 4, _publish(channel, 3)))
+    assert frames[1:] == [events.format_event("review", {"n": n}) for n in range(3)]
@@ -0,0 +1,52 @@
+"""Incremental exports follow the change log, so later rebuttals are picked up."""
+
+import json
+
+from app.models import RoleEnum
+from app.pagination import NEXT_CURSOR_HEADER
+
+
+def _export(client, admin, since=None):
+    params = {} if since is None else {"since": since}
+    response = client.get("/export/reviews", params=params, headers=admin)
+    assert response.status_code == 200, response.text
+    rows = {row["review_id"]: row for row in map(json.loads, response.text.splitlines())}
+    return int(response.headers[NEXT_CURSOR_HEADER]), rows
+
+
+def test_since_includes_new_reviews_and_new_rebuttals(client, admin, make_user, make_professor, post_review):
+    professor, course, professor_headers = make_professor()
+    _, reviewer = make_user(RoleEnum.REVIEWER)
+    rebutted = post_review(reviewer, professor["id"], course["id"], summary="rebutted later")
+    untouched = post_review(reviewer, professor["id"], course["id"], summary="left alone")
+
+    since, everything = _export(client, admin)
+    assert {rebutted["id"], untouched["id"]} <= everything.keys()
+
+    response = client.post(
+        f"/reviews/{rebutted['id']}/rebuttal", json={"content": "the workload was announced"}, headers=professor_headers
+    )
+    assert response.status_code == 201, response.text
+    created = post_review(reviewer, professor["id"], course["id"], summary="written after the export")
+
+    next_since, changed = _export(client, admin, since)
+    assert changed.keys() == {rebutted["id"], created["id"]}
+    assert changed[rebutted["id"]]["rebuttal_id"] == response.json()["id"]
+    assert next_since > since
+    assert _export(client, admin, next_since)[1] == {}
+
+
+def test_since_must_be_past_the_compaction_horizon(client, admin):
+    from app.database import SessionLocal
+    from app.models import ChangeLogCompaction
+
+    db = SessionLocal()
+    compaction = ChangeLogCompaction(horizon=1, removed=0)
+    db.add(compaction)
+    db.commit()
+    try:
+        assert client.get("/export/reviews", params={"since": 0}, headers=admin).status_code == 410
+    finally:
+        db.delete(compaction)
+        db.commit()
+        db.close()
@@ -0,0 +1,28 @@
+"""GET /metrics is only served to a scraper holding the configured token."""
+
+import pytest
+
+from app.config import settings
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-me")
+    return "scrape-me"
+
+
+def test_disabled_without_token(client):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_rejects_wrong_token(client, metrics_token):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+
+def test_serves_pool_metrics(client, metrics_token):
+    client.get("/health")
+    response = client.get("/metrics", headers={"Authorization": f"Bearer {metrics_token}"})
+    assert response.status_code == 200
+    assert 'openrater_db_pool_hold_seconds_count{engine="primary"}' in response.text
+    assert 'openrater_db_pool_checked_out{engine="primary"}' in response.text
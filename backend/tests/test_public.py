@@ -0,0 +1,54 @@
+"""The anonymous read tier served from the public snapshot."""
+
+import uuid
+
+import pytest
+
+from app import public
+from app.models import RoleEnum
+
+
+def test_professor_has_overall_average(client, make_user, make_professor, post_review):
+    professor, course, _ = make_professor(linked=False)
+    _, reviewer = make_user(RoleEnum.REVIEWER)
+    post_review(reviewer, professor["id"], course["id"], fairness=5, clarity=4, engagement=3, workload=1, confidence=1)
+    post_review(reviewer, professor["id"], course["id"], fairness=5, clarity=2, engagement=5, workload=1, confidence=1)
+    public._refresh()
+
+    listed = {entry["id"]: entry for entry in client.get("/public/professors").json()}
+    detail = client.get(f"/public/professors/{professor['id']}").json()
+    # Workload and confidence do not count towards the overall score.
+    assert listed[professor["id"]]["overall_average"] == detail["overall_average"] == pytest.approx(4.0)
+    assert detail["dimensions"]["clarity"]["average"] == pytest.approx(3.0)
+
+
+def test_unreviewed_professor_has_no_overall_average(client, make_professor):
+    professor, _, _ = make_professor(linked=False)
+    public._refresh()
+    assert client.get(f"/public/professors/{professor['id']}").json()["overall_average"] is None
+
+
+def test_archived_terms_leave_the_snapshot(client, admin, make_user, post_review, close_term):
+    term = f"P{uuid.uuid4().hex[:8]}"
+    courses = []
+    for course_term in (term, "2026F"):
+        code = f"T{uuid.uuid4().hex[:10]}"
+        courses.append(client.post("/courses", json={"name": code, "code": code, "term": course_term}, headers=admin).json())
+    body = {"name": "Professor", "department": "Tests", "course_ids": [course["id"] for course in courses]}
+    professor = client.post("/professors", json=body, headers=admin).json()
+    course, live_course = courses
+    _, reviewer = make_user(RoleEnum.REVIEWER)
+    archived = post_review(reviewer, professor["id"], course["id"], summary="archived lectures")
+    live = post_review(reviewer, professor["id"], live_course["id"])
+    public._refresh()
+    assert [review["id"] for review in client.get(f"/public/professors/{professor['id']}/reviews").json()] == [live["id"], archived["id"]]
+
+    close_term(term)
+    public._refresh()
+
+    reviews = f"/public/professors/{professor['id']}/reviews"
+    assert [review["id"] for review in client.get(reviews).json()] == [live["id"]]
+    assert [review["id"] for review in client.get(reviews, params={"term": term}).json()] == [archived["id"]]
+    assert [review["id"] for review in client.get(reviews, params={"term": "2026F"}).json()] == [live["id"]]
+    # Statistics still count the archived review.
+    assert client.get(f"/public/professors/{professor['id']}").json()["review_count"] == 2
@@ -0,0 +1,122 @@
+"""Per-endpoint SQL statement budgets.
+
+Every list and detail endpoint is requested with a little data, then again
+after the data has grown several times over. An endpoint fails when it
+exceeds its budget, or when its statement count grows with the number of rows
+it returns (an N+1 query).
+"""
+
+from typing import Callable, Dict, NamedTuple, Tuple
+
+import pytest
+
+from benchmarks.profiling import StatementCounter
+
+from .conftest import SCORES
+
+
+class CountCheck(NamedTuple):
+    name: str
+    path: Callable[[dict], str]
+    role: str
+    budget: int
+
+
+# Statements per request once the caller's principal is cached. The change feed
+# loads each entity type it returns in one query.
+CHECKS = [
+    CountCheck("GET /users/me", lambda ids: "/users/me", "reviewer", 1),
+    CountCheck("GET /courses", lambda ids: "/courses", "reviewer", 2),
+    CountCheck("GET /professors", lambda ids: "/professors", "reviewer", 3),
+    CountCheck("GET /public/professors", lambda ids: "/public/professors", "anonymous", 0),
+    CountCheck("GET /public/professors/{id}/reviews", lambda ids: f"/public/professors/{ids['professor']}/reviews", "anonymous", 0),
+    CountCheck("GET /professors/{id}/stats", lambda ids: f"/professors/{ids['professor']}/stats", "reviewer", 2),
+    CountCheck("GET /rankings", lambda ids: "/rankings?dimension=clarity", "reviewer", 1),
+    CountCheck("GET /rankings/{id}", lambda ids: f"/rankings/{ids['professor']}?dimension=clarity", "reviewer", 4),
+    CountCheck("GET /reviews (admin)", lambda ids: "/reviews", "admin", 1),
+    CountCheck("GET /reviews (reviewer)", lambda ids: "/reviews", "reviewer", 1),
+    CountCheck("GET /reviews?limit=20", lambda ids: "/reviews?limit=20", "admin", 1),
+    CountCheck("GET /professors/{id}/reviews", lambda ids: f"/professors/{ids['professor']}/reviews", "professor", 3),
+    CountCheck("GET /reviews/search", lambda ids: "/reviews/search?q=lectures", "admin", 2),
+    CountCheck("GET /rebuttals", lambda ids: "/rebuttals", "admin", 1),
+    CountCheck("GET /changes", lambda ids: "/changes?since=0&limit=500", "reviewer", 8),
+    CountCheck("GET /export/reviews", lambda ids: "/export/reviews", "admin", 2),
+]
+
+
+def _review(client, headers: Dict[str, dict], professor_id: int, course_id: int, rebut: bool) -> None:
+    review = client.post(
+        "/reviews",
+        json={"professor_id": professor_id, "course_id": course_id, "summary": "clear lectures", **SCORES},
+        headers=headers["reviewer"],
+    )
+    assert review.status_code == 201, review.text
+    if rebut:
+        client.post(f"/reviews/{review.json()['id']}/rebuttal", json={"content": "noted"}, headers=headers["professor"])
+
+
+def _seed(client, headers: Dict[str, dict], ids: dict, professors: int, reviews_each: int) -> None:
+    """Add ``professors`` professors with a course and ``reviews_each`` reviews apiece.
+
+    The first professor ever added belongs to the professor account, and every
+    other review it gets is rebutted; later calls give it ``reviews_each`` more.
+    """
+    from app import public
+
+    for _ in range(professors):
+        n = ids["professors"] = ids.get("professors", 0) + 1
+        code = f"Q{ids['prefix']}{n}"
+        course = client.post("/courses", json={"name": code, "code": code, "term": "2026F"}, headers=headers["admin"])
+        body = {"name": f"Professor {code}", "department": "CS", "course_ids": [course.json()["id"]]}
+        if "professor" not in ids:
+            body["user_id"] = ids["professor_user"]
+        professor = client.post("/professors", json=body, headers=headers["admin"]).json()
+        if "professor" not in ids:
+            ids["professor"], ids["course"] = professor["id"], course.json()["id"]
+            continue
+        for _ in range(reviews_each):
+            _review(client, headers, professor["id"], course.json()["id"], rebut=False)
+    for i in range(reviews_each):
+        _review(client, headers, ids["professor"], ids["course"], rebut=i % 2 == 0)
+    public._refresh()
+
+
+def _count(client, check: CountCheck, headers: Dict[str, dict], ids: dict) -> Tuple[int, int]:
+    from app import database
+
+    # The first request resolves the principal and fills per-worker caches; count the second.
+    client.get(check.path(ids), headers=headers[check.role])
+    counters = [StatementCounter(engine) for engine in {database.engine, database.read_engine}]
+    for counter in counters:
+        counter.__enter__()
+    try:
+        response = client.get(check.path(ids), headers=headers[check.role])
+    finally:
+        for counter in counters:
+            counter.__exit__(None, None, None)
+    return response.status_code, sum(counter.count for counter in counters)
+
+
+@pytest.fixture(scope="module")
+def counts(client, make_user):
+    from app.models import RoleEnum
+
+    headers = {"anonymous": {}}
+    ids = {"prefix": id(headers) % 10000}
+    for role in (RoleEnum.ADMIN, RoleEnum.REVIEWER, RoleEnum.PROFESSOR):
+        user, headers[role.value] = make_user(role)
+        ids[f"{role.value}_user"] = user.id
+    _seed(client, headers, ids, professors=2, reviews_each=2)
+    small = {check.name: _count(client, check, headers, ids) for check in CHECKS}
+    _seed(client, headers, ids, professors=8, reviews_each=6)
+    large = {check.name: _count(client, check, headers, ids) for check in CHECKS}
+    return small, large
+
+
+@pytest.mark.parametrize("check", CHECKS, ids=[check.name for check in CHECKS])
+def test_statement_budget(counts, check):
+    small, large = counts
+    (small_status, small_count), (large_status, large_count) = small[check.name], large[check.name]
+    assert (small_status, large_status) == (200, 200)
+    assert large_count <= small_count, f"{small_count} statements with little data, {large_count} with more"
+    assert large_count <= check.budget
@@ -0,0 +1,156 @@
+"""Query plans of the endpoint access paths.
+
+Each check runs the same queries the routes issue against a scratch
+in-memory SQLite schema, captures every emitted statement and inspects its
+``EXPLAIN QUERY PLAN``. A check fails when a statement scans a table without
+an index, or sorts through a temporary b-tree, unless the check explicitly
+allows scanning that table.
+"""
+
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Sequence
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import admins, aggregates, anon_ids, archive, changes, dependencies, fast_reads, models, queries, rankings, search
+from app.database import Base
+from app.pagination import encode_cursor, keyset_order
+from benchmarks.profiling import StatementCounter
+
+
+class PlanCheck(NamedTuple):
+    name: str
+    run: Callable[[Session], object]
+    allow_scan: Sequence[str] = ()
+    allow_sort: bool = False
+
+
+def _first_rows(db: Session, statement):
+    return db.execute(keyset_order(statement, models.Review).limit(21)).all()
+
+
+def _next_rows(db: Session, statement):
+    return db.execute(keyset_order(statement, models.Review, encode_cursor(datetime.utcnow(), 10)).limit(21)).all()
+
+
+CHECKS: List[PlanCheck] = [
+    PlanCheck("login user by email", lambda db: db.query(models.User).filter(models.User.email == "a@x.com").first()),
+    PlanCheck("token cutoff", lambda db: db.execute(dependencies._cutoff_statement(1)).first()),
+    PlanCheck("list courses", fast_reads.courses, allow_scan=("courses",)),
+    # Courses arrive in professor order from ix_course_professor_professor_id; only each professor's few are sorted by id.
+    PlanCheck("list professors", fast_reads.professors, allow_scan=("professors",), allow_sort=True),
+    # Ordering a professor's few courses by id is a sort of a handful of rows.
+    PlanCheck("professor courses", lambda db: db.get(models.Professor, 1).courses, allow_sort=True),
+    PlanCheck("professor stats", lambda db: db.query(models.ProfessorCourseStats).filter_by(professor_id=1).all()),
+    PlanCheck("professor reviews", lambda db: _first_rows(db, fast_reads.reviews_statement(professor_id=1))),
+    PlanCheck("professor reviews, next page", lambda db: _next_rows(db, fast_reads.reviews_statement(professor_id=1))),
+    PlanCheck(
+        "professor reviews in term",
+        lambda db: _first_rows(db, fast_reads.reviews_statement(professor_id=1, term="T")),
+    ),
+    PlanCheck("reviewer reviews", lambda db: _first_rows(db, fast_reads.reviews_statement(reviewer_id=1))),
+    PlanCheck("reviewer reviews, next page", lambda db: _next_rows(db, fast_reads.reviews_statement(reviewer_id=1))),
+    # The admin listing walks ix_reviews_created newest first; it must not sort.
+    PlanCheck("all reviews", lambda db: _first_rows(db, fast_reads.reviews_statement()), allow_scan=("reviews",)),
+    PlanCheck("all reviews, next page", lambda db: _next_rows(db, fast_reads.reviews_statement()), allow_scan=("reviews",)),
+    PlanCheck("list rebuttals", fast_reads.rebuttals, allow_scan=("rebuttals", "archived_terms")),
+    PlanCheck("search result reviews", lambda db: queries.reviews(db).filter(models.Review.id.in_([1, 2])).all()),
+    PlanCheck("rebuttal for review", lambda db: db.query(models.Rebuttal).filter_by(review_id=1).first()),
+    PlanCheck("rebuttal target", lambda db: queries.rebuttal_target(db, 1)),
+    PlanCheck("admin exists", admins.exists),
+    PlanCheck("admin guard", admins.guard),
+    PlanCheck("rebuttals by professor", lambda db: db.query(models.Rebuttal).filter_by(professor_id=1).all()),
+    PlanCheck(
+        "search reviews",
+        lambda db: search.SqliteFtsBackend().search(db, "clear lectures", professor_id=1, term="T"),
+        allow_scan=(search.SqliteFtsBackend.TABLE,),
+        # Ranking sorts the matched rows by bm25(); only the matches, never the table.
+        allow_sort=True,
+    ),
+    PlanCheck("allocate anonymous id", lambda db: anon_ids.allocate(db, 1)),
+    PlanCheck("record review aggregates", lambda db: aggregates.record_review(db, _sample_review())),
+    PlanCheck("record review rankings", lambda db: _rank_sample(db)),
+    PlanCheck("ranking top-k", lambda db: rankings.top(db, "clarity")),
+    PlanCheck("ranking top-k by department", lambda db: rankings.top(db, "clarity", "T", department="D")),
+    PlanCheck("rank of professor", lambda db: _rank_sample(db) and rankings.rank_of(db, 1, "clarity", department="D")),
+    PlanCheck("record change", lambda db: changes.record(db, changes.REVIEW, changes.CREATED, [1], 1, 1)),
+    # The seeded review entry has no live review, so the feed looks it up in the archives.
+    PlanCheck("change feed", lambda db: changes.feed(db, 0, 100), allow_scan=("archived_terms",)),
+    PlanCheck("change feed, reviewer", lambda db: changes.feed(db, 0, 100, changes.visible_to(reviewer_id=1))),
+    PlanCheck("change feed, professor", lambda db: changes.feed(db, 0, 100, changes.visible_to(professor_id=1))),
+    # A periodic job: finding superseded entries walks the log once, probing ix_change_log_entity per row.
+    PlanCheck("compact change log", changes.compact, allow_scan=("change_log",)),
+    # A handful of rows, reread every ARCHIVE_REFRESH_SECONDS.
+    PlanCheck("closed terms", lambda db: archive.Registry().entries(db), allow_scan=("archived_terms",)),
+    # Closing a term is an occasional admin job: finding its courses and their statistics may scan.
+    PlanCheck("delete archived term", lambda db: archive.purge(db, "T"), allow_scan=("courses", "professor_course_stats")),
+]
+
+
+def _sample_review() -> models.Review:
+    scores = {dimension: 3 for dimension in models.SCORE_DIMENSIONS}
+    return models.Review(professor_id=1, course_id=1, reviewer_id=1, anon_id="0000", **scores)
+
+
+def _rank_sample(db: Session) -> bool:
+    review = _sample_review()
+    aggregates.record_review(db, review)
+    rankings.record_review(db, review, "T")
+    return True
+
+
+def _seed(db: Session) -> None:
+    db.add(models.User(id=1, email="a@x.com", name="A", hashed_password="-", role=models.RoleEnum.REVIEWER))
+    db.add(models.Course(id=1, name="C", code="C1", term="T"))
+    db.add(models.Professor(id=1, name="P", department="D"))
+    db.flush()
+    db.execute(models.course_professor_association.insert().values(course_id=1, professor_id=1))
+    db.execute(
+        models.ChangeLogEntry.__table__.insert(),
+        [{"entity": entity, "entity_id": 1, "operation": changes.CREATED} for entity in (changes.COURSE, changes.REVIEW)],
+    )
+    # Priors exist after any rebuild; seeding a new scope's prior is a one-off full read.
+    for term in (rankings.ALL_TERMS, "T"):
+        db.add_all(models.RankingPrior(term=term, dimension=dimension, mean=3.0) for dimension in models.SCORE_DIMENSIONS)
+    db.commit()
+
+
+def _violations(plan_rows, check: PlanCheck) -> List[str]:
+    """Full scans (with or without an index) of tables not in ``allow_scan``, and sorts."""
+    problems = []
+    for row in plan_rows:
+        detail = row[-1]
+        if "USE TEMP B-TREE" in detail and not check.allow_sort:
+            problems.append(detail)
+        elif detail.startswith("SCAN ") and detail.split()[1] not in check.allow_scan:
+            problems.append(detail)
+    return problems
+
+
+@pytest.fixture(scope="module")
+def scratch():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        search.install(conn)
+    # The registry caches the suite database's closed terms; read this schema's instead.
+    archive.registry.invalidate()
+    with sessionmaker(bind=engine, autoflush=False)() as db, engine.connect() as conn:
+        _seed(db)
+        yield engine, db, conn
+    archive.registry.invalidate()
+
+
+@pytest.mark.parametrize("check", CHECKS, ids=[check.name for check in CHECKS])
+def test_query_plan(scratch, check):
+    engine, db, conn = scratch
+    with StatementCounter(engine) as counter:
+        check.run(db)
+    db.rollback()
+    problems = []
+    for statement, parameters in zip(counter.statements, counter.parameters):
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        problems.extend(_violations(plan, check))
+    assert not problems
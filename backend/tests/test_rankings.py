@@ -0,0 +1,58 @@
+"""Rankings kept current review by review match a recompute from ``reviews``."""
+
+import math
+import random
+import uuid
+
+from sqlalchemy import func, literal, select
+
+from app import rankings
+from app.config import settings
+from app.database import SessionLocal
+from app.models import SCORE_DIMENSIONS, Course, Professor, RankingPrior, Review, RoleEnum
+
+
+def naive(db, dimension: str, term: str, department=None):
+    """``(professor_id, score)`` for the scope, best first, using the stored priors."""
+    column = getattr(Review, dimension)
+    prior = (
+        select(RankingPrior.mean).where(RankingPrior.term == term, RankingPrior.dimension == dimension).scalar_subquery()
+    )
+    weight = literal(float(settings.RANKING_PRIOR_WEIGHT))
+    score = ((weight * prior + func.sum(column)) / (weight + func.count(Review.id))).label("score")
+    statement = (
+        select(Review.professor_id, score)
+        .join(Professor, Professor.id == Review.professor_id)
+        .join(Course, Course.id == Review.course_id)
+        .where(Course.term == term)
+        .group_by(Review.professor_id)
+    )
+    if department is not None:
+        statement = statement.where(Professor.department == department)
+    return db.execute(statement.order_by(score.desc(), Review.professor_id.desc())).all()
+
+
+def test_incremental_rankings_match_recompute(make_user, make_professor, post_review):
+    term = f"R{uuid.uuid4().hex[:8]}"
+    rng = random.Random(7)
+    reviewers = [make_user(RoleEnum.REVIEWER)[1] for _ in range(3)]
+    professors = [make_professor(term=term, linked=False)[:2] for _ in range(5)]
+    for _ in range(40):
+        professor, course = rng.choice(professors)
+        scores = {dimension: rng.randint(1, 5) for dimension in SCORE_DIMENSIONS}
+        post_review(rng.choice(reviewers), professor["id"], course["id"], **scores)
+
+    db = SessionLocal()
+    try:
+        for dimension in SCORE_DIMENSIONS:
+            for department in (None, "Tests"):
+                expected = naive(db, dimension, term, department)
+                assert len(expected) == len(professors)
+                top = rankings.top(db, dimension, term, department, limit=len(professors))
+                assert [entry["professor_id"] for entry in top] == [professor_id for professor_id, _ in expected]
+                assert all(math.isclose(entry["score"], score) for entry, (_, score) in zip(top, expected))
+                for rank, (professor_id, _) in enumerate(expected, start=1):
+                    found = rankings.rank_of(db, professor_id, dimension, term, department)
+                    assert (found["rank"], found["total"]) == (rank, len(expected))
+    finally:
+        db.close()
@@ -0,0 +1,86 @@
+"""Group commit falls back to one transaction per job when a batch commit fails."""
+
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import SessionLocal, engine
+from app.models import Course
+from app.write_queue import WriteQueue
+
+JOBS = 4
+
+
+class FailingFirstCommit(Session):
+    """Fails the first commit it sees, across every session of the factory."""
+
+    commits = 0
+    lock = threading.Lock()
+
+    def commit(self):
+        with self.lock:
+            FailingFirstCommit.commits += 1
+            first = FailingFirstCommit.commits == 1
+        if first:
+            raise OperationalError("COMMIT", {}, Exception("disk I/O error"))
+        super().commit()
+
+
+@pytest.fixture
+def make_writer():
+    writers = []
+
+    def make(session_class=Session, max_batch: int = JOBS) -> WriteQueue:
+        FailingFirstCommit.commits = 0
+        writers.append(WriteQueue(sessionmaker(bind=engine, class_=session_class, autoflush=False), max_batch, max_delay=2))
+        return writers[-1]
+
+    yield make
+    for writer in writers:
+        writer.stop()
+
+
+def _add_course(code: str):
+    def work(db: Session) -> str:
+        db.add(Course(name=code, code=code, term="WQ"))
+        db.flush()
+        return code
+
+    return work
+
+
+def test_failed_batch_commit_retries_each_job(client, make_writer):
+    writer = make_writer(FailingFirstCommit)
+    codes = [f"WQ{uuid.uuid4().hex[:10]}" for _ in range(JOBS)]
+    with ThreadPoolExecutor(JOBS) as pool:
+        results = list(pool.map(lambda code: writer.submit(_add_course(code)), codes))
+    assert results == codes
+    # One failed commit of the whole batch, then one commit per job.
+    assert FailingFirstCommit.commits == 1 + JOBS
+    db = SessionLocal()
+    try:
+        assert sorted(db.scalars(select(Course.code).where(Course.code.in_(codes)))) == sorted(codes)
+    finally:
+        db.close()
+
+
+def test_job_error_does_not_fail_the_batch(client, make_writer):
+    writer = make_writer(max_batch=2)
+    taken, free = (f"WQ{uuid.uuid4().hex[:10]}" for _ in range(2))
+    db = SessionLocal()
+    try:
+        db.add(Course(name=taken, code=taken, term="WQ"))
+        db.commit()
+    finally:
+        db.close()
+    with ThreadPoolExecutor(2) as pool:
+        failing = pool.submit(writer.submit, _add_course(taken))
+        other = pool.submit(writer.submit, _add_course(free))
+        with pytest.raises(IntegrityError):
+            failing.result()
+        assert other.result() == free
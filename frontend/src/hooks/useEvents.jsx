@@ -0,0 +1,65 @@
+import { useEffect, useRef } from 'react'
+import apiClient from '../services/api'
+
+const RETRY_MS = 3000
+
+function parseFrame(frame) {
+  let type = 'message'
+  const data = []
+  for (const line of frame.split('\n')) {
+    if (line.startsWith('event:')) type = line.slice(6).trim()
+    else if (line.startsWith('data:')) data.push(line.slice(5).trim())
+  }
+  if (data.length === 0 && type === 'message') return null
+  return { type, data: data.length ? JSON.parse(data.join('\n')) : null }
+}
+
+// Subscribes to GET /events. fetch() rather than EventSource so the token stays in the Authorization header.
+// After a dropped connection the handler gets a 'reset' event: reload anything that may have been missed.
+export function useEvents(onEvent, enabled = true) {
+  const handler = useRef(onEvent)
+  handler.current = onEvent
+
+  useEffect(() => {
+    if (!enabled) return undefined
+    const controller = new AbortController()
+    let retry = null
+
+    const connect = async () => {
+      const token = localStorage.getItem('token')
+      try {
+        const response = await fetch(`${apiClient.defaults.baseURL}/events`, {
+          headers: token ? { Authorization: `Bearer ${token}` } : {},
+          signal: controller.signal
+        })
+        if (response.status === 401 || response.status === 403) return
+        if (!response.ok) throw new Error(`HTTP ${response.status}`)
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+        let buffer = ''
+        for (;;) {
+          const { value, done } = await reader.read()
+          if (done) break
+          buffer += value
+          let end
+          while ((end = buffer.indexOf('\n\n')) >= 0) {
+            const event = parseFrame(buffer.slice(0, end))
+            buffer = buffer.slice(end + 2)
+            if (event) handler.current(event.type, event.data)
+          }
+        }
+      } catch (error) {
+        if (controller.signal.aborted) return
+      }
+      if (!controller.signal.aborted) {
+        handler.current('reset', null)
+        retry = setTimeout(connect, RETRY_MS)
+      }
+    }
+
+    connect()
+    return () => {
+      controller.abort()
+      clearTimeout(retry)
+    }
+  }, [enabled])
+}
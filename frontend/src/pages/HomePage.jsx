@@ -9,7 +9,7 @@ function HomePage() {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    axios.get(`${API_BASE}/professors`)
+    axios.get(`${API_BASE}/public/professors`)
       .then(response => {
         setProfessors(response.data)
         setLoading(false)
@@ -32,7 +32,7 @@ function HomePage() {
             <p className="department">{professor.department}</p>
             {professor.review_count > 0 ? (
               <div className="rating-summary">
-                <span className="rating-score">⭐ {professor.average_rating.toFixed(1)}</span>
+                <span className="rating-score">⭐ {professor.overall_average.toFixed(1)}</span>
                 <span className="review-count">({professor.review_count} reviews)</span>
               </div>
             ) : (
@@ -1,6 +1,7 @@
 import { useEffect, useMemo, useState } from 'react'
 import apiClient from '../services/api'
 import { useAuth } from '../hooks/useAuth'
+import { useEvents } from '../hooks/useEvents'
 
 function ProfessorDashboard() {
   const { user } = useAuth()
@@ -37,6 +38,9 @@ function ProfessorDashboard() {
     }
   }, [user])
 
+  // New reviews and rebuttals arrive as events instead of polling.
+  useEvents(() => loadData(), user?.role === 'professor')
+
   const handleRebuttal = async (reviewId) => {
     const content = rebuttals[reviewId]
     if (!content) return
@@ -31,8 +31,8 @@ function ProfessorDetail() {
 
   const loadData = () => {
     Promise.all([
-      axios.get(`${API_BASE}/professors/${id}`),
-      axios.get(`${API_BASE}/professors/${id}/reviews`)
+      axios.get(`${API_BASE}/public/professors/${id}`),
+      axios.get(`${API_BASE}/public/professors/${id}/reviews`)
     ])
       .then(([profRes, revRes]) => {
         setProfessor(profRes.data)
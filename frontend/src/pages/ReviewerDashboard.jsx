@@ -1,6 +1,7 @@
 import { useEffect, useMemo, useState } from 'react'
 import apiClient from '../services/api'
 import { useAuth } from '../hooks/useAuth'
+import { useEvents } from '../hooks/useEvents'
 
 const initialReview = {
   professor_id: '',
@@ -40,6 +41,9 @@ function ReviewerDashboard() {
     }
   }, [user])
 
+  // Rebuttals to this reviewer's reviews arrive as events instead of polling.
+  useEvents(() => loadData(), user?.role === 'reviewer')
+
   const professorCourses = useMemo(() => {
     const professor = professors.find((p) => p.id === Number(reviewForm.professor_id))
     return professor?.courses ?? []